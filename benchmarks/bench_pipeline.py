@@ -0,0 +1,157 @@
+'''
+pytest-benchmark suite over the scheduling pipeline
+
+Synthetic layered schedules (see workloads.synthetic_schedule) are sized
+with --bench-qubits, --bench-depth and --bench-fan-in, each taking a
+comma separated list. Covered:
+    dag_create              loading a schedule into gates, per
+                            t_scheduler.synthetic family
+    schedule                ScheduleOrchestrator.schedule() per template
+    router_transaction      generic_transaction of each router per template,
+                            replaying the requests of a live schedule
+    upkeep                  GenericStrategy.upkeep per buffered template
+    widget_update           Widget.update per template
+
+Ticks per second and peak RSS go in each benchmark's extra_info, so
+they are kept in the saved JSON along with the timings and commit.
+
+Usage (needs pytest-benchmark):
+    pytest benchmarks/bench_pipeline.py --benchmark-autosave
+    pytest benchmarks/bench_pipeline.py --benchmark-compare --benchmark-compare-fail=mean:10%
+    pytest benchmarks/bench_pipeline.py --bench-qubits 8,16 --benchmark-json out.json
+'''
+from contextlib import redirect_stdout
+import io
+from time import perf_counter
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from t_scheduler.base import util
+from t_scheduler.tracker import router_label
+
+import workloads
+
+
+TEMPLATES = list(workloads.TEMPLATES)
+
+# Router layout does not depend on size
+ROUTERS = [
+    (template, idx, router_label(idx, router))
+    for template in TEMPLATES
+    for idx, router in enumerate(workloads.build(template, 4, 16)[0].routers)
+]
+
+UPKEEP_TEMPLATES = [
+    template for template in TEMPLATES
+    if workloads.build(template, 4, 16)[0].needs_upkeep
+]
+
+
+@pytest.fixture(scope='module')
+def schedule(size):
+    return workloads.synthetic_schedule(*size)
+
+
+@pytest.fixture
+def options(request):
+    return {
+        'prewarm': request.config.getoption('--bench-prewarm'),
+        'window': request.config.getoption('--bench-window'),
+    }
+
+
+def quiet(fn, *args, **kwargs):
+    # The orchestrator reports progress on stdout
+    with redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def live(template, schedule, size, options):
+    '''
+    Orchestrator of template options['window'] ticks into the schedule
+    '''
+    orc = quiet(workloads.make_orchestrator, template, schedule, size[0], prewarm=options['prewarm'])
+    return quiet(workloads.advance, orc, options['window'])
+
+
+def add_rss(benchmark):
+    benchmark.extra_info['peak_rss_mb'] = workloads.peak_rss_mb()
+
+
+@pytest.mark.parametrize('family', list(workloads.FAMILIES))
+def test_dag_create(benchmark, family, size):
+    n_qubits = size[0]
+    schedule = workloads.synthetic_schedule(*size, family=family)
+
+    def load():
+        gates = util.make_gates(schedule, lambda x: int(x) % n_qubits)
+        return util.dag_create(schedule, gates)
+
+    benchmark(load)
+    benchmark.extra_info['gates'] = schedule['n_qubits']
+    add_rss(benchmark)
+
+
+@pytest.mark.parametrize('template', TEMPLATES)
+def test_schedule(benchmark, template, schedule, size, options):
+    runs = []
+
+    def setup():
+        orc = quiet(workloads.make_orchestrator, template, schedule, size[0], prewarm=options['prewarm'])
+        return (orc,), {}
+
+    def run(orc):
+        start = perf_counter()
+        quiet(orc.schedule)
+        runs.append((orc.time, perf_counter() - start))
+
+    benchmark.pedantic(run, setup=setup, rounds=3)
+
+    ticks, seconds = min(runs, key=lambda r: r[1])
+    benchmark.extra_info['ticks'] = ticks
+    benchmark.extra_info['ticks_per_second'] = ticks / seconds
+    add_rss(benchmark)
+
+
+@pytest.mark.parametrize('template,router_idx', [r[:2] for r in ROUTERS], ids=[f'{t}-{label}' for t, _, label in ROUTERS])
+def test_router_transaction(benchmark, template, router_idx, schedule, size, options):
+    orc = quiet(workloads.make_orchestrator, template, schedule, size[0], prewarm=options['prewarm'])
+    calls = quiet(workloads.record_transactions, orc, options['window'])[router_idx]
+    if not calls:
+        pytest.skip('router received no requests')
+    router = orc.strategy.routers[router_idx]
+
+    def replay():
+        for args, kwargs in calls:
+            router.generic_transaction(*args, **kwargs)
+
+    benchmark(replay)
+    benchmark.extra_info['requests'] = len(calls)
+    add_rss(benchmark)
+
+
+@pytest.mark.parametrize('template', UPKEEP_TEMPLATES)
+def test_upkeep(benchmark, template, schedule, size, options):
+    # upkeep moves states into the buffers, so every round needs a fresh
+    # board, taken as it is when the pass calls upkeep. Whether states can
+    # move varies tick to tick, so rounds step through consecutive ticks.
+    ticks = iter(range(options['window'], options['window'] + 20))
+
+    def setup():
+        orc = quiet(workloads.make_orchestrator, template, schedule, size[0], prewarm=options['prewarm'])
+        quiet(workloads.advance, orc, next(ticks))
+        return (quiet(workloads.stop_at_upkeep, orc).strategy,), {}
+
+    moved = []
+    benchmark.pedantic(lambda strategy: moved.append(len(strategy.upkeep())), setup=setup, rounds=20)
+    benchmark.extra_info['upkeep_gates'] = sum(moved) / len(moved)
+    add_rss(benchmark)
+
+
+@pytest.mark.parametrize('template', TEMPLATES)
+def test_widget_update(benchmark, template, schedule, size, options):
+    widget = live(template, schedule, size, options).widget
+    benchmark(widget.update)
+    add_rss(benchmark)
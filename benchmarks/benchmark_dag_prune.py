@@ -0,0 +1,53 @@
+'''
+Scaling of util.dag_prune on synthetic schedules up to 10^6 gates, next
+to loading the same schedule into an array-backed GateDAG
+
+Usage: python benchmarks/benchmark_dag_prune.py [max_gates]
+'''
+import gc
+import sys
+import timeit
+
+from t_scheduler import synthetic
+from t_scheduler.base import util
+from t_scheduler.base.dag import GateDAG
+
+
+def cases(n_gates):
+    R = 1000 if n_gates >= 10 ** 5 else 100
+    yield 'layered_random', R, {'depth': n_gates // R, 'fan_in': 3, 'span': 4}
+    yield 'all_to_all', int(n_gates ** 0.5), {}
+    yield 'adder', 64, {'additions': n_gates // 64}
+    yield 'chain', 4, {'length': n_gates // 4, 'link_every': 3}
+
+
+def benchmark_dag_prune(family, n_registers, params):
+    obj = synthetic.make_schedule(family, n_registers, **params)
+    gc.collect()
+    gate_dag_seconds = timeit.timeit(lambda: GateDAG.from_schedule(obj, lambda x: x % n_registers), number=1)
+
+    gates = util.make_gates(obj, lambda x: int(x) % n_registers)
+    dag_layers = util.dag_link(obj, gates)
+    del obj
+    edges = sum(len(g.pre) for g in gates)
+
+    gc.collect()
+    seconds = timeit.timeit(lambda: util.dag_prune(dag_layers, gates), number=1)
+    pruned = sum(len(g.pre) for g in gates)
+    return len(gates), edges, pruned, seconds, gate_dag_seconds
+
+
+def main():
+    max_gates = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    print(f"{'family':<16}{'gates':>10}{'edges':>10}{'kept':>10}{'seconds':>10}{'us/edge':>10}{'GateDAG':>10}")
+    n_gates = 10 ** 4
+    while n_gates <= max_gates:
+        for family, n_registers, params in cases(n_gates):
+            gates, edges, pruned, seconds, gate_dag_seconds = benchmark_dag_prune(family, n_registers, params)
+            print(f'{family:<16}{gates:>10}{edges:>10}{pruned:>10}{seconds:>10.3f}{seconds / edges * 1e6:>10.2f}'
+                  f'{gate_dag_seconds:>10.3f}')
+        n_gates *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Cost of per-tick output on the scheduling thread: headless runs against
+debug prints and streamed frames written directly or through an output
+queue, where the scheduling thread only takes board snapshots and the
+output thread formats them
+
+Usage: python benchmarks/benchmark_output_queue.py [repeats]
+'''
+from contextlib import redirect_stdout
+import io
+import json
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from t_scheduler.base import util
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.strategy.generic_strategy import DummyMapper
+from t_scheduler.templates.generic_templates import vertical_strategy_with_prefilled_buffer_widget
+
+SCHEDULE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'qft_8_test_obj.json')
+OUTPUT_QUEUE = 64
+
+
+def run(obj, **kwargs):
+    '''
+    Seconds until the last tick is scheduled, and until schedule() returns
+    with every record written
+    '''
+    strat, wid = vertical_strategy_with_prefilled_buffer_widget(16, 40)
+    strat.mapper = DummyMapper(2)
+    wid.reseed(0)
+    gates = util.make_gates(obj, lambda x: int(x) % 8)
+    dag_layers, _ = util.dag_create(obj, gates)
+
+    with redirect_stdout(io.StringIO()):
+        start = perf_counter()
+        orc = ScheduleOrchestrator(dag_layers[0], wid, strat, **kwargs)
+        close_output = orc.close_output
+        scheduled = None
+
+        def timed_close():
+            nonlocal scheduled
+            scheduled = perf_counter() - start
+            close_output()
+
+        orc.close_output = timed_close
+        orc.schedule()
+        return scheduled, perf_counter() - start
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    with open(SCHEDULE) as f:
+        obj = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'frames.ndjson')
+        modes = {
+            'headless': {},
+            'json_stream': {'json_stream': path},
+            'debug': {'debug': True},
+        }
+        print(f"{'output':<14}{'queue':>7}{'scheduled s':>13}{'total s':>10}")
+        for name, kwargs in modes.items():
+            for output_queue in ((None,) if name == 'headless' else (None, OUTPUT_QUEUE)):
+                times = [run(obj, output_queue=output_queue, **kwargs) for _ in range(repeats)]
+                scheduled, total = min(times, key=lambda t: t[1])
+                print(f'{name:<14}{str(output_queue):>7}{scheduled:>13.3f}{total:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+'''
+Memory and attribute access cost of the core objects (patches, locks,
+transactions, responses, gates and volume tags)
+
+Prints bytes per object (tracemalloc, including the object's __dict__
+where it has one) and timings of the hot loops over them. Run it on two
+commits to compare layouts.
+
+Usage: python benchmarks/benchmark_slots.py [n_objects]
+'''
+import gc
+import sys
+import timeit
+import tracemalloc
+
+from t_scheduler import synthetic
+from t_scheduler.base import util
+from t_scheduler.base.gate import MoveGate, T_Gate
+from t_scheduler.base.patch import BufferPatch, Patch, PatchLock, PatchType, TCultPatch
+from t_scheduler.base.response import Response
+from t_scheduler.base.transaction import Transaction
+from t_scheduler.templates.generic_templates import vertical_strategy_with_prefilled_buffer_widget
+from t_scheduler.tracker import SpaceTimeVolumeTracker, SpaceTimeVolumeType
+
+
+class Clock:
+    time = 0
+
+
+TRACKER = SpaceTimeVolumeTracker(Clock())
+PATCHES = [Patch(PatchType.ROUTE, 0, 0), Patch(PatchType.ROUTE, 0, 1)]
+TRANSACTION = Transaction(PATCHES, PATCHES[:1])
+
+MAKERS = {
+    'Patch': lambda: Patch(PatchType.ROUTE, 0, 0),
+    'BufferPatch': lambda: BufferPatch(0, 0),
+    'TCultPatch': lambda: TCultPatch(0, 0),
+    'PatchLock': lambda: PatchLock(None, PATCHES),
+    'Transaction': lambda: Transaction(PATCHES, PATCHES[:1]),
+    'Response': lambda: Response(transaction=TRANSACTION),
+    'T_Gate': lambda: T_Gate(0, 2, 3),
+    'MoveGate': lambda: MoveGate(),
+    'SpaceTimeVolumeTrackingTag': lambda: TRACKER.make_tag(SpaceTimeVolumeType.ROUTING_VOLUME),
+}
+
+
+def bytes_per_object(make, n):
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objs = [make() for _ in range(n)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Less the list holding them
+    return (after - before - sys.getsizeof(objs)) / len(objs)
+
+
+def board_patches():
+    _, wid = vertical_strategy_with_prefilled_buffer_widget(100, 100)
+    return [cell for row in wid.board for cell in row]
+
+
+def scan(cells):
+    # The shape of the routers' availability checks
+    return sum(1 for cell in cells if cell.T_available() or cell.route_available())
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    print(f"{'object':<30}{'bytes':>10}{'create us':>12}")
+    for name, make in MAKERS.items():
+        size = bytes_per_object(make, n)
+        seconds = min(timeit.repeat(make, number=n, repeat=3))
+        print(f'{name:<30}{size:>10.0f}{seconds / n * 1e6:>12.3f}')
+
+    cells = board_patches()
+    seconds = min(timeit.repeat(lambda: scan(cells), number=20, repeat=3))
+    print(f'\nscan of {len(cells)} board patches: {seconds / 20 * 1e3:.3f} ms')
+
+    obj = synthetic.make_schedule('layered_random', 100, depth=n // 100, fan_in=3)
+    gc.collect()
+    tracemalloc.start()
+    start = timeit.default_timer()
+    gates = util.make_gates(obj, lambda x: x % 100)
+    util.dag_create(obj, gates)
+    seconds = timeit.default_timer() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'dag_create of {len(gates)} gates: {seconds:.3f} s, peak {peak / (1 << 20):.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+'''
+Peak memory of scheduling a synthetic schedule file loaded whole
+(json.load, util.make_gates, util.dag_create) against streamed through
+base.schedule_stream.StreamingLoader
+
+Usage: python benchmarks/benchmark_stream_loader.py [depth ...]
+'''
+from contextlib import redirect_stdout
+import io
+import json
+import os
+import sys
+import tempfile
+from time import perf_counter
+import tracemalloc
+
+from t_scheduler import synthetic
+from t_scheduler.base import util
+from t_scheduler.base.schedule_stream import ScheduleStream, StreamingLoader
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.tracker import HookRegistry
+
+import workloads
+
+N_REGISTERS = 8
+TEMPLATE = 'flat_naive_t_cultivator_widget'
+
+
+def targ(x):
+    return int(x) % N_REGISTERS
+
+
+def load_whole(path):
+    with open(path) as f:
+        obj = json.load(f)
+    gates = util.make_gates(obj, targ)
+    dag_layers, _ = util.dag_create(obj, gates)
+    return dag_layers[0], None
+
+
+def load_streamed(path):
+    loader = StreamingLoader(ScheduleStream(path).layers(), targ, lookahead=256)
+    hooks = HookRegistry(timed=False)
+    loader.attach(hooks)
+    return loader.roots(), hooks
+
+
+def measure(path, n_gates, load):
+    tracemalloc.start()
+    start = perf_counter()
+    with redirect_stdout(io.StringIO()):
+        strat, wid = workloads.build(TEMPLATE, N_REGISTERS, n_gates)
+        roots, hooks = load(path)
+        orc = ScheduleOrchestrator(roots, wid, strat, hooks=hooks)
+        orc.schedule()
+    seconds = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return orc.time, seconds, peak / (1 << 20)
+
+
+def main():
+    depths = [int(x) for x in sys.argv[1:]] or [100, 300, 1000]
+    print(f"{'gates':>8}{'loader':>10}{'ticks':>8}{'seconds':>10}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'schedule.json')
+        for depth in depths:
+            n_gates = synthetic.write_schedule(path, 'layered_random', N_REGISTERS, depth=depth, fan_in=3)
+            for name, load in (('whole', load_whole), ('streamed', load_streamed)):
+                ticks, seconds, peak = measure(path, n_gates, load)
+                print(f'{n_gates:>8}{name:>10}{ticks:>8}{seconds:>10.2f}{peak:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
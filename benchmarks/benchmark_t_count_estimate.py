@@ -0,0 +1,83 @@
+'''
+Cost and agreement of templates.estimate_generated_t_count sampled from
+the T generator model against simulated prewarms
+
+Usage: python benchmarks/benchmark_t_count_estimate.py [cycles ...]
+'''
+from contextlib import redirect_stdout
+from functools import partial
+import io
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from t_scheduler.templates.generic_templates import *
+
+WIDTH = 24
+N_SIMULATED = 20
+
+
+def buffered(factory_factory, buffer_height=4, height=30):
+    return LayoutNode(
+        partial(SingleRowRegisterRegion, WIDTH, x=0, y=0), BaselineRegisterRouter,
+        [LayoutNode(
+            partial(RouteBus, WIDTH, x=0, y=1), StandardBusRouter,
+            [LayoutNode(
+                partial(MagicStateBufferRegion, WIDTH, buffer_height, x=0, y=2), RechargableBufferRouter,
+                [LayoutNode(
+                    partial(RouteBus, WIDTH, x=0, y=2 + buffer_height), StandardBusRouter,
+                    [LayoutNode(
+                        partial(factory_factory, WIDTH, height - 3 - buffer_height, x=0, y=3 + buffer_height),
+                        MagicStateFactoryRouter,
+                    )]
+                )]
+            )]
+        )]
+    )
+
+
+def cultivators(height=12):
+    return LayoutNode(
+        partial(SingleRowRegisterRegion, WIDTH, x=0, y=0), BaselineRegisterRouter,
+        [LayoutNode(
+            partial(RouteBus, WIDTH, x=0, y=1), StandardBusRouter,
+            [LayoutNode(
+                partial(TCultivatorBufferRegion, WIDTH, height - 2, 'dense', x=0, y=2),
+                DenseTCultivatorBufferRouter,
+            )]
+        )]
+    )
+
+
+LAYOUTS = {
+    'litinski_5x3': partial(buffered, MagicStateFactoryRegion.with_litinski_5x3),
+    'litinski_6x3_dense': partial(buffered, MagicStateFactoryRegion.with_litinski_6x3_dense),
+    'cultivators': cultivators,
+}
+
+
+def timed(func):
+    start = perf_counter()
+    with redirect_stdout(io.StringIO()):
+        result = func()
+    return result, perf_counter() - start
+
+
+def main():
+    all_cycles = [int(x) for x in sys.argv[1:]] or [30, 60, 100, 1000, 5000]
+    print(f"{'layout':<20}{'cycles':>8}{'simulated':>11}{'estimate':>10}{'p10':>8}{'sim ms':>10}{'est ms':>9}")
+    for name, make in LAYOUTS.items():
+        for cycles in all_cycles:
+            simulated, sim_seconds = timed(lambda: [
+                estimate_generated_t_count(make(), cycles, simulate=True, seed=seed)
+                for seed in range(N_SIMULATED)
+            ])
+            estimate, est_seconds = timed(lambda: estimate_generated_t_count(make(), cycles, seed=0))
+            p10 = estimate_generated_t_count(make(), cycles, 10, seed=0)
+            print(f'{name:<20}{cycles:>8}{np.mean(simulated):>11.1f}{estimate:>10.1f}{p10:>8.0f}'
+                  f'{sim_seconds / N_SIMULATED * 1e3:>10.1f}{est_seconds * 1e3:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
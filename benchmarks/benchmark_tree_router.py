@@ -0,0 +1,46 @@
+'''
+Cost of TreeFilledBufferRouter requests on synthetic schedules: time per
+generic_transaction call, and how many tree reparses needed a fresh route
+field (BFS) rather than a cached one
+
+Usage: python benchmarks/benchmark_tree_router.py [n_qubits ...]
+'''
+from contextlib import redirect_stdout
+import io
+import sys
+from time import perf_counter
+
+from t_scheduler.router import TreeFilledBufferRouter
+from t_scheduler.tracker import HookRegistry
+
+import workloads
+
+TEMPLATE = 'tree_strategy_with_prefilled_buffer_widget'
+DEPTH = 40
+
+
+def main():
+    all_qubits = [int(x) for x in sys.argv[1:]] or [8, 16]
+    print(f"{'qubits':>6}{'ticks':>8}{'ticks/s':>10}{'calls':>8}{'us/call':>10}{'reparses':>10}{'fields':>8}")
+    for n_qubits in all_qubits:
+        obj = workloads.synthetic_schedule(n_qubits, DEPTH, 3)
+        hooks = HookRegistry()
+        orc = workloads.make_orchestrator(TEMPLATE, obj, n_qubits, hooks=hooks)
+        idx, router = next(
+            (idx, router) for idx, router in enumerate(orc.strategy.routers)
+            if isinstance(router, TreeFilledBufferRouter)
+        )
+
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            orc.schedule()
+        seconds = perf_counter() - start
+
+        stats = next(stats for name, stats in hooks.routers.items() if name.startswith(f'{idx}:'))
+        print(f'{n_qubits:>6}{orc.time:>8}{orc.time / seconds:>10.1f}{stats.calls:>8}'
+              f'{stats.time.total / max(stats.calls, 1) * 1e6:>10.1f}'
+              f'{router.reparses:>10}{router.field_builds:>8}')
+
+
+if __name__ == '__main__':
+    main()
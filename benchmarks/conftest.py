@@ -0,0 +1,33 @@
+import itertools
+
+import pytest
+
+
+def _ints(value):
+    return [int(v) for v in value.split(',')]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('t_scheduler benchmarks')
+    group.addoption('--bench-qubits', type=_ints, default=[8],
+                    help='register counts of the synthetic schedules (comma separated)')
+    group.addoption('--bench-depth', type=_ints, default=[12],
+                    help='layers of the synthetic schedules (comma separated)')
+    group.addoption('--bench-fan-in', type=_ints, default=[2],
+                    help='predecessors per gate of the synthetic schedules (comma separated)')
+    group.addoption('--bench-prewarm', type=int, default=5,
+                    help='prewarm cycles before scheduling')
+    group.addoption('--bench-window', type=int, default=20,
+                    help='ticks scheduled before microbenchmarking a live board')
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        config = metafunc.config
+        sizes = list(itertools.product(
+            config.getoption('--bench-qubits'),
+            config.getoption('--bench-depth'),
+            config.getoption('--bench-fan-in'),
+        ))
+        metafunc.parametrize(
+            'size', sizes, ids=[f'q{q}-d{d}-f{f}' for q, d, f in sizes], scope='module')
@@ -0,0 +1,210 @@
+'''
+Workloads for the pipeline benchmarks (bench_pipeline.py)
+
+Synthetic consumption schedules (t_scheduler.synthetic), every generic_templates widget builder
+sized to a register count, and orchestrators advanced to a given tick.
+
+Usage: python benchmarks/workloads.py [n_qubits depth fan_in]
+    Runs every template once and prints one JSON line per template
+'''
+from contextlib import redirect_stdout
+import json
+import sys
+from time import perf_counter
+
+from t_scheduler.base import util
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.strategy.generic_strategy import DummyMapper, RotationStrategyOption
+from t_scheduler.synthetic import FAMILIES, make_schedule
+from t_scheduler.templates.generic_templates import *
+
+
+def synthetic_schedule(n_qubits: int, depth: int, fan_in: int = 2, seed: int = 0, family: str = 'layered_random') -> dict:
+    '''
+    Schedule of t_scheduler.synthetic family on n_qubits registers, with
+    depth and fan_in read as that family's size parameters
+    '''
+    params = {
+        'all_to_all': {'rounds': max(1, depth // max(1, n_qubits - 1))},
+        'layered_random': {'depth': depth, 'fan_in': fan_in, 'seed': seed},
+        'adder': {'additions': depth},
+        'chain': {'length': depth, 'link_every': fan_in},
+    }[family]
+    return make_schedule(family, n_qubits, **params)
+
+
+class CombMapper:
+    '''
+    Register q on the lower teeth of a comb register, reg_width 2
+    '''
+    def __init__(self, width):
+        self.per_row = width // 2
+
+    def __getitem__(self, idx: int):
+        return idx
+
+    def position_xy(self, idx: int):
+        idx += self.per_row
+        col = (idx % self.per_row) * 2
+        col += col % 4 // 2
+        return (col, idx // self.per_row + 1)
+
+
+def _width(n_qubits, multiple=2):
+    width = max(2 * n_qubits, 6)
+    return -(-width // multiple) * multiple
+
+
+def _prefilled_rows(n_gates, width, density=1):
+    # Prefilled regions are the only T source, size them to the schedule
+    return -(-n_gates // int((width - 2) * density)) + 2
+
+
+def _comb(n_qubits, n_gates):
+    width = _width(n_qubits, 4)
+    strat, wid = vertical_strategy_with_prefilled_comb_widget(
+        width, 5 + _prefilled_rows(n_gates, width, 0.5), comb_height=4,
+        rot_strat=RotationStrategyOption.BACKPROP_INIT)
+    strat.mapper = CombMapper(width)
+    return strat, wid
+
+
+def _tree(n_qubits, n_gates):
+    width = _width(n_qubits, 4)
+    return tree_strategy_with_prefilled_buffer_widget(
+        width, 2 + _prefilled_rows(n_gates, width, 0.5))
+
+
+# Template name -> builder of (strategy, widget) for n_qubits registers
+# and a schedule of n_gates T gates
+TEMPLATES = {
+    'flat_naive_litinski_5x3_unbuffered_widget':
+        lambda n, _: flat_naive_litinski_5x3_unbuffered_widget(_width(n), 7),
+    'flat_naive_t_cultivator_widget':
+        lambda n, _: flat_naive_t_cultivator_widget(_width(n), 5),
+    'flat_naive_litinski_6x3_dense_unbuffered_widget':
+        lambda n, _: flat_naive_litinski_6x3_dense_unbuffered_widget(_width(n), 8),
+    'buffered_naive_buffered_widget':
+        lambda n, _: buffered_naive_buffered_widget(
+            _width(n), 18, 2, factory_factory=MagicStateFactoryRegion.with_litinski_6x3_dense),
+    'vertical_strategy_with_prefilled_buffer_widget':
+        lambda n, n_gates: vertical_strategy_with_prefilled_buffer_widget(
+            _width(n), 2 + _prefilled_rows(n_gates, _width(n))),
+    'vertical_strategy_with_prefilled_comb_widget': _comb,
+    'tree_strategy_with_prefilled_buffer_widget': _tree,
+}
+
+
+def build(template: str, n_qubits: int, n_gates: int, seed: int = 0):
+    strat, wid = TEMPLATES[template](n_qubits, n_gates)
+    if not isinstance(strat.mapper, CombMapper):
+        strat.mapper = DummyMapper(2)
+    wid.reseed(seed)
+    return strat, wid
+
+
+def make_orchestrator(template, obj, n_qubits, prewarm=0, seed=0, **kwargs) -> ScheduleOrchestrator:
+    strat, wid = build(template, n_qubits, obj['n_qubits'], seed)
+    gates = util.make_gates(obj, lambda x: int(x) % n_qubits)
+    dag_layers, _ = util.dag_create(obj, gates)
+    orc = ScheduleOrchestrator(dag_layers[0], wid, strat, **kwargs)
+    if prewarm:
+        orc.prewarm(prewarm)
+    return orc
+
+
+def advance(orc: ScheduleOrchestrator, ticks: int) -> ScheduleOrchestrator:
+    '''
+    Start scheduling and run up to ticks passes
+    '''
+    orc.queued.extend(orc.waiting)
+    for _ in range(ticks):
+        if not (orc.queued or orc.active):
+            break
+        orc.schedule_pass()
+    return orc
+
+
+class _AtUpkeep(Exception):
+    pass
+
+
+def stop_at_upkeep(orc: ScheduleOrchestrator) -> ScheduleOrchestrator:
+    '''
+    Run the next pass up to its upkeep call and abandon it there, leaving
+    the board as upkeep sees it. orc can not be scheduled further.
+    '''
+    def stop():
+        raise _AtUpkeep()
+
+    orc.strategy.upkeep = stop
+    try:
+        orc.schedule_pass()
+    except _AtUpkeep:
+        pass
+    finally:
+        del orc.strategy.upkeep
+    return orc
+
+
+def record_transactions(orc: ScheduleOrchestrator, ticks: int) -> list:
+    '''
+    Advance orc by up to ticks passes, recording the generic_transaction
+    calls of each router. Returns [[(args, kwargs)] per router].
+
+    Requests do not lock patches, so the calls can be replayed on the
+    board as it is afterwards.
+    '''
+    routers = orc.strategy.routers
+    calls = [[] for _ in routers]
+    for router, router_calls in zip(routers, calls):
+        def recorded(*args, _transaction=router.generic_transaction, _calls=router_calls, **kwargs):
+            _calls.append((args, kwargs))
+            return _transaction(*args, **kwargs)
+        router.generic_transaction = recorded
+
+    try:
+        advance(orc, ticks)
+    finally:
+        for router in routers:
+            del router.generic_transaction
+    return calls
+
+
+def peak_rss_mb() -> float | None:
+    '''
+    Peak resident set size of this process, None where unsupported
+    '''
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / (1 << 20) if sys.platform == 'darwin' else rss / (1 << 10)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n_qubits, depth, fan_in = (list(map(int, argv)) + [8, 20, 2][len(argv):])[:3]
+    obj = synthetic_schedule(n_qubits, depth, fan_in)
+    for template in TEMPLATES:
+        with redirect_stdout(sys.stderr):
+            orc = make_orchestrator(template, obj, n_qubits, prewarm=5)
+            start = perf_counter()
+            orc.schedule()
+            elapsed = perf_counter() - start
+        print(json.dumps({
+            'template': template,
+            'n_qubits': n_qubits,
+            'depth': depth,
+            'fan_in': fan_in,
+            'ticks': orc.time,
+            'seconds': elapsed,
+            'ticks_per_second': orc.time / elapsed,
+            'peak_rss_mb': peak_rss_mb(),
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 from .patch import Patch, PatchType, PatchOrientation
 from .gate import Gate, BaseGate
 from .transaction import Transaction, TransactionList, BaseTransaction
-from .response import ResponseStatus, Response
+from .response import ResponseStatus, Response, FailureReason
 
 __all__ = [
     "Patch",
@@ -13,5 +13,6 @@ __all__ = [
     "TransactionList",
     "BaseTransaction",
     "ResponseStatus",
-    "Response"
+    "Response",
+    "FailureReason"
 ]
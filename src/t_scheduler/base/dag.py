@@ -0,0 +1,231 @@
+from __future__ import annotations
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from .gate import T_Gate
+from .util import redundant_children
+
+
+def _gather(offsets: np.ndarray, index: np.ndarray, nodes: np.ndarray):
+    '''
+    Concatenated CSR rows of nodes, and the position in nodes of each entry
+    '''
+    counts = offsets[nodes + 1] - offsets[nodes]
+    owner = np.repeat(np.arange(len(nodes)), counts)
+    ends = np.cumsum(counts)
+    pos = np.repeat(offsets[nodes] - (ends - counts), counts) + np.arange(ends[-1] if len(ends) else 0)
+    return index[pos], owner
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n: int):
+    # Stable, so each row keeps schedule order
+    order = np.argsort(keys, kind='stable')
+    offsets = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(keys, minlength=n), out=offsets[1:])
+    return offsets, values[order].astype(np.int32)
+
+
+class DagGate(T_Gate):
+    '''
+    T_Gate of a GateDAG, its pre and post gates are materialized on first
+    use
+    '''
+    __slots__ = ('dag', 'idx', '_pre', '_post')
+
+    def __init__(self, dag: GateDAG, idx: int):
+        self.dag = dag
+        self.idx = idx
+        super().__init__(dag.targ_func(idx), 2, 3, targ_orig=idx)
+        self._pre = self._post = None
+        self.weight = float(dag.weight[idx])
+        self.schedule_weight = float(dag.schedule_weight[idx])
+
+    @property
+    def pre(self) -> List[T_Gate]: # type: ignore
+        if self._pre is None:
+            self._pre = self.dag.gates(self.dag.preds(self.idx))
+        return self._pre
+
+    @pre.setter
+    def pre(self, value):
+        self._pre = value
+
+    @property
+    def post(self) -> List[T_Gate]: # type: ignore
+        if self._post is None:
+            self._post = self.dag.gates(self.dag.succs(self.idx))
+        return self._post
+
+    @post.setter
+    def post(self, value):
+        self._post = value
+
+
+class GateDAG:
+    '''
+    Gate DAG of a consumption schedule in CSR form: predecessors of gate i
+    are pred_index[pred_offsets[i]:pred_offsets[i + 1]], likewise for
+    successors, in schedule order. Gate weights are arrays.
+
+    Gate objects (DagGate) are only made when asked for: roots() gives the
+    first layer, and the rest appear as the orchestrator walks post lists
+    of completed gates.
+    '''
+    def __init__(self, n: int, src: np.ndarray, dst: np.ndarray, layers: List[np.ndarray],
+                 targ_func: Callable[[int], int] = lambda x: x):
+        self.n = n
+        self.targ_func = targ_func
+        self.layers = layers
+        self._set_edges(src, dst)
+        self.weight = np.ones(n)
+        self.schedule_weight = np.zeros(n)
+        self._gates: Dict[int, DagGate] = {}
+
+    @staticmethod
+    def from_schedule(obj, targ_func: Callable[[int], int] = lambda x: x, prune: bool = True) -> GateDAG:
+        '''
+        Build from a consumption schedule object, pruned as util.dag_create
+        '''
+        src, dst, layers = [], [], []
+        for input_layer in obj["consumptionschedule"]:
+            layer = []
+            for gate in input_layer:
+                for targ, pre in gate.items():
+                    targ = int(targ)
+                    layer.append(targ)
+                    src.extend(pre)
+                    dst.extend([targ] * len(pre))
+            layers.append(np.array(layer, dtype=np.int32))
+
+        dag = GateDAG(
+            obj["n_qubits"],
+            np.array(src, dtype=np.int32),
+            np.array(dst, dtype=np.int32),
+            layers,
+            targ_func,
+        )
+        if prune:
+            dag.prune()
+        return dag
+
+    def _set_edges(self, src: np.ndarray, dst: np.ndarray):
+        self.src = src
+        self.dst = dst
+        self.succ_offsets, self.succ_index = _csr(src, dst, self.n)
+        self.pred_offsets, self.pred_index = _csr(dst, src, self.n)
+
+    def __len__(self):
+        return self.n
+
+    def preds(self, idx: int) -> np.ndarray:
+        return self.pred_index[self.pred_offsets[idx]:self.pred_offsets[idx + 1]]
+
+    def succs(self, idx: int) -> np.ndarray:
+        return self.succ_index[self.succ_offsets[idx]:self.succ_offsets[idx + 1]]
+
+    def gate(self, idx: int) -> DagGate:
+        if (gate := self._gates.get(idx)) is None:
+            gate = self._gates[idx] = DagGate(self, idx)
+        return gate
+
+    def gates(self, ids) -> List[DagGate]:
+        return [self.gate(idx) for idx in ids.tolist()]
+
+    def roots(self) -> List[DagGate]:
+        return self.gates(self.layers[0])
+
+    def materialized(self) -> List[DagGate]:
+        return list(self._gates.values())
+
+    def reachable(self) -> np.ndarray:
+        '''
+        Mask of gates reachable from the first layer
+        '''
+        mask = np.zeros(self.n, dtype=bool)
+        frontier = np.unique(self.layers[0])
+        mask[frontier] = True
+        while len(frontier):
+            children, _ = _gather(self.succ_offsets, self.succ_index, frontier)
+            frontier = np.unique(children[~mask[children]])
+            mask[frontier] = True
+        return mask
+
+    def levels(self, mask: np.ndarray | None = None) -> np.ndarray:
+        '''
+        Longest path length to each gate (among gates in mask), computed a
+        wave of Kahn's algorithm at a time
+        '''
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        edges = mask[self.src]
+        in_degree = np.bincount(self.dst[edges], minlength=self.n)
+
+        level = np.full(self.n, -1, dtype=np.int32)
+        frontier = np.flatnonzero(mask & (in_degree == 0))
+        wave = 0
+        while len(frontier):
+            level[frontier] = wave
+            children, _ = _gather(self.succ_offsets, self.succ_index, frontier)
+            # ufunc.at rather than a full length bincount, which would cost
+            # O(n) for every wave of a deep, narrow DAG
+            np.subtract.at(in_degree, children, 1)
+            frontier = np.unique(children[in_degree[children] == 0])
+            wave += 1
+        return level
+
+    def prune(self):
+        '''
+        Transitive reduction, dropping the same edges as util.dag_prune
+        '''
+        mask = self.reachable()
+        level = self.levels(mask)
+
+        # Only gates whose children span several levels can have redundant edges
+        edge_level = level[self.succ_index]
+        counts = np.diff(self.succ_offsets)
+        has_children = counts > 0
+        starts = self.succ_offsets[:-1][has_children]
+        lowest = np.zeros(self.n, dtype=np.int32)
+        highest = np.zeros(self.n, dtype=np.int32)
+        lowest[has_children] = np.minimum.reduceat(edge_level, starts)
+        highest[has_children] = np.maximum.reduceat(edge_level, starts)
+        candidates = np.flatnonzero(mask & (counts >= 2) & (lowest < highest))
+
+        offsets = self.succ_offsets.tolist()
+        index = self.succ_index.tolist()
+
+        def succ(idx):
+            return index[offsets[idx]:offsets[idx + 1]]
+
+        removed = []
+        level_list = level.tolist()
+        for idx in candidates.tolist():
+            for child in redundant_children(succ(idx), succ, level_list):
+                removed.append(idx * self.n + child)
+
+        if removed:
+            keep = ~np.isin(self.src.astype(np.int64) * self.n + self.dst, removed)
+            self._set_edges(self.src[keep], self.dst[keep])
+
+    def parse_weights(self):
+        '''
+        schedule_weight of each gate: sum of schedule_weight + weight over
+        its successors. Computed a wave at a time from the sinks up, each
+        wave in one vectorized pass.
+        '''
+        out_degree = np.diff(self.succ_offsets)
+        schedule_weight = np.zeros(self.n)
+        frontier = np.flatnonzero(out_degree == 0)
+        while len(frontier):
+            children, owner = _gather(self.succ_offsets, self.succ_index, frontier)
+            schedule_weight[frontier] = np.bincount(
+                owner, weights=schedule_weight[children] + self.weight[children], minlength=len(frontier))
+
+            parents, _ = _gather(self.pred_offsets, self.pred_index, frontier)
+            np.subtract.at(out_degree, parents, 1)
+            frontier = np.unique(parents[out_degree[parents] == 0])
+
+        self.schedule_weight = schedule_weight
+        for idx, gate in self._gates.items():
+            gate.schedule_weight = float(schedule_weight[idx])
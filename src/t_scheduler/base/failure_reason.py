@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class FailureReason(Enum):
+    '''
+    Why a request was refused
+    '''
+    GATE_TYPE = 0           # Router does not serve this gate type
+    REGISTER_LOCKED = 1
+    ROUTE_BLOCKED = 2       # No free path, or route cells locked
+    NO_T_AVAILABLE = 3
+    BELL_BUSY = 4
+    ROTATION_REJECTED = 5   # T state in the wrong orientation (strategy)
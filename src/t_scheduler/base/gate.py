@@ -29,26 +29,39 @@ class GateType(Enum):
 class BaseGate(ABC):
     """
     Base class for gates
+
+    Fields are slots, subclasses declare their own in __slots__. Subclasses
+    set targ, gate_type and duration, timer etc. default here.
     """
+    __slots__ = (
+        'targ', 'targ_orig', 'timer', 'duration', 'gate_type', 'transaction',
+        'pre', 'post', 'weight', 'schedule_weight', 'flag', 'vol_tag',
+    )
 
     targ: int
     targ_orig: int
-    timer: int = 0
-    duration: int = 0
+    timer: int
+    duration: int
     gate_type: GateType
     transaction: None | BaseTransaction
 
     pre: List[BaseGate]
     post: List[BaseGate]
-    weight: float = 1
-    schedule_weight: float = 0
-    flag: Any = None
+    weight: float
+    schedule_weight: float
+    flag: Any
 
-    vol_tag: SpaceTimeVolumeTrackingTag | None = None
+    vol_tag: SpaceTimeVolumeTrackingTag | None
 
     def __init__(self):
         self.pre = []
         self.post = []
+        self.timer = 0
+        self.transaction = None
+        self.weight = 1
+        self.schedule_weight = 0
+        self.flag = None
+        self.vol_tag = None
 
     def available(self):
         raise NotImplementedError()
@@ -59,6 +72,18 @@ class BaseGate(ABC):
         """
         self.timer += 1
 
+    def idle_cycles(self) -> int:
+        """
+        Number of upcoming ticks that cannot complete this gate.
+        """
+        return self.duration - self.timer - 1
+
+    def skip(self, cycles: int):
+        """
+        Fast-forward over idle ticks (see idle_cycles).
+        """
+        self.timer += cycles
+
     def completed(self) -> bool:
         """
         Returns if gate has completed, and is ready to be retired.
@@ -85,11 +110,14 @@ class BaseGate(ABC):
 
 
 class Gate(BaseGate):
+    __slots__ = ()
+
     def __init__(self, targ, gate_type, duration: int):
         self.targ = targ
         self.targ_orig = targ
         self.gate_type = gate_type
         self.duration = duration
+        super().__init__()
 
     def available(self):
         return all(g.completed() for g in self.pre)
@@ -103,20 +131,12 @@ class Gate(BaseGate):
         if self.completed():
             self.transaction.unlock() # type: ignore
             self.transaction.release(scheduler.time) # type: ignore
-            if hasattr(self, "vol_tag") and self.vol_tag:
+            if self.vol_tag:
                     self.vol_tag.end(offset=1)
 
 
 class T_Gate(BaseGate):
-    targ: int
-    targ_orig: int
-    timer: int = 0
-    duration: int = 0
-
-    pre: List[BaseGate]
-    post: List[BaseGate]
-    weight: float = 1
-    schedule_weight: float = 0
+    __slots__ = ('correction_duration', 'state')
 
     def __init__(
         self,
@@ -160,7 +180,7 @@ class T_Gate(BaseGate):
 
 
     
-        if getattr(t_trans.magic_state_patch, "curr_t_tag", None) is not None:
+        if t_patch is not None and t_patch.curr_t_tag is not None:
             # TODO impl for prefilled buffer T
             # print("trigger apply for", self)
             old_t_tag = t_patch.curr_t_tag
@@ -199,10 +219,9 @@ class T_Gate(BaseGate):
 
 
 class MoveGate(BaseGate):
-    targ: str
-    timer: int = 0
-    duration: int
+    __slots__ = ('move_target', 'curr_t_tag')
 
+    targ: str # type: ignore
     move_target: None | Patch
 
     def __init__(self, move_duration: int = MOVE_T_NONLOCAL_DELAY):
@@ -210,6 +229,7 @@ class MoveGate(BaseGate):
         self.gate_type: GateType = GateType.IMPLEMENTATION_DEFINED
         self.duration = move_duration
         self.move_target = None
+        self.curr_t_tag = None
         super().__init__()
 
     def available(self):
@@ -262,16 +282,8 @@ class MoveGate(BaseGate):
 
 
 class RotateGate(BaseGate):
-    targ: int
-    timer: int = 0
-    duration: int = 0
-
-    pre: List[BaseGate]
-    post: List[BaseGate]
-    weight: float = 1
-    schedule_weight: float = 0
+    __slots__ = ('t_patch', 'lock', 'completed_at')
 
-    transaction: BaseTransaction | None
     def __init__(
         self,
         t_patch: Patch,
@@ -318,3 +330,4 @@ class RotateGate(BaseGate):
         '''
         if self.completed():
             self.t_patch.orientation = self.t_patch.orientation.inverse()
+            self.t_patch.changed()
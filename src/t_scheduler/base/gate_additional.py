@@ -3,12 +3,9 @@ from typing import Tuple
 from .gate import *
 
 class GSPrepGate(BaseGate):
-    targs: Tuple[int, ...]
-    timer: int = 0
-    duration: int = 0
+    __slots__ = ('targs', 'correction_duration', 'state')
 
-    pre: List[GSPrepGate]
-    post: List[GSPrepGate]
+    targs: Tuple[int, ...]
 
     def __init__(
         self,
@@ -62,12 +59,7 @@ class GSPrepGate(BaseGate):
 
 
 class BellGate(BaseGate):
-    targ: int
-    timer: int = 0
-    duration: int = 0
-
-    pre = tuple() # type: ignore
-    post = tuple() # type: ignore
+    __slots__ = ('correction_duration', 'state')
 
     def __init__(
         self,
@@ -87,6 +79,8 @@ class BellGate(BaseGate):
         self.state = "JOINT"
 
         super().__init__()
+        self.pre = tuple() # type: ignore
+        self.post = tuple() # type: ignore
 
     def available(self) -> bool:
         return all(g.completed() for g in self.pre)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+from typing import List
+
+import numpy as np
+
+from .patch import Patch
+
+
+class OccupancyGrid:
+    '''
+    Packed per-cell availability flags for a widget board.
+
+    flags[y, x] mirrors locked(), route_available() and T_available() of
+    board[y][x] as the LOCKED, ROUTE and T bits. Patches publish every
+    change of these (see Patch.subscribe), so the grid is always in sync
+    and routers can answer row/column queries with vectorised scans.
+    n_T counts the cells with the T bit set.
+    '''
+    LOCKED = 1
+    ROUTE = 2
+    T = 4
+
+    def __init__(self, board: List[List[Patch]]):
+        width = max((len(row) for row in board), default=0)
+        self.flags = np.zeros((len(board), width), dtype=np.uint8)
+        self._flat = self.flags.reshape(-1)
+        self.n_T = 0
+
+        for row in board:
+            for patch in row:
+                self.sync(patch)
+                patch.subscribe(self.sync)
+
+    def __getstate__(self):
+        return {'flags': self.flags}
+
+    def __setstate__(self, state):
+        # _flat must stay a view of flags, which pickling does not keep
+        self.flags = state['flags']
+        self._flat = self.flags.reshape(-1)
+        self.n_T = int(np.count_nonzero(self.flags & self.T))
+
+    @staticmethod
+    def patch_flags(patch: Patch) -> int:
+        return (
+            OccupancyGrid.LOCKED * patch.locked()
+            | OccupancyGrid.ROUTE * patch.route_available()
+            | OccupancyGrid.T * patch.T_available()
+        )
+
+    def sync(self, patch: Patch):
+        flags = self.patch_flags(patch)
+        self.n_T += bool(flags & self.T) - bool(self.flags[patch.y, patch.x] & self.T)
+        self.flags[patch.y, patch.x] = flags
+
+    def local_index(self, region) -> np.ndarray:
+        '''
+        Flat indices into flags, laid out as region[row, col]
+
+        region may be a WidgetRegion or a rotated local_view
+        '''
+        width = self.flags.shape[1]
+        return np.array([
+            [region[r, c].y * width + region[r, c].x for c in range(region.width)]
+            for r in range(region.height)
+        ], dtype=np.intp).reshape(region.height, region.width)
+
+    def take(self, index: np.ndarray) -> np.ndarray:
+        '''
+        Current flags at the given flat indices (see local_index)
+        '''
+        return self._flat[index]
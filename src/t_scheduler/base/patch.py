@@ -1,6 +1,6 @@
 from __future__ import annotations
 from enum import Enum, IntEnum
-from typing import List
+from typing import Callable, List
 
 from ..tracker import *
 
@@ -33,6 +33,8 @@ class PatchLock:
         Container class for holding references between a gate
         and patches it is currently acting over
     '''
+    __slots__ = ('owner', 'holds')
+
     def __init__(self, owner, holds: List[Patch]):
         self.owner = owner
         self.holds = holds
@@ -46,6 +48,7 @@ class PatchLock:
 
         for patch in self.holds:
             patch.lock = self
+            patch.changed()
 
         return True
 
@@ -56,6 +59,7 @@ class PatchLock:
         for patch in self.holds:
             if patch.lock is self:
                 patch.lock = None
+                patch.changed()
         self.owner = None
 
 
@@ -64,7 +68,15 @@ class Patch:
     Holds state and purpose of each patch on the device
 
     Important: row, col are local coordinates in a WidgetRegion!
+
+    Boards hold millions of patches, so every field is a slot: subclasses
+    declare theirs in __slots__ too.
     '''
+    __slots__ = (
+        'patch_type', 'local_y', 'local_x', 'x', 'y', 'lock', 'orientation',
+        'used', 'release_time', 'rotation', 'reg_vol_tag', 'listeners', 'curr_t_tag',
+    )
+
     patch_type: PatchType
     local_x: int
     local_y: int
@@ -72,7 +84,13 @@ class Patch:
     x: int # Global positions -- initialised by make_explicit
     y: int
 
-    reg_vol_tag: SpaceTimeVolumeTrackingTag | None = None
+    reg_vol_tag: SpaceTimeVolumeTrackingTag | None
+
+    # Change subscribers, see subscribe()
+    listeners: List[Callable[[Patch], None]]
+
+    # Volume tracking context of the T state held, if any
+    curr_t_tag: SpaceTimeVolumeTrackingContext | None
 
     def __init__(
         self,
@@ -89,6 +107,9 @@ class Patch:
         self.used = False
         self.release_time = None
         self.rotation = None
+        self.reg_vol_tag = None
+        self.listeners = () # type: ignore
+        self.curr_t_tag = None
 
     def __repr__(self):
         return f"P({self.local_y}, {self.local_x})"
@@ -96,6 +117,23 @@ class Patch:
     def locked(self):
         return self.lock is not None
 
+    def subscribe(self, callback: Callable[[Patch], None]):
+        '''
+        Call callback(patch) whenever our lock, patch_type, orientation
+        or T availability changes
+        '''
+        if not self.listeners:
+            self.listeners = []
+        self.listeners.append(callback)
+
+    def changed(self):
+        '''
+        Publish a change of lock, patch_type, orientation or T availability
+        to subscribers
+        '''
+        for callback in self.listeners:
+            callback(self)
+
     def T_available(self):
         '''
         Available to be used as a T state?
@@ -123,6 +161,7 @@ class Patch:
         '''
         if self.patch_type == PatchType.T:
             self.used = True
+            self.changed()
         elif self.used:
             raise Exception("T already used!")
         else:
@@ -137,14 +176,16 @@ class Patch:
         self.used = False
         self.release_time = time
         self.patch_type = PatchType.ROUTE
+        self.changed()
 
 
 class BufferPatch(Patch):
     '''
     Mutable patch that can be transformed into a T patch.
     '''
+    __slots__ = ()
+
     def __init__(self, row: int, col: int, starting_orientation=PatchOrientation.Z_TOP):
-        self.curr_t_tag = None
         super().__init__(PatchType.ROUTE_BUFFER, row, col, starting_orientation)
 
     def store(self):
@@ -153,6 +194,7 @@ class BufferPatch(Patch):
         '''
         if not self.locked():
             self.patch_type = PatchType.T
+            self.changed()
     
     def release(self, time):
         '''
@@ -162,6 +204,7 @@ class BufferPatch(Patch):
         '''
         super().release(time)
         self.patch_type = PatchType.ROUTE_BUFFER
+        self.changed()
 
 
 class TFactoryOutputPatch(Patch):
@@ -170,6 +213,8 @@ class TFactoryOutputPatch(Patch):
 
     Factory updates are taken care of in the component.
     '''
+    __slots__ = ('t_count', 'factory')
+
     def __init__(
         self,
         row: int,
@@ -186,7 +231,6 @@ class TFactoryOutputPatch(Patch):
 
         self.t_count = 0
         self.factory = factory
-        self.curr_t_tag = None
 
     def T_available(self):
         return (self.t_count > 0) and not self.locked()
@@ -205,6 +249,7 @@ class TFactoryOutputPatch(Patch):
         '''
         if self.t_count > 0:
             self.t_count -= 1
+            self.changed()
         else:
             raise Exception("No T available to use!")
     
@@ -218,6 +263,8 @@ class TCultPatch(Patch):
     '''
     Cultivator patch
     '''
+    __slots__ = ('has_T', 'cultivator', 'vol_tracker')
+
     def __init__(self, row: int, col: int, starting_orientation=PatchOrientation.Z_TOP):
         super().__init__(
             PatchType.CULTIVATOR, row, col, starting_orientation=starting_orientation
@@ -227,7 +274,6 @@ class TCultPatch(Patch):
         # TODO take this as an argument?
         self.cultivator = TCultivator()
         self.vol_tracker = None
-        self.curr_t_tag = None
 
     def T_available(self):
         return self.has_T and not self.locked()
@@ -244,17 +290,37 @@ class TCultPatch(Patch):
         Ask the cultivator if a T was produced.
         '''
         if not self.has_T and not self.locked():
-            self.has_T = self.cultivator() > 0
-            if self.has_T:
-                self.curr_t_tag = SpaceTimeVolumeTrackingContext(self.vol_tracker)
-                self.curr_t_tag.factory_tag = TFactorySpaceTimeVolumeTrackingTag(self.vol_tracker, self.cultivator)
-                self.curr_t_tag.source_tag = TSourceTrackingTag(self.vol_tracker, type(self).__qualname__)
+            if self.cultivator() > 0:
+                self.store_T()
                 return True
         return False
 
+    def store_T(self):
+        '''
+        Mark a freshly cultivated T as held by this patch.
+        '''
+        self.has_T = True
+        self.changed()
+        self.curr_t_tag = SpaceTimeVolumeTrackingContext(self.vol_tracker)
+        self.curr_t_tag.factory_tag = TFactorySpaceTimeVolumeTrackingTag(self.vol_tracker, self.cultivator)
+        self.curr_t_tag.source_tag = TSourceTrackingTag(self.vol_tracker, type(self).__qualname__)
+
+    def idle_cycles(self):
+        '''
+        Number of upcoming update calls that cannot produce a T.
+        '''
+        if self.has_T or self.locked():
+            return float('inf')
+        return self.cultivator.idle_cycles()
+
+    def skip(self, cycles: int):
+        if not self.has_T and not self.locked():
+            self.cultivator.skip(cycles)
+
     def use(self):
         if self.has_T:
             self.has_T = False
+            self.changed()
         else:
             raise Exception("No T available to use!")
 
@@ -0,0 +1,139 @@
+from __future__ import annotations
+from itertools import count
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
+from .gate import BaseGate
+
+
+def unlocked(patch) -> bool:
+    return not patch.locked()
+
+
+def T_available(patch) -> bool:
+    return patch.T_available()
+
+
+def any_change(patch) -> bool:
+    return True
+
+
+class _Watch:
+    '''
+    Patch listener that wakes the gates parked on a (resource, wake
+    condition) key
+    '''
+    __slots__ = ('queue', 'key')
+
+    def __init__(self, queue: ReadyQueue, key):
+        self.queue = queue
+        self.key = key
+
+    def __call__(self, patch):
+        queue = self.queue
+        if self.key in queue.blocked and queue.wake_on[self.key](patch):
+            queue.woken.add(self.key)
+
+
+class ReadyQueue:
+    '''
+    Ordered queue of gates whose predecessors have all retired.
+
+    Gates that fail allocation while a resource they need is held are
+    parked against that resource and only offered again once one of its
+    patches publishes a change that could let them through (see
+    Patch.subscribe). Parked gates keep their original queue position, so
+    allocation order is the same as retrying every gate on every pass.
+
+    Resources are anything with subscribe(), e.g. a register Patch or a
+    WidgetRegion. Gates are parked by (resource, wake condition) keys, so
+    gates waiting on the same resource for different changes do not
+    share a condition.
+    '''
+    def __init__(self, gates: Iterable[BaseGate] = tuple()):
+        self._counter = count()
+        self.order: Dict[BaseGate, int] = {}
+        self.ready: List[BaseGate] = []
+        # Parked gates by key, and the keys of each parked gate
+        self.blocked: Dict[Hashable, Dict[BaseGate, None]] = {}
+        self.parked: Dict[BaseGate, Tuple[Hashable, ...]] = {}
+        # Wake condition of each key we listen to, and the keys that met
+        # theirs since the last drain()
+        self.wake_on: Dict[Hashable, Callable] = {}
+        self.woken = set()
+        self.extend(gates)
+
+    def append(self, gate: BaseGate):
+        '''
+        Queue a gate at the back of the queue. No-op if already queued.
+        '''
+        if gate in self.order:
+            return
+        self.order[gate] = next(self._counter)
+        self.ready.append(gate)
+
+    def extend(self, gates: Iterable[BaseGate]):
+        for gate in gates:
+            self.append(gate)
+
+    def block(self, gate: BaseGate, *resources, wake: Callable = unlocked):
+        '''
+        Park a queued gate until one of resources has a patch change for
+        which wake(patch) holds, by default one that leaves it unlocked.
+        '''
+        keys = self.parked[gate] = tuple((resource, wake) for resource in dict.fromkeys(resources))
+        for key in keys:
+            self.blocked.setdefault(key, {})[gate] = None
+            if key not in self.wake_on:
+                key[0].subscribe(_Watch(self, key))
+                self.wake_on[key] = wake
+
+    def retry(self, gate: BaseGate):
+        '''
+        Keep a queued gate that failed allocation for the next pass.
+        '''
+        self.ready.append(gate)
+
+    def discard(self, gate: BaseGate):
+        '''
+        Drop a gate handed out by drain() from the queue.
+        '''
+        del self.order[gate]
+
+    def _wake(self):
+        for key in self.woken:
+            for gate in self.blocked.pop(key, ()):
+                for other in self.parked.pop(gate):
+                    if other != key:
+                        self.blocked[other].pop(gate)
+                        if not self.blocked[other]:
+                            del self.blocked[other]
+                self.ready.append(gate)
+        self.woken.clear()
+
+    def drain(self) -> List[BaseGate]:
+        '''
+        Take all gates that can be attempted this pass, in queue order.
+
+        Caller must hand every gate back with retry(), block() or discard().
+        '''
+        woken = bool(self.woken)
+        if woken:
+            self._wake()
+
+        candidates = self.ready
+        if woken:
+            candidates.sort(key=self.order.__getitem__)
+        self.ready = []
+        return candidates
+
+    def __len__(self):
+        return len(self.order)
+
+    def __bool__(self):
+        return bool(self.order)
+
+    def __contains__(self, gate):
+        return gate in self.order
+
+    def __iter__(self):
+        return iter(sorted(self.order, key=self.order.__getitem__))
@@ -1,5 +1,6 @@
-from enum import Enum, IntEnum
+from enum import IntEnum
 from .transaction import Transaction, TransactionList
+from .failure_reason import FailureReason
 
 class ResponseStatus(IntEnum):
     FAILED = 0
@@ -7,12 +8,19 @@ class ResponseStatus(IntEnum):
     SUCCESS = 2
 
 class Response:
+    __slots__ = ('status', 'transaction', 'reason', 'downstream_patch', 'upstream_patch')
+
     status: ResponseStatus
     transaction: Transaction | TransactionList | None
+    reason: FailureReason | None
 
-    def __init__(self, status=ResponseStatus.FAILED, transaction=None) -> None:
+    def __init__(self, status=ResponseStatus.FAILED, transaction=None, reason=None) -> None:
+        '''
+        reason: FailureReason of a FAILED response
+        '''
         self.status = status
         self.transaction = transaction
+        self.reason = reason
         if transaction:
             self.downstream_patch = transaction.move_patches[0]
             self.upstream_patch = transaction.move_patches[-1]
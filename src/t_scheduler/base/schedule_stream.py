@@ -0,0 +1,195 @@
+from __future__ import annotations
+import json
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from .gate import T_Gate
+
+
+class ScheduleStream:
+    '''
+    Reads a schedule object from a JSON file one consumptionschedule layer
+    at a time, so the whole document never sits in memory. Works on any
+    JSON layout; files written one layer per line (see
+    t_scheduler.synthetic) read a line at a time.
+
+    Scalar top-level values (n_qubits etc.) are kept in header as they
+    are passed, other values are decoded and dropped.
+    '''
+    def __init__(self, source, chunk_size: int = 1 << 20):
+        '''
+        source: path or text file
+        '''
+        self.owned = isinstance(source, str)
+        self.file = open(source) if self.owned else source
+        self.chunk_size = chunk_size
+        self.header = {}
+
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        data = self.file.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill(self.chunk_size):
+                return self.buf[self.pos:self.pos + 1]
+
+    def _expect(self, chars: str) -> str:
+        c = self._peek()
+        if not c or c not in chars:
+            raise ValueError(f'Malformed schedule: expected one of {chars!r}, found {c!r}')
+        self.pos += 1
+        return c
+
+    def _value(self):
+        self._peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may continue in the file
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads so a long value is decoded a bounded number of times
+            self._fill(size)
+            size *= 2
+
+    def layers(self) -> Iterator[List[dict]]:
+        '''
+        Yield each layer of consumptionschedule, a list of {gate: [pre]}
+        '''
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'consumptionschedule':
+                self._expect('[')
+                if self._peek() != ']':
+                    while True:
+                        yield self._value()
+                        if self._expect(',]') == ']':
+                            break
+                else:
+                    self.pos += 1
+            else:
+                value = self._value()
+                if not isinstance(value, (dict, list)):
+                    self.header[key] = value
+            if self._expect(',}') == '}':
+                break
+        if self.owned:
+            self.file.close()
+
+
+class StreamingLoader:
+    '''
+    Creates the gates of a consumption schedule a layer at a time, just
+    ahead of a ScheduleOrchestrator, so only a window of the DAG is ever
+    in memory.
+
+    Layers are read while fewer than lookahead gates are loaded and not
+    yet retired. Gates whose predecessors have all retired go straight
+    into the orchestrator's queue, the rest are added to the post lists of
+    their live predecessors and queued by ScheduleOrchestrator.retire as
+    usual. Retired gates drop their pre and post lists and leave
+    orc.processed, and only a byte per gate id is kept to know they are
+    done.
+
+    Edges are not pruned as in util.dag_create: redundant edges do not
+    change when gates are queued, so the schedule is the same. Gates
+    carry no schedule_weight, which needs the rest of the DAG.
+
+    Usage:
+        loader = StreamingLoader(ScheduleStream(path).layers(), targ_func)
+        hooks = HookRegistry(timed=False)
+        loader.attach(hooks)
+        orc = ScheduleOrchestrator(loader.roots(), widget, strategy, hooks=hooks)
+    '''
+    def __init__(self, layers: Iterable[List[dict]],
+                 targ_func: Callable[[int], int] = lambda x: x, lookahead: int = 4096):
+        self.layers = iter(layers)
+        self.targ_func = targ_func
+        self.lookahead = lookahead
+
+        # Loaded gates that have not retired, by id
+        self.live: Dict[int, T_Gate] = {}
+        self.retired = bytearray()
+        self.loaded = 0
+        self.exhausted = False
+
+    def _is_retired(self, idx: int) -> bool:
+        return idx < len(self.retired) and self.retired[idx]
+
+    def load(self) -> List[T_Gate]:
+        '''
+        Read layers until lookahead gates are live, returning the new gates
+        that are ready to be queued
+        '''
+        ready = []
+        while not self.exhausted and len(self.live) < self.lookahead:
+            if (layer := next(self.layers, None)) is None:
+                self.exhausted = True
+                break
+
+            for entry in layer:
+                for targ, pre in entry.items():
+                    targ = int(targ)
+                    if targ in self.live or self._is_retired(targ):
+                        raise ValueError(f'Gate {targ} appears twice in the schedule')
+                    gate = T_Gate(self.targ_func(targ), 2, 3, targ_orig=targ)
+                    for q in pre:
+                        if (parent := self.live.get(q)) is not None:
+                            gate.pre.append(parent)
+                            parent.post.append(gate)
+                        elif not self._is_retired(q):
+                            raise ValueError(f'Gate {targ} consumes gate {q} before it is scheduled')
+                    self.live[targ] = gate
+                    self.loaded += 1
+                    if not gate.pre:
+                        ready.append(gate)
+        return ready
+
+    def roots(self) -> List[T_Gate]:
+        return self.load()
+
+    def attach(self, hooks):
+        '''
+        Register with a tracker.HookRegistry passed to the orchestrator
+        '''
+        hooks.register('on_gate_retire', self.on_gate_retire)
+
+    def on_gate_retire(self, orc, gate):
+        # Also called for gates the strategy made, e.g. rotations
+        idx = getattr(gate, 'targ_orig', None)
+        if idx is not None and self.live.get(idx) is gate:
+            del self.live[idx]
+            if idx >= len(self.retired):
+                self.retired.extend(bytes(max(idx + 1, 2 * len(self.retired)) - len(self.retired)))
+            self.retired[idx] = 1
+            # retire() has already queued the successors
+            gate.pre = []
+            gate.post = []
+            orc.processed.discard(gate)
+
+        if len(self.live) < self.lookahead:
+            orc.queued.extend(self.load())
+
+    def done(self) -> bool:
+        return self.exhausted and not self.live
@@ -6,6 +6,8 @@ from .patch import Patch, PatchLock
 
 
 class BaseTransaction(ABC):
+    __slots__ = ()
+
     def lock_move(self, gate) -> None:
         """
         Lock a transaction based on move_patches.
@@ -49,6 +51,12 @@ class Transaction(BaseTransaction):
 
     Some convenience methods here.
     '''
+    __slots__ = (
+        'move_patches', 'measure_patches', 'lock', 'connect_col', 'magic_state_patch',
+        'on_unlock_callback', 'on_activate_callback', 'on_release_callback',
+        'layout_override', 'active_cells',
+    )
+
     move_patches: List[Patch]
     measure_patches: List[Patch]
     magic_state_patch: Patch | None
@@ -57,6 +65,7 @@ class Transaction(BaseTransaction):
 
     on_unlock_callback: None | Callable[[Transaction]]
     on_activate_callback: None | Callable[[Transaction]]
+    on_release_callback: None | Callable[[Transaction]]
 
     def __init__(
         self,
@@ -87,7 +96,7 @@ class Transaction(BaseTransaction):
 
         if self.on_activate_callback:
             self.on_activate_callback(self)
-            del self.on_activate_callback
+            self.on_activate_callback = None
 
     def release(self, time):
         if self.magic_state_patch:
@@ -95,7 +104,7 @@ class Transaction(BaseTransaction):
 
         if self.on_release_callback is not None:
             self.on_release_callback(self)
-            del self.on_release_callback
+            self.on_release_callback = None
 
     def lock_move(self, gate):
         assert self.lock is None
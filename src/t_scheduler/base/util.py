@@ -70,6 +70,16 @@ def make_gates(obj, func=lambda x: x):
 
 
 def dag_create(obj, gates):
+    dag_layers = dag_link(obj, gates)
+    # print(dag_layers)
+    dag_prune(dag_layers, gates)  # type: ignore
+    return dag_layers, gates
+
+
+def dag_link(obj, gates):
+    '''
+    Fill pre and post of gates from the consumption schedule, unpruned
+    '''
     dag_layers = []
     for input_layer in obj["consumptionschedule"]:
         layer = []
@@ -81,37 +91,81 @@ def dag_create(obj, gates):
                     gates[targ].pre.append(gates[q])
                     gates[q].post.append(gates[targ])
         dag_layers.append(layer)
-    # print(dag_layers)
-    dag_prune(dag_layers, gates)  # type: ignore
-    return dag_layers, gates
+    return dag_layers
 
 
 def dag_prune(dag_layers: List[List[T_Gate]], gates: List[T_Gate]):
-    for g in gates:
-        g.post_discard = set()  # type: ignore
-    base_layer = dag_layers[0]
-    seen = set()
-    stack = [(g, 0) for g in base_layer]
+    '''
+    Transitive reduction: drop each edge a -> b for which b can also be
+    reached from a through a longer path. Only edges out of gates reachable
+    from dag_layers[0] are considered.
+
+    Gates are numbered in topological order and given a level, the length
+    of the longest path to them. b is only reachable through another child
+    c of a if level(c) < level(b), so each gate searches forward from its
+    children only up to the level of its deepest child, and skips the
+    search when all children share a level. This is linear in the DAG
+    when edges span a bounded number of levels, as in layered schedules.
+    '''
+    # Gates reachable from the first layer, numbered
+    index = {}
+    order = []
+    stack = list(dag_layers[0])
     while stack:
-        curr, gate_idx = stack.pop()
-        if gate_idx == 0:
-            seen.add(curr)
-        if gate_idx >= len(curr.post):
-            seen.remove(curr)
+        gate = stack.pop()
+        if gate in index:
             continue
-        stack.append((curr, gate_idx + 1))
-
-        gate = curr.post[gate_idx]  # type: ignore
-        redundant = set(gate.pre) & seen
-        redundant.discard(curr)
-        for extra in redundant:
-            extra.post_discard.add(gate)  # type: ignore
-            gate.pre.remove(extra)
-        stack.append((gate, 0))  # type: ignore
-
-    for g in gates:
-        g.post = [x for x in g.post if x not in g.post_discard]  # type: ignore
-        del g.post_discard  # type: ignore
+        index[gate] = len(order)
+        order.append(gate)
+        stack.extend(gate.post)
+
+    succ = [[index[g] for g in gate.post] for gate in order]
+    in_degree = [0] * len(order)
+    for children in succ:
+        for c in children:
+            in_degree[c] += 1
+
+    # Kahn's algorithm: longest path levels
+    level = [0] * len(order)
+    ready = [i for i, d in enumerate(in_degree) if d == 0]
+    while ready:
+        i = ready.pop()
+        for c in succ[i]:
+            level[c] = max(level[c], level[i] + 1)
+            in_degree[c] -= 1
+            if in_degree[c] == 0:
+                ready.append(c)
+
+    removed = {}
+    for i, children in enumerate(succ):
+        if len(children) >= 2 and (redundant := redundant_children(children, succ.__getitem__, level)):
+            removed[i] = redundant
+
+    for i, redundant in removed.items():
+        gate = order[i]
+        gate.post = [g for g in gate.post if index[g] not in redundant]
+        for c in redundant:
+            child = order[c]
+            child.pre = [g for g in child.pre if g is not gate]
+
+
+def redundant_children(children, succ, level) -> set:
+    '''
+    Children reachable from another child, searching forward from the
+    children up to the level of the deepest one (see dag_prune)
+
+    succ: gate id -> ids of its children
+    '''
+    bound = max(level[c] for c in children)
+    stack = [c for c in children if level[c] < bound]
+    reached = set()
+    while stack:
+        for c in succ(stack.pop()):
+            if level[c] <= bound and c not in reached:
+                reached.add(c)
+                if level[c] < bound:
+                    stack.append(c)
+    return reached.intersection(children)
 
 
 def topological_sort(dag_roots):
@@ -0,0 +1,194 @@
+'''
+Checkpoints of a ScheduleOrchestrator's board between prewarm and
+schedule, so many runs can share one prewarm
+
+A checkpoint holds the widget (patches, locks, factories, cultivators
+and their RNGs), the strategy and its routers, the gates in flight, the
+volume tracker and failure counters, and the clock, as one compressed
+pickle. The consumption schedule is not part of it: each restore takes
+its own DAG roots. Checkpoints are plain bytes underneath, so they can be
+saved to disk or sent to multiprocessing workers.
+
+A CheckpointCache keeps checkpoints on disk across processes, so
+ScheduleOrchestrator.prewarm can restore a board it has prewarmed before.
+
+Usage:
+    orc.prewarm(1000)
+    checkpoint = orc.checkpoint()
+    for roots in schedules:
+        run = ScheduleOrchestrator.from_checkpoint(checkpoint, roots)
+        run.schedule()
+
+    cache = CheckpointCache('prewarm_cache')
+    orc.prewarm(1000, cache=cache, key=template_params)
+'''
+from __future__ import annotations
+import hashlib
+import io
+import json
+import os
+import pickle
+import tempfile
+import zlib
+from typing import Dict, Tuple
+
+# Checkpoints are pickles of class internals: bump when those change, so
+# cached checkpoints of older layouts are not restored into newer classes
+FORMAT_VERSION = 2
+
+
+class CheckpointError(ValueError):
+    '''
+    A checkpoint that can't be loaded, e.g. one of an older code version
+    '''
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, roots: dict):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.root_ids = {id(obj): name for name, obj in roots.items()}
+
+    def persistent_id(self, obj):
+        return self.root_ids.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file):
+        super().__init__(file)
+        self.roots = {}
+
+    def persistent_load(self, pid):
+        if pid not in self.roots:
+            raise pickle.UnpicklingError(f'Unknown persistent id: {pid}')
+        return self.roots[pid]
+
+
+class Checkpoint:
+    '''
+    Compressed snapshot of an orchestrator's board state, see capture()
+    '''
+    def __init__(self, data: bytes):
+        self.data = data
+
+    @staticmethod
+    def capture(roots: Dict[str, object], state: dict) -> Checkpoint:
+        '''
+        Snapshot state, keeping its references to the objects in roots
+        symbolic, by name. The roots themselves are not captured, state
+        should hold whatever of them is needed (e.g. their __dict__).
+        '''
+        buf = io.BytesIO()
+        pickler = _Pickler(buf, roots)
+        pickler.dump({name: type(obj) for name, obj in roots.items()})
+        pickler.dump(state)
+        return Checkpoint(zlib.compress(buf.getvalue()))
+
+    def load(self, **roots) -> Tuple[Dict[str, object], dict]:
+        '''
+        Fresh copy of the captured state, with references to the captured
+        roots pointing at the objects given by name instead, or at new,
+        uninitialised instances of their classes
+
+        Returns the roots and the state
+        '''
+        try:
+            unpickler = _Unpickler(io.BytesIO(zlib.decompress(self.data)))
+            classes = unpickler.load()
+            unpickler.roots = {
+                name: roots[name] if name in roots else cls.__new__(cls)
+                for name, cls in classes.items()
+            }
+            return unpickler.roots, unpickler.load()
+        except Exception as e:
+            raise CheckpointError(f'Unreadable checkpoint: {e!r}') from e
+
+    def __len__(self):
+        return len(self.data)
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+    @staticmethod
+    def open(path: str) -> Checkpoint:
+        with open(path, 'rb') as f:
+            return Checkpoint(f.read())
+
+
+class CheckpointCache:
+    '''
+    Directory of checkpoints addressed by a hash of the JSON key they were
+    stored under, least recently used first out once the directory holds
+    more than max_bytes. Safe to share between processes: entries are
+    written atomically, and a reader racing an eviction just misses.
+    '''
+    SUFFIX = '.ckpt'
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def digest(key) -> str:
+        text = json.dumps(key, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key) -> str:
+        return os.path.join(self.directory, self.digest(key) + self.SUFFIX)
+
+    def get(self, key) -> Checkpoint | None:
+        path = self.path(key)
+        try:
+            checkpoint = Checkpoint.open(path)
+        except FileNotFoundError:
+            return None
+        try:
+            # Modification times order entries for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted since, but we have read it already
+            pass
+        return checkpoint
+
+    def put(self, key, checkpoint: Checkpoint):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(checkpoint.data)
+        os.replace(tmp, self.path(key))
+        self.evict()
+
+    def entries(self):
+        '''
+        (mtime, size, path) of each entry, oldest first
+        '''
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(entries)
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        '''
+        Remove the least recently used entries until the cache fits in
+        max_bytes, always keeping the newest
+        '''
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
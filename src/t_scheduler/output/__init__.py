@@ -0,0 +1,26 @@
+from .sinks import FrameSink, TextSink, TexFileSink, AsyncFrameSink
+from .frame_writer import NDJSONFrameWriter, header_record, layer_record, read_frames, load_frames_json
+from .delta_frames import DeltaFrameEncoder, DeltaFrameReader
+from .trace import TraceRecorder
+from .tikz_render import TikzTrace, TikzRenderer
+from .snapshot import BoardSnapshot, BoardSnapshotter, SnapshotFormatter
+
+__all__ = [
+    "FrameSink",
+    "TextSink",
+    "TexFileSink",
+    "AsyncFrameSink",
+    "NDJSONFrameWriter",
+    "header_record",
+    "layer_record",
+    "read_frames",
+    "load_frames_json",
+    "DeltaFrameEncoder",
+    "DeltaFrameReader",
+    "TraceRecorder",
+    "TikzTrace",
+    "TikzRenderer",
+    "BoardSnapshot",
+    "BoardSnapshotter",
+    "SnapshotFormatter",
+]
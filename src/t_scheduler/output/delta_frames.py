@@ -0,0 +1,189 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+import json
+from typing import Dict, Iterator, List, Tuple
+
+
+class DeltaFrameEncoder:
+    '''
+    Encodes per-tick board frames as keyframes plus deltas.
+
+    Every keyframe_interval ticks a full 'key' record is emitted (same
+    board/gates layout as Widget.save_json_patches_state). In between,
+    'delta' records only carry:
+        cells: [row, col, cell json] of cells whose json changed
+        gates: gate json of gates that started or changed holds / timer
+        finished: ids of gates that no longer hold any cell
+
+    Changed cells are found through patch change events, so a delta costs
+    O(changed cells + active gates) rather than O(board area).
+    '''
+    def __init__(self, widget, keyframe_interval: int = 100):
+        self.widget = widget
+        self.keyframe_interval = keyframe_interval
+        if not hasattr(widget, 'adapter'):
+            widget.make_coordinate_adapter()
+
+        self.dirty = set()
+        for row in widget.board:
+            for cell in row:
+                cell.subscribe(self.dirty.add)
+
+        self.cells: Dict[Tuple[int, int], dict] = {}
+        self.cell_owner: Dict[Tuple[int, int], object] = {}
+        self.held_count: Dict[object, int] = {}
+        # gate -> (holds, timer, time) as of the last record that carried it
+        self.gates: Dict[object, Tuple[list, int, int]] = {}
+        self.last_keyframe = None
+
+    def _set_owner(self, pos, owner):
+        if (old := self.cell_owner.pop(pos, None)) is not None:
+            self.held_count[old] -= 1
+            if not self.held_count[old]:
+                del self.held_count[old]
+        if owner is not None:
+            self.cell_owner[pos] = owner
+            self.held_count[owner] = self.held_count.get(owner, 0) + 1
+
+    def _owner(self, cell):
+        return cell.lock.owner if cell.locked() else None
+
+    def encode(self, time: int) -> dict:
+        if self.last_keyframe is None or time - self.last_keyframe >= self.keyframe_interval:
+            return self.keyframe(time)
+
+        cells = []
+        for cell in self.dirty:
+            pos = self.widget.adapter[cell]
+            cell_json = self.widget._cell_to_json(cell)
+            if cell_json != self.cells[pos]:
+                self.cells[pos] = cell_json
+                cells.append([*pos, cell_json])
+            self._set_owner(pos, self._owner(cell))
+        self.dirty.clear()
+
+        gates = []
+        for gate in self.held_count:
+            gate_json = self.widget._gate_to_json(gate)
+            if (last := self.gates.get(gate)) is not None:
+                holds, timer, last_time = last
+                if gate_json['holds'] == holds and gate_json['active_time'] == timer + time - last_time:
+                    continue
+            self.gates[gate] = (gate_json['holds'], gate_json['active_time'], time)
+            gates.append(gate_json)
+
+        finished = [gate for gate in self.gates if gate not in self.held_count]
+        for gate in finished:
+            del self.gates[gate]
+
+        return {
+            'type': 'delta',
+            'time': time,
+            'cells': cells,
+            'gates': gates,
+            'finished': [id(gate) for gate in finished],
+        }
+
+    def keyframe(self, time: int) -> dict:
+        self.last_keyframe = time
+        self.dirty.clear()
+        self.cell_owner.clear()
+        self.held_count.clear()
+        self.gates.clear()
+
+        board = []
+        for r, row in enumerate(self.widget.board):
+            board.append([])
+            for c, cell in enumerate(row):
+                self.cells[r, c] = cell_json = self.widget._cell_to_json(cell)
+                board[-1].append(cell_json)
+                self._set_owner((r, c), self._owner(cell))
+
+        gates = []
+        for gate in self.held_count:
+            gate_json = self.widget._gate_to_json(gate)
+            self.gates[gate] = (gate_json['holds'], gate_json['active_time'], time)
+            gates.append(gate_json)
+
+        return {'type': 'key', 'time': time, 'board': board, 'gates': gates}
+
+
+class DeltaFrameReader:
+    '''
+    Rebuilds full frames ({'board', 'gates'}) from a delta frame stream.
+
+    Random access seeks to the closest preceding keyframe and replays the
+    deltas after it.
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self.header = None
+        self.times: List[int] = []
+        self.offsets: List[int] = []
+        self.keyframes: List[int] = [] # indices into times / offsets
+
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record['type'] == 'header':
+                        self.header = record
+                    else:
+                        if record['type'] == 'key':
+                            self.keyframes.append(len(self.times))
+                        self.times.append(record['time'])
+                        self.offsets.append(offset)
+                offset += len(line)
+
+    def __len__(self):
+        return len(self.times)
+
+    def _replay(self, start: int) -> Iterator[Tuple[int, dict]]:
+        board = None
+        gates: Dict[int, Tuple[dict, int]] = {}
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[start])
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                time = record['time']
+                if record['type'] == 'key':
+                    board = record['board']
+                    gates = {g['id']: (g, time) for g in record['gates']}
+                else:
+                    for r, c, cell_json in record['cells']:
+                        board[r][c] = cell_json # type: ignore
+                    for gate_id in record['finished']:
+                        del gates[gate_id]
+                    for g in record['gates']:
+                        gates[g['id']] = (g, time)
+
+                yield time, {
+                    'board': [row[:] for row in board], # type: ignore
+                    'gates': [
+                        {**g, 'active_time': g['active_time'] + time - since}
+                        for g, since in gates.values()
+                    ],
+                }
+
+    def frame(self, time: int) -> dict:
+        '''
+        Full frame recorded at the given time
+        '''
+        idx = bisect_left(self.times, time)
+        if idx == len(self.times) or self.times[idx] != time:
+            raise KeyError(f'No frame at time {time}')
+        start = self.keyframes[bisect_right(self.keyframes, idx) - 1]
+        for frame_time, frame in self._replay(start):
+            if frame_time == time:
+                return frame
+        raise KeyError(f'No frame at time {time}')
+
+    def __iter__(self) -> Iterator[Tuple[int, dict]]:
+        '''
+        Iterate over (time, frame) for every recorded tick
+        '''
+        if self.offsets:
+            yield from self._replay(0)
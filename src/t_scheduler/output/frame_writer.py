@@ -0,0 +1,82 @@
+from __future__ import annotations
+import json
+from typing import IO, Iterator
+
+from .sinks import FrameSink
+
+
+def header_record(widget) -> dict:
+    return {
+        'type': 'header',
+        'regions': widget.save_json_regions(),
+        'width': widget.width,
+        'height': widget.height,
+        'base_layer': widget.save_json_patches_state(),
+    }
+
+
+def layer_record(time: int, layer: dict) -> dict:
+    return {'type': 'layer', 'time': time, **layer}
+
+
+class NDJSONFrameWriter(FrameSink):
+    '''
+    Streams per-tick board frames as newline delimited JSON.
+
+    The first record is a header (regions, width, height, base_layer),
+    followed by one layer record per tick. Each record is flushed as it
+    is written, so the output can be tailed while a schedule runs.
+    '''
+    def __init__(self, target: str | IO[str]):
+        '''
+        target: path to write to, or an open text file / pipe
+        '''
+        if isinstance(target, str):
+            self.file = open(target, 'w', buffering=1)
+            self.owns_file = True
+        else:
+            self.file = target
+            self.owns_file = False
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def write_header(self, widget):
+        self.write(header_record(widget))
+
+    def write_layer(self, time: int, layer: dict):
+        self.write(layer_record(time, layer))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+def read_frames(path: str) -> Iterator[dict]:
+    '''
+    Iterate over the records of a frame stream
+    '''
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_frames_json(path: str) -> dict:
+    '''
+    Rebuild the in-memory ScheduleOrchestrator.json layout from a stream
+    '''
+    output = {'layers': []}
+    for record in read_frames(path):
+        if record.pop('type') == 'header':
+            output.update(record)
+        else:
+            record.pop('time')
+            output['layers'].append(record)
+    return output
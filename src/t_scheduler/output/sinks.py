@@ -0,0 +1,126 @@
+from __future__ import annotations
+from abc import ABC
+import os
+import queue
+import sys
+import threading
+from typing import IO
+
+
+class FrameSink(ABC):
+    '''
+    Consumer of per-tick output records (frames, debug text, ...)
+    '''
+    def write(self, record) -> None:
+        raise NotImplementedError()
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TextSink(FrameSink):
+    '''
+    Writes text records as they are, e.g. debug board prints
+    '''
+    def __init__(self, file: IO[str] | None = None):
+        self.file = file if file is not None else sys.stdout
+
+    def write(self, record: str):
+        self.file.write(record)
+
+    def flush(self):
+        self.file.flush()
+
+
+class TexFileSink(FrameSink):
+    '''
+    Writes (time, TikzFrame) records to {output_dir}/{time}.tex
+    '''
+    def __init__(self, output_dir: str = 'out'):
+        self.output_dir = output_dir
+
+    def write(self, record):
+        from lattice_surgery_draw.primitives.composers import TexFile
+
+        time, frame = record
+        with open(os.path.join(self.output_dir, f"{time}.tex"), "w") as f:
+            print(TexFile(frame), file=f)
+
+
+class AsyncFrameSink(FrameSink):
+    '''
+    Hands records to a wrapped sink on a background thread.
+
+    Records go through a queue of at most maxsize entries: write() blocks
+    while it is full, so a slow sink throttles the producer rather than
+    buffering without bound. Records must not be mutated after write().
+    An exception raised by the wrapped sink is re-raised by the next
+    write(), flush(), stop() or close(), and later records are dropped.
+    '''
+    _CLOSE = object()
+
+    def __init__(self, sink: FrameSink, maxsize: int = 64):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize)
+        self.error: BaseException | None = None
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is self._CLOSE:
+                    return
+                if self.error is None:
+                    self.sink.write(record)
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def write(self, record):
+        self._raise_error()
+        if not self.thread.is_alive():
+            raise ValueError('write to a stopped AsyncFrameSink')
+        self.queue.put(record)
+
+    def flush(self):
+        '''
+        Wait until every record written so far has been handed to the sink
+        '''
+        self.queue.join()
+        self._raise_error()
+        self.sink.flush()
+
+    def _join(self):
+        if self.thread.is_alive():
+            self.queue.put(self._CLOSE)
+            self.thread.join()
+
+    def stop(self):
+        '''
+        Hand every record written so far to the sink and end the
+        background thread, leaving the wrapped sink open
+        '''
+        self._join()
+        self._raise_error()
+        self.sink.flush()
+
+    def close(self):
+        self._join()
+        self.sink.close()
+        self._raise_error()
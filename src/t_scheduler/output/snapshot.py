@@ -0,0 +1,190 @@
+from __future__ import annotations
+from typing import Dict, List, Literal, Tuple
+
+from ..widget import Widget
+from .frame_writer import layer_record
+from .sinks import FrameSink
+
+# Fields of a cell state, see BoardSnapshotter.cell_state
+JSON_TYPE, OWNER_ID, OWNER_TYPE, DEBUG_CHAR, GLYPH = range(5)
+
+
+class BoardSnapshot:
+    '''
+    Board of one tick as taken by BoardSnapshotter:
+        cells: (row, col, cell state) of cells changed since the previous
+            snapshot, every cell for the first one
+        gates: json of the gates holding cells (see Widget._gate_to_json)
+        routes: board coordinates held by each active gate, if taken
+    '''
+    __slots__ = ('time', 'cells', 'gates', 'routes')
+
+    def __init__(self, time: int, cells: list, gates: list, routes: list | None):
+        self.time = time
+        self.cells = cells
+        self.gates = gates
+        self.routes = routes
+
+
+class BoardSnapshotter:
+    '''
+    Takes cheap per-tick BoardSnapshots of a widget, for SnapshotFormatter
+    to turn into debug prints, layer records or TikZ frames off the
+    scheduling thread.
+
+    Changed cells come from patch change events, so a snapshot costs
+    O(changed cells + active gates) rather than O(board area). Snapshots
+    only carry changes, so every one must reach each formatter in order.
+    '''
+    def __init__(self, widget: Widget, routes: bool = False):
+        '''
+        routes: also take the routes of the active gates, for TikZ frames
+        '''
+        self.widget = widget
+        self.routes = routes
+        if not hasattr(widget, 'adapter'):
+            widget.make_coordinate_adapter()
+
+        self.dirty = set()
+        for row in widget.board:
+            for cell in row:
+                cell.subscribe(self.dirty.add)
+                self.dirty.add(cell)
+
+        self.cell_owner: Dict[Tuple[int, int], object] = {}
+        self.held_count: Dict[object, int] = {}
+
+    @staticmethod
+    def cell_state(cell) -> tuple:
+        '''
+        Everything the formats draw of cell, as plain data
+        '''
+        owner = cell.lock.owner if cell.locked() else None
+        return (
+            Widget._patch_to_json(cell),
+            None if owner is None else id(owner),
+            None if owner is None else owner.__class__.__name__,
+            Widget._patch_to_debug_char(cell),
+            Widget._patch_to_glyph(cell),
+        )
+
+    def _set_owner(self, pos, owner):
+        if (old := self.cell_owner.pop(pos, None)) is not None:
+            self.held_count[old] -= 1
+            if not self.held_count[old]:
+                del self.held_count[old]
+        if owner is not None:
+            self.cell_owner[pos] = owner
+            self.held_count[owner] = self.held_count.get(owner, 0) + 1
+
+    def snapshot(self, time: int, output_layer=()) -> BoardSnapshot:
+        '''
+        output_layer: active cells of each active gate, see
+            ScheduleOrchestrator.output_layers
+        '''
+        adapter = self.widget.adapter
+        cells = []
+        for cell in self.dirty:
+            pos = adapter[cell]
+            cells.append((*pos, self.cell_state(cell)))
+            self._set_owner(pos, cell.lock.owner if cell.locked() else None)
+        self.dirty.clear()
+
+        gates = [self.widget._gate_to_json(gate) for gate in self.held_count]
+        routes = None
+        if self.routes:
+            routes = []
+            for gate_path in output_layer:
+                gate_path = list(map(adapter.get, gate_path))
+                if None in gate_path:
+                    raise Exception("Invalid cell in adapter")
+                routes.append(gate_path)
+        return BoardSnapshot(time, cells, gates, routes)
+
+
+class SnapshotFormatter(FrameSink):
+    '''
+    Formats BoardSnapshots into the records of a wrapped sink, from a copy
+    of the board kept up to date by each snapshot:
+        'text': board prints as Widget.to_str_output_dedup
+        'json': layer records (see frame_writer.layer_record)
+        'tikz': (time, TikzFrame) records, as for TexFileSink
+    Other records are handed to the sink as they are.
+    '''
+    def __init__(self, sink: FrameSink, kind: Literal['text', 'json', 'tikz'], widget: Widget):
+        '''
+        widget: board the snapshots are of, only read here
+        '''
+        if kind not in ('text', 'json', 'tikz'):
+            raise ValueError(f"Unknown snapshot format {kind}")
+        self.sink = sink
+        self.kind = kind
+        self.cells: List[list] = [[None] * len(row) for row in widget.board]
+        if kind == 'json':
+            self.cell_json: List[list] = [[None] * len(row) for row in widget.board]
+
+        self.last_output = ""
+        self.rep_count = 1
+
+        if kind == 'tikz':
+            if not hasattr(widget, 'adapter'):
+                widget.make_coordinate_adapter()
+            self.regions = widget.tikz_region_rects()
+            self.layout = widget.tikz_patch_layout()
+            self._region_layer = None
+
+    def write(self, record):
+        if not isinstance(record, BoardSnapshot):
+            self.sink.write(record)
+            return
+
+        for row, col, state in record.cells:
+            self.cells[row][col] = state
+            if self.kind == 'json':
+                cell_json = {'type': state[JSON_TYPE]}
+                if state[OWNER_ID] is not None:
+                    cell_json['locked_by'] = state[OWNER_ID]
+                self.cell_json[row][col] = cell_json
+
+        if self.kind == 'text':
+            self.sink.write(self._text())
+        elif self.kind == 'json':
+            self.sink.write(layer_record(record.time, self._layer(record)))
+        else:
+            self.sink.write((record.time, self._tikz_frame(record)))
+
+    def _text(self) -> str:
+        buf = Widget._board_to_str([[state[DEBUG_CHAR] for state in row] for row in self.cells])
+        if buf == self.last_output:
+            self.rep_count += 1
+            return f"\rX{self.rep_count}"
+        self.last_output = buf
+        self.rep_count = 1
+        return buf + "\n"
+
+    def _layer(self, record: BoardSnapshot) -> dict:
+        # Unchanged cells share their json with earlier records
+        return {'board': [row[:] for row in self.cell_json], 'gates': record.gates}
+
+    def _tikz_frame(self, record: BoardSnapshot):
+        from lattice_surgery_draw.primitives.composers import TikzFrame
+
+        if self._region_layer is None:
+            self._region_layer = Widget._tikz_region_objects(self.regions)
+
+        patches = []
+        for coord, kind, label in self.layout:
+            glyph = None if kind == "reg_pair" else self.cells[coord[0]][coord[1]][GLYPH]
+            patches.extend(Widget._tikz_patch_objects(coord, kind, label, glyph))
+
+        def gate_type(idx, pos):
+            return self.cells[pos[0]][pos[1]][OWNER_TYPE]
+
+        routes = Widget._tikz_route_rects(record.routes, gate_type)
+        return TikzFrame(*self._region_layer, *patches, *(routes if routes is not None else []))
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
@@ -0,0 +1,216 @@
+from __future__ import annotations
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from ..widget import Widget
+from .trace import TraceRecorder
+
+
+class TikzTrace:
+    '''
+    Records what Widget.save_tikz_patches_layer would draw, per tick.
+
+    The widget layout (regions, drawn cells) is captured once as plain
+    data. Cell glyphs (see Widget._patch_to_glyph) are interned, and only
+    changes are recorded: (time, flat cell index, glyph id). Changed cells
+    come from patch change events, so recording costs O(changed cells)
+    per tick and nothing is drawn until a TikzRenderer is asked to.
+    '''
+    def __init__(self, widget: Widget):
+        if not hasattr(widget, 'adapter'):
+            widget.make_coordinate_adapter()
+
+        self.width = max(len(row) for row in widget.board)
+        self.height = len(widget.board)
+        self.regions = widget.tikz_region_rects()
+        self.layout = widget.tikz_patch_layout()
+
+        self.glyphs: List[tuple] = []
+        self.glyph_ids: Dict[tuple, int] = {}
+
+        self.current = array('H', [0] * (self.width * self.height))
+        for row in widget.board:
+            for cell in row:
+                self.current[cell.y * self.width + cell.x] = self._glyph_id(cell)
+        self.initial = array('H', self.current)
+
+        self.times = array('i')
+        self.cells = array('i')
+        self.changes = array('H')
+
+        self.dirty = set()
+        for row in widget.board:
+            for cell in row:
+                cell.subscribe(self.dirty.add)
+
+    def _glyph_id(self, cell) -> int:
+        glyph = Widget._patch_to_glyph(cell)
+        if (glyph_id := self.glyph_ids.get(glyph)) is None:
+            glyph_id = self.glyph_ids[glyph] = len(self.glyphs)
+            self.glyphs.append(glyph)
+        return glyph_id
+
+    def record(self, time: int):
+        '''
+        Record glyph changes since the last call as happening at time
+        '''
+        for cell in self.dirty:
+            idx = cell.y * self.width + cell.x
+            glyph_id = self._glyph_id(cell)
+            if self.current[idx] != glyph_id:
+                self.current[idx] = glyph_id
+                self.times.append(time)
+                self.cells.append(idx)
+                self.changes.append(glyph_id)
+        self.dirty.clear()
+
+    def grids(self, times: Iterable[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        '''
+        Yield (time, glyph id grid) for each of the given (sorted) times
+        '''
+        grid = np.frombuffer(self.initial, dtype=np.uint16).copy()
+        change_times = np.frombuffer(self.times, dtype=np.int32)
+        cells = np.frombuffer(self.cells, dtype=np.int32)
+        changes = np.frombuffer(self.changes, dtype=np.uint16)
+
+        applied = 0
+        for time in times:
+            end = int(np.searchsorted(change_times, time, side='right'))
+            if end < applied:
+                raise ValueError('Times must be sorted')
+            # Repeated cells keep the last assignment
+            grid[cells[applied:end]] = changes[applied:end]
+            applied = end
+            yield time, grid.reshape(self.height, self.width)
+
+    def save(self, path: str):
+        meta = {
+            'width': self.width,
+            'height': self.height,
+            'regions': self.regions,
+            'layout': self.layout,
+            'glyphs': self.glyphs,
+        }
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta)),
+                initial=np.frombuffer(self.initial, dtype=np.uint16),
+                times=np.frombuffer(self.times, dtype=np.int32),
+                cells=np.frombuffer(self.cells, dtype=np.int32),
+                changes=np.frombuffer(self.changes, dtype=np.uint16),
+            )
+
+    @staticmethod
+    def load(path: str) -> TikzTrace:
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            trace = TikzTrace.__new__(TikzTrace)
+            trace.initial = array('H', data['initial'].tobytes())
+            trace.times = array('i', data['times'].tobytes())
+            trace.cells = array('i', data['cells'].tobytes())
+            trace.changes = array('H', data['changes'].tobytes())
+
+        trace.width = meta['width']
+        trace.height = meta['height']
+        trace.regions = [(tuple(coords), fill) for coords, fill in meta['regions']]
+        trace.layout = [(tuple(coord), kind, label) for coord, kind, label in meta['layout']]
+        trace.glyphs = [tuple(glyph) for glyph in meta['glyphs']]
+        trace.glyph_ids = {glyph: idx for idx, glyph in enumerate(trace.glyphs)}
+        trace.current = array('H', trace.initial)
+        trace.dirty = set()
+        return trace
+
+    def __getstate__(self):
+        # Recording state holds patches, drop it when sent to render workers
+        state = self.__dict__.copy()
+        state['dirty'] = set()
+        return state
+
+
+class TikzRenderer:
+    '''
+    Renders TikZ frames after scheduling, from a TikzTrace and optionally
+    a TraceRecorder for the routes.
+
+    The static region layer is built once and reused for every frame.
+    '''
+    def __init__(self, tikz_trace: TikzTrace, trace: TraceRecorder | None = None):
+        self.tikz_trace = tikz_trace
+        self.trace = trace
+        self._region_layer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_region_layer'] = None
+        return state
+
+    def region_layer(self) -> list:
+        if self._region_layer is None:
+            self._region_layer = Widget._tikz_region_objects(self.tikz_trace.regions)
+        return self._region_layer
+
+    def _routes(self, time: int) -> list:
+        if self.trace is None:
+            return []
+        gates = self.trace.cells_at(time)
+        gate_paths = [list(map(tuple, cells.tolist())) for _, cells in gates]
+
+        def gate_type(idx, pos):
+            return self.trace.gate_type(gates[idx][0]) # type: ignore
+
+        routes = Widget._tikz_route_rects(gate_paths, gate_type)
+        return routes if routes is not None else []
+
+    def _frame(self, time: int, grid: np.ndarray):
+        from lattice_surgery_draw.primitives.composers import TikzFrame
+
+        glyphs = self.tikz_trace.glyphs
+        patches = []
+        for coord, kind, label in self.tikz_trace.layout:
+            patches.extend(Widget._tikz_patch_objects(coord, kind, label, glyphs[grid[coord]]))
+        return TikzFrame(*self.region_layer(), *patches, *self._routes(time))
+
+    def frames(self, times: Iterable[int]):
+        '''
+        Yield (time, TikzFrame) for each of the given times
+        '''
+        for time, grid in self.tikz_trace.grids(sorted(times)):
+            yield time, self._frame(time, grid)
+
+    def frame(self, time: int):
+        return next(self.frames([time]))[1]
+
+    def render(self, times: Iterable[int], output_dir: str = 'out', workers: int | None = None):
+        '''
+        Write {output_dir}/{time}.tex for each of the given times
+
+        workers: render contiguous chunks of times in this many processes
+        '''
+        times = sorted(times)
+        if not workers or workers <= 1 or len(times) <= 1:
+            _render_times(self, times, output_dir)
+            return
+
+        chunk = -(-len(times) // workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_render_times, self, times[i:i + chunk], output_dir)
+                for i in range(0, len(times), chunk)
+            ]
+            for future in futures:
+                future.result()
+
+
+def _render_times(renderer: TikzRenderer, times: List[int], output_dir: str):
+    from lattice_surgery_draw.primitives.composers import TexFile
+
+    os.makedirs(output_dir, exist_ok=True)
+    for time, frame in renderer.frames(times):
+        with open(os.path.join(output_dir, f"{time}.tex"), "w") as f:
+            print(TexFile(frame), file=f)
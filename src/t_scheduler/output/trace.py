@@ -0,0 +1,202 @@
+from __future__ import annotations
+from array import array
+import json
+import os
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+class TraceRecorder:
+    '''
+    Compact per-tick record of which cells each active gate holds.
+
+    Data is kept in flat typed arrays:
+        cells:        flat cell index (y * width + x) of every held cell
+        entry_gate:   gate id of each (tick, gate) entry
+        entry_start:  offset of each entry's cells in cells
+        tick_time:    time of each tick
+        tick_start/tick_end: range of each tick's entries
+
+    Ticks skipped by fast-forward repeat the previous entry range without
+    copying it. With a path, buffers are spilled to raw files in that
+    directory once spill_size cells are buffered, and queries memory-map
+    them; otherwise everything stays in memory.
+    '''
+    FIELDS = {
+        'cells': 'i',
+        'entry_gate': 'i',
+        'entry_start': 'q',
+        'tick_time': 'i',
+        'tick_start': 'q',
+        'tick_end': 'q',
+    }
+
+    def __init__(self, width: int, path: str | None = None, spill_size: int = 1 << 20):
+        '''
+        width: board width, for flat cell indices (see Widget.board)
+        '''
+        self.width = width
+        self.path = path
+        self.spill_size = spill_size
+
+        self.buffers = {name: array(code) for name, code in self.FIELDS.items()}
+        self.spilled = {name: 0 for name in self.FIELDS}
+        self.gate_ids: Dict[object, int] = {}
+        self.gate_types: List[str] = []
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            for name in self.FIELDS:
+                open(self._file(name), 'wb').close()
+
+    @staticmethod
+    def for_widget(widget, path: str | None = None, **kwargs) -> TraceRecorder:
+        return TraceRecorder(max(len(row) for row in widget.board), path, **kwargs)
+
+    def _file(self, name):
+        return os.path.join(self.path, f'{name}.bin') # type: ignore
+
+    def _count(self, name) -> int:
+        return self.spilled[name] + len(self.buffers[name])
+
+    def _gate_id(self, gate) -> int:
+        if (gate_id := self.gate_ids.get(gate)) is None:
+            gate_id = self.gate_ids[gate] = len(self.gate_types)
+            self.gate_types.append(gate.__class__.__name__)
+        return gate_id
+
+    def record(self, time: int, gates: Iterable):
+        '''
+        Record the cells held by each gate at time
+        '''
+        buffers = self.buffers
+        start = self._count('entry_gate')
+        for gate in gates:
+            buffers['entry_gate'].append(self._gate_id(gate))
+            buffers['entry_start'].append(self._count('cells'))
+            buffers['cells'].extend(cell.y * self.width + cell.x for cell in gate.transaction.active_cells)
+        buffers['tick_time'].append(time)
+        buffers['tick_start'].append(start)
+        buffers['tick_end'].append(self._count('entry_gate'))
+
+        if self.path is not None and len(buffers['cells']) >= self.spill_size:
+            self.spill()
+
+    def repeat(self, times: Iterable[int]):
+        '''
+        Record ticks identical to the last recorded one
+        '''
+        buffers = self.buffers
+        start, end = self._last_tick()
+        for time in times:
+            buffers['tick_time'].append(time)
+            buffers['tick_start'].append(start)
+            buffers['tick_end'].append(end)
+
+    def _last_tick(self) -> Tuple[int, int]:
+        if self.buffers['tick_start']:
+            return self.buffers['tick_start'][-1], self.buffers['tick_end'][-1]
+        starts, ends = self._load('tick_start'), self._load('tick_end')
+        return int(starts[-1]), int(ends[-1])
+
+    def spill(self):
+        '''
+        Append buffered data to the trace files
+        '''
+        for name, buffer in self.buffers.items():
+            with open(self._file(name), 'ab') as f:
+                buffer.tofile(f)
+            self.spilled[name] += len(buffer)
+            del buffer[:]
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f: # type: ignore
+            json.dump({'width': self.width, 'gate_types': self.gate_types}, f)
+
+    def close(self):
+        '''
+        Write out any buffered data, so the trace can be reopened with load()
+        '''
+        if self.path is not None:
+            self.spill()
+
+    def _load(self, name) -> np.ndarray:
+        dtype = np.dtype(self.FIELDS[name])
+        if self.path is None:
+            return np.frombuffer(self.buffers[name], dtype=dtype)
+        if self.buffers[name]:
+            self.spill()
+        if not self.spilled[name]:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode='r', shape=(self.spilled[name],))
+
+    @staticmethod
+    def load(path: str) -> TraceRecorder:
+        '''
+        Reopen a spilled trace for queries
+        '''
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        trace = TraceRecorder.__new__(TraceRecorder)
+        trace.width = meta['width']
+        trace.path = path
+        trace.spill_size = 0
+        trace.buffers = {name: array(code) for name, code in TraceRecorder.FIELDS.items()}
+        trace.spilled = {
+            name: os.path.getsize(trace._file(name)) // np.dtype(code).itemsize
+            for name, code in TraceRecorder.FIELDS.items()
+        }
+        trace.gate_ids = {}
+        trace.gate_types = meta['gate_types']
+        return trace
+
+    def __getstate__(self):
+        # Gate references are only needed while recording
+        state = self.__dict__.copy()
+        state['gate_ids'] = {}
+        return state
+
+    def __len__(self):
+        return self._count('tick_time')
+
+    def _coords(self, flat: np.ndarray) -> np.ndarray:
+        return np.stack(np.divmod(flat, self.width), axis=-1)
+
+    def cells_at(self, time: int) -> List[Tuple[int, np.ndarray]]:
+        '''
+        (gate id, [[y, x], ...]) for every gate active at time
+        '''
+        times = self._load('tick_time')
+        tick = int(np.searchsorted(times, time))
+        if tick == len(times) or times[tick] != time:
+            raise KeyError(f'No tick recorded at time {time}')
+
+        cells = self._load('cells')
+        entry_gate = self._load('entry_gate')
+        entry_start = self._load('entry_start')
+        start, end = int(self._load('tick_start')[tick]), int(self._load('tick_end')[tick])
+
+        output = []
+        for entry in range(start, end):
+            cell_end = entry_start[entry + 1] if entry + 1 < len(entry_start) else len(cells)
+            output.append((int(entry_gate[entry]), self._coords(np.asarray(cells[entry_start[entry]:cell_end]))))
+        return output
+
+    def busy_ticks(self, y: int, x: int) -> np.ndarray:
+        '''
+        Times at which cell (y, x) was held by a gate
+        '''
+        cells = self._load('cells')
+        entry_start = self._load('entry_start')
+        positions = np.flatnonzero(cells == y * self.width + x)
+        # Entries holding the cell, sorted
+        entries = np.unique(np.searchsorted(entry_start, positions, side='right') - 1)
+
+        starts = self._load('tick_start')
+        ends = self._load('tick_end')
+        first = np.searchsorted(entries, starts)
+        busy = first < len(entries)
+        busy[busy] = entries[first[busy]] < ends[busy]
+        return np.asarray(self._load('tick_time')[busy])
+
+    def gate_type(self, gate_id: int) -> str:
+        return self.gate_types[gate_id]
@@ -1,5 +1,10 @@
 from typing import List, Literal, Set, Tuple
 
+import numpy as np
+
+from ..t_generation.t_generator import TGenerator
+from ..t_generation.batched_generator import BatchedTGenerator
+from ..t_generation.arrival_trace import TArrivalTrace
 from ..t_generation.t_factories import (
     TFactory_Litinski_5x3_15_to_1,
     TFactory_Litinski_6x3_20_to_4_dense,
@@ -15,13 +20,35 @@ import itertools
 
 class AbstractFactoryRegion(WidgetRegion):
     available_states: Set[Patch]
+    factories: List[TGenerator]
+    engine: BatchedTGenerator | TArrivalTrace | None = None
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-class MagicStateFactoryRegion(WidgetRegion):
+    def t_generators(self) -> List[TGenerator]:
+        '''
+        T generators of this region, in update order
+        '''
+        return self.factories
+
+    def use_trace(self, trace: TArrivalTrace):
+        '''
+        Replay pre-sampled T arrivals instead of simulating the generators.
+        Factories added later take the following trace rows.
+        '''
+        for factory in self.t_generators():
+            trace.add(factory)
+        self.engine = trace
+
+class MagicStateFactoryRegion(AbstractFactoryRegion):
     available_states: Set[Patch]
     
-    def __init__(self, width, height, **kwargs):
+    def __init__(self, width, height, batched: bool = False, generator=None, **kwargs):
+        '''
+        batched: advance all factories with a single BatchedTGenerator,
+            drawing from generator (RNG) instead of each factory's own RNG
+        '''
         sc_patches = [
             [Patch(PatchType.ROUTE, r, c) for c in range(width)] for r in range(height)
         ]
@@ -30,6 +57,7 @@ class MagicStateFactoryRegion(WidgetRegion):
         self.active_factories = set()
         self.available_states = set()
         self.waiting_factories = set()
+        self.engine = BatchedTGenerator(generator=generator) if batched else None
 
     def _set_local(self, row, col, new_patch):
         assert self.rotation in [TopEdgePosition.TOP, TopEdgePosition.BOTTOM]
@@ -72,6 +100,13 @@ class MagicStateFactoryRegion(WidgetRegion):
             factory.outputs.append(self._get_local(r,c))
         self.factories.append(factory)
         self.active_factories.add(factory)
+        if self.engine is not None:
+            self.engine.add(factory)
+
+    def _active_mask(self):
+        mask = np.zeros(len(self.engine), dtype=bool) # type: ignore
+        mask[[factory._engine_idx for factory in self.active_factories]] = True
+        return mask
 
     def update(self):
         completed = set()
@@ -83,15 +118,20 @@ class MagicStateFactoryRegion(WidgetRegion):
         self.active_factories.update(completed)
 
         completed = set()
-        for factory in self.active_factories:
-            if factory.update():
-                completed.add(factory)
+        if self.engine is None:
+            for factory in self.active_factories:
+                if factory.update():
+                    completed.add(factory)
+        else:
+            for idx in self.engine.update(self._active_mask()):
+                completed.add(self.engine.generators[idx])
         self.active_factories.difference_update(completed)
         self.waiting_factories.update(completed)
         for factory in completed:
             tag = TFactorySpaceTimeVolumeTrackingTag(factory.vol_tracker, factory)
             for output in factory.outputs:
                 output.t_count += 1
+                output.changed()
                 output.curr_t_tag = SpaceTimeVolumeTrackingContext(factory.vol_tracker)
                 # print("create in factory:", id(output.curr_t_tag))
                 output.curr_t_tag.factory_tag = tag
@@ -102,6 +142,24 @@ class MagicStateFactoryRegion(WidgetRegion):
 
                 self.available_states.add(output)
 
+        return bool(completed)
+
+    def idle_cycles(self):
+        for factory in self.waiting_factories:
+            if all(o.t_count == 0 and not o.locked() for o in factory.outputs):  # type: ignore
+                # Reset pending
+                return 0
+        if self.engine is not None:
+            return self.engine.idle_cycles(self._active_mask())
+        return min((factory.idle_cycles() for factory in self.active_factories), default=float('inf'))
+
+    def skip(self, cycles):
+        if self.engine is not None:
+            self.engine.skip(cycles, self._active_mask())
+            return
+        for factory in self.active_factories:
+            factory.skip(cycles)
+
     def release_cells(self, sc_patches: List[Patch]):
         for cell in sc_patches:
             # TODO time etc.
@@ -149,7 +207,12 @@ class TCultivatorBufferRegion(AbstractFactoryRegion):
         assert buffer_type == 'sparse'
         return TCultivatorBufferRegion(*args, buffer_type = 'sparse', **kwargs)
 
-    def __init__(self, width, height, buffer_type: Literal["dense", "sparse"] = 'dense', **kwargs) -> None:
+    def __init__(self, width, height, buffer_type: Literal["dense", "sparse"] = 'dense', 
+                 batched: bool = False, generator=None, **kwargs) -> None:
+        '''
+        batched: advance all cultivators with a single BatchedTGenerator,
+            drawing from generator (RNG) instead of each cultivator's own RNG
+        '''
         self.available_states = set()
 
         if buffer_type == "dense":
@@ -170,12 +233,46 @@ class TCultivatorBufferRegion(AbstractFactoryRegion):
 
         self.factories = self.update_cells
 
+        self.engine = None
+        if batched:
+            self.engine = BatchedTGenerator(self.t_generators(), generator=generator)
+
         super().__init__(width, height, sc_patches, **kwargs)  # type: ignore
 
+    def t_generators(self) -> List[TGenerator]:
+        return [cell.cultivator for cell in self.update_cells]
+
+    def _cultivating_mask(self):
+        return np.fromiter((cell.route_available() for cell in self.update_cells),
+                           dtype=bool, count=len(self.update_cells))
+
     def update(self):
+        if self.engine is not None:
+            produced = self.engine.update(self._cultivating_mask())
+            for idx in produced:
+                cell = self.update_cells[idx]
+                cell.store_T()
+                self.available_states.add(cell)
+            return len(produced) > 0
+
+        produced = False
         for cell in self.update_cells:
             if cell.update():
                 self.available_states.add(cell)
+                produced = True
+        return produced
+
+    def idle_cycles(self):
+        if self.engine is not None:
+            return self.engine.idle_cycles(self._cultivating_mask())
+        return min((cell.idle_cycles() for cell in self.update_cells), default=float('inf'))
+
+    def skip(self, cycles):
+        if self.engine is not None:
+            self.engine.skip(cycles, self._cultivating_mask())
+            return
+        for cell in self.update_cells:
+            cell.skip(cycles)
 
     def release_cells(self, sc_patches: List[TCultPatch]):
         for cell in sc_patches:
@@ -1,7 +1,8 @@
 from __future__ import annotations
 from enum import IntEnum
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 from ..base import Patch, PatchOrientation, PatchType
+from ..base.occupancy import OccupancyGrid
 
 class TopEdgePosition(IntEnum):
     TOP = 0
@@ -59,6 +60,9 @@ class WidgetRegionView:
         return self.underlying[self.tl(key)]
     
     def __getattr__(self, name):
+        # Unpickling looks attributes up before underlying is set
+        if name == 'underlying':
+            raise AttributeError(name)
         return self.underlying.__getattribute__(name)
 
 class WidgetRegion:
@@ -70,6 +74,7 @@ class WidgetRegion:
     stats: RegionStats = None # type: ignore
     offset: Tuple[int, int] # Position of top left cell in global coordinates
     rotation = 0 # Bearing of top edge in [0, 90, 180, 270]
+    occupancy: OccupancyGrid | None = None # Set by the owning Widget
 
     def __init__(self, width: int, height: int, 
                  sc_patches: List[List[Patch]], 
@@ -120,9 +125,32 @@ class WidgetRegion:
         # for key in kwargs:
         #     print(f'Ignoring unknown parameter: {key}')
 
-    def update(self) -> None:
+    def subscribe(self, callback: Callable[[Patch], None]):
+        '''
+        Call callback(patch) whenever one of our patches changes, see
+        Patch.subscribe
+        '''
+        for row in self.sc_patches:
+            for cell in row:
+                cell.subscribe(callback)
+
+    def update(self) -> bool:
         """
         Updates internal state of the widget region
+
+        Returns True if any patch changed state
+        """
+        return False
+
+    def idle_cycles(self) -> int | float:
+        """
+        Number of upcoming update calls that leave every patch unchanged
+        """
+        return float('inf')
+
+    def skip(self, cycles: int) -> None:
+        """
+        Fast-forward over idle update calls (see idle_cycles)
         """
         pass
 
@@ -2,7 +2,10 @@ from __future__ import annotations
 from abc import ABC
 from typing import List
 
-from ..base.response import Response, ResponseStatus
+import numpy as np
+
+from ..base.response import Response, ResponseStatus, FailureReason
+from ..base.occupancy import OccupancyGrid
 from ..region import WidgetRegion, AbstractFactoryRegion
 from ..tracker import *
 
@@ -77,13 +80,41 @@ class AbstractRouter(ABC):
     @staticmethod
     def clamp(val, range_low, range_high):
         return max(range_low, min(val, range_high))    
+
+    # (grid, flat index of our region) cache for local_flags
+    _occupancy = None
+
+    def local_flags(self, col: int | None = None) -> np.ndarray | None:
+        '''
+        Occupancy flags of our region indexed as self.region[row, col]
+        (see OccupancyGrid), or None if the region is not on a widget
+
+        Given col, only that column's flags, indexed by row
+        '''
+        if (grid := self.region.occupancy) is None:
+            return None
+        if self._occupancy is None or self._occupancy[0] is not grid:
+            self._occupancy = (grid, grid.local_index(self.region))
+        if col is not None:
+            return grid.take(self._occupancy[1][:, col])
+        return grid.take(self._occupancy[1])
     
+    def T_failure(self) -> FailureReason:
+        '''
+        Reason for a refused T request: whether our region holds any T
+        '''
+        if (flags := self.local_flags()) is not None:
+            available = bool((flags & OccupancyGrid.T).any())
+        else:
+            available = any(cell.T_available() for row in self.region.sc_patches for cell in row)
+        return FailureReason.ROUTE_BLOCKED if available else FailureReason.NO_T_AVAILABLE
+
     def generic_transaction(self, source_patch, *args, target_orientation=None, **kwargs):
         trans = self._request_transaction(source_patch.x - self.region.offset[1], *args, **kwargs)
         if trans:
             return Response(ResponseStatus.CHECK_DOWNSTREAM, trans)
         else:
-            return Response()
+            return Response(reason=FailureReason.ROUTE_BLOCKED)
 
 class AbstractFactoryRouter(AbstractRouter):
     region: AbstractFactoryRegion
\ No newline at end of file
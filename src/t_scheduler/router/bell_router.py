@@ -1,6 +1,6 @@
 from t_scheduler.tracker.volume_tracker import SpaceTimeVolumeType
 from ..base.transaction import Transaction
-from ..base.response import Response, ResponseStatus
+from ..base.response import Response, ResponseStatus, FailureReason
 from ..base.gate import GateType
 from ..region.bell_region import BellRegion
 from .abstract_router import AbstractRouter, export_router
@@ -43,14 +43,14 @@ class BellRouter(AbstractRouter):
 
     def generic_transaction(self, *args, gate_type=GateType.T_STATE, **kwargs):
         if gate_type not in [GateType.BELL_IN, GateType.BELL_OUT]:
-            return Response()
+            return Response(reason=FailureReason.GATE_TYPE)
         
         if gate_type == GateType.BELL_IN and self.region.bell_type != "INPUT":
-            return Response()
+            return Response(reason=FailureReason.GATE_TYPE)
         elif gate_type == GateType.BELL_OUT and self.region.bell_type != "OUTPUT":
-            return Response()
+            return Response(reason=FailureReason.GATE_TYPE)
 
         if not self.region[0,0].locked():
             return Response(ResponseStatus.SUCCESS, self._make_transaction())
         else:
-            return Response()
+            return Response(reason=FailureReason.BELL_BUSY)
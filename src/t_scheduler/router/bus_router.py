@@ -1,4 +1,4 @@
-from ..base import Transaction, Response, ResponseStatus
+from ..base import Transaction, Response, ResponseStatus, FailureReason
 from ..region import RouteBus
 from .abstract_router import AbstractRouter, export_router
 
@@ -36,4 +36,4 @@ class StandardBusRouter(AbstractRouter):
         if trans:
             return Response(ResponseStatus.CHECK_DOWNSTREAM, trans)
         else:
-            return Response()
\ No newline at end of file
+            return Response(reason=FailureReason.ROUTE_BLOCKED)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from ..base.gate import GateType
-from ..base import Transaction, Response, ResponseStatus
+from ..base import Transaction, Response, ResponseStatus, FailureReason
 from ..region import TCultivatorBufferRegion
 from .abstract_router import AbstractRouter, export_router
 
@@ -51,7 +51,7 @@ class DenseTCultivatorBufferRouter(AbstractRouter):
         output_col = self.clamp(output_col, 0, self.region.width-1)
         queue = sorted(
             self.region.available_states, key=lambda p: 
-                (abs(p.local_x - output_col), p.local_y)
+                (abs(p.local_x - output_col), p.local_y, p.local_x)
         )
 
         for i, T_patch in enumerate(queue):
@@ -94,11 +94,11 @@ class DenseTCultivatorBufferRouter(AbstractRouter):
 
     def generic_transaction(self, source_patch, *args, target_orientation=None, gate_type = GateType.T_STATE, **kwargs):
         if gate_type != GateType.T_STATE:
-            return Response()
+            return Response(reason=FailureReason.GATE_TYPE)
         local_y, local_x = self.region.tl((source_patch.y - self.region.offset[0], source_patch.x - self.region.offset[1]))
         trans = self._request_transaction(local_x, *args, **kwargs)
         if trans:
             return Response(ResponseStatus.SUCCESS, trans)
         else:
-            return Response()
+            return Response(reason=self.T_failure())
 # TODO: Port flat_sparse router (in separate class)
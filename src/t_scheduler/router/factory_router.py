@@ -2,7 +2,7 @@ from collections import deque
 
 from ..base.gate import GateType
 
-from ..base import Transaction, Response, ResponseStatus, Patch
+from ..base import Transaction, Response, ResponseStatus, FailureReason, Patch
 from ..region import MagicStateFactoryRegion
 
 from .abstract_router import AbstractRouter, export_router
@@ -23,8 +23,14 @@ class MagicStateFactoryRouter(AbstractRouter):
             for c in range(self.region.width):
                 self.region[r, c].local_y = r
                 self.region[r, c].local_x = c
+                self.region[r, c].subscribe(self._invalidate_routes)
         self.magic_source = True
 
+        # (output patch, strict col) -> bfs result, valid while no patch
+        # the search examined changes
+        self.route_cache = {}
+        self.route_deps = {}
+
     def _make_transaction(self, path, connect=None):
         def on_activate_callback(trans: Transaction):
             self.region.available_states.remove(trans.magic_state_patch)  # type: ignore
@@ -54,23 +60,44 @@ class MagicStateFactoryRouter(AbstractRouter):
         """
         output_col = self.clamp(output_col, 0, self.region.width-1)
         queue = sorted(
-            self.region.available_states, key=lambda p: (abs(p.local_x - output_col), p.local_y)
+            self.region.available_states, key=lambda p: (abs(p.local_x - output_col), p.local_y, p.local_x)
         )
         for output in queue:
             if not output.T_available():
                 continue
             if strict_output_col:
-                path = self.bfs(output, strict_col=output_col)
+                path = self.cached_bfs(output, strict_col=output_col)
             else:
-                path = self.bfs(output)
+                path = self.cached_bfs(output)
 
             if path:
-                return self._make_transaction(path, connect=path[-1].local_x)
+                return self._make_transaction(list(path), connect=path[-1].local_x)
         return None
 
-    def bfs(self, curr_patch: Patch, strict_col=None):
+    def cached_bfs(self, curr_patch: Patch, strict_col=None):
+        '''
+        Memoized bfs, invalidated by change events of examined patches
+        '''
+        key = (curr_patch, strict_col)
+        if key in self.route_cache:
+            return self.route_cache[key]
+
+        examined = set()
+        path = self.route_cache[key] = self.bfs(curr_patch, strict_col, examined)
+        for patch in examined:
+            self.route_deps.setdefault(patch, set()).add(key)
+        return path
+
+    def _invalidate_routes(self, patch: Patch):
+        for key in self.route_deps.pop(patch, ()):
+            self.route_cache.pop(key, None)
+
+    def bfs(self, curr_patch: Patch, strict_col=None, examined=None):
         '''
         BFS from a T state along routing net to top row
+
+        examined: optional set, filled with every patch whose availability
+        the search depended on
         '''
         bfs_queue = deque([(curr_patch.local_y, curr_patch.local_x)])
         parent = {}
@@ -89,6 +116,8 @@ class MagicStateFactoryRouter(AbstractRouter):
             ]:
                 if 0 <= r < self.region.height and 0 <= c < self.region.width:
                     patch = self.region[r, c]
+                    if examined is not None:
+                        examined.add(patch)
                     if patch.route_available() and (r, c) not in seen:
                         parent[r, c] = (row, col)
                         bfs_queue.append((r, c))
@@ -105,10 +134,10 @@ class MagicStateFactoryRouter(AbstractRouter):
 
     def generic_transaction(self, source_patch, *args, target_orientation=None, gate_type=GateType.T_STATE, **kwargs):
         if gate_type != GateType.T_STATE:
-            return Response()
+            return Response(reason=FailureReason.GATE_TYPE)
         local_y, local_x = self.region.tl((source_patch.y - self.region.offset[0], source_patch.x - self.region.offset[1]))
         trans = self._request_transaction(local_x, *args, **kwargs)
         if trans:
             return Response(ResponseStatus.SUCCESS, trans)
         else:
-            return Response()
\ No newline at end of file
+            return Response(reason=self.T_failure())
\ No newline at end of file
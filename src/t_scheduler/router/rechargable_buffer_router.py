@@ -3,7 +3,7 @@ from typing import List
 from ..base.gate import GateType
 
 from .abstract_router import AbstractRouter, export_router
-from ..base import Transaction, Response, ResponseStatus, Patch
+from ..base import Transaction, Response, ResponseStatus, FailureReason, Patch
 from ..region import MagicStateBufferRegion
 
 @export_router(MagicStateBufferRegion)
@@ -21,23 +21,37 @@ class RechargableBufferRouter(AbstractRouter):
             for c in range(self.region.width):
                 self.region[r, c].local_y = r
                 self.region[r, c].local_x = c
+                self.region[r, c].subscribe(self._on_patch_change)
         self.upkeep_accept = True
 
-    def get_buffer_slots(self) -> List[None | Patch]:
-        buffer_lanes = []
-        for col in range(self.region.width):
+        # Per-column topmost free slot / topmost T, recomputed for dirty columns
+        self.buffer_slots: List[None | Patch] = [None] * self.region.width
+        self.buffer_states: List[None | Patch] = [None] * self.region.width
+        self.dirty_cols = set(range(self.region.width))
+
+        # (row, col) of T states that can shift into a free cell above
+        self.shiftable = set()
+        self.dirty_cells = {
+            (r, c) for r in range(1, self.region.height) for c in range(self.region.width)
+        }
+
+    def _on_patch_change(self, patch: Patch):
+        row, col = patch.local_y, patch.local_x
+        self.dirty_cols.add(col)
+        self.dirty_cells.add((row, col))
+        if row + 1 < self.region.height:
+            self.dirty_cells.add((row + 1, col))
+
+    def _refresh_columns(self):
+        for col in self.dirty_cols:
             topmost = None
             for row in range(self.region.height - 1, -1, -1):
                 if (cell := self.region[row, col]).route_available():
                     topmost = cell
                 else:
                     break
-            buffer_lanes.append(topmost)
-        return buffer_lanes
+            self.buffer_slots[col] = topmost
 
-    def get_buffer_states(self) -> List[None | Patch]:
-        buffer_lanes = []
-        for col in range(self.region.width):
             topmost = None
             for row in range(self.region.height):
                 if (cell := self.region[row, col]).T_available():
@@ -45,10 +59,16 @@ class RechargableBufferRouter(AbstractRouter):
                     break
                 elif not cell.route_available():
                     break
-            buffer_lanes.append(topmost)
-        return buffer_lanes
+            self.buffer_states[col] = topmost
+        self.dirty_cols.clear()
 
+    def get_buffer_slots(self) -> List[None | Patch]:
+        self._refresh_columns()
+        return list(self.buffer_slots)
 
+    def get_buffer_states(self) -> List[None | Patch]:
+        self._refresh_columns()
+        return list(self.buffer_states)
 
     def _request_transaction(
         self, output_col, strict_output_col: bool = False
@@ -95,8 +115,10 @@ class RechargableBufferRouter(AbstractRouter):
         trans = self.request_passthrough(local_x, **kwargs)
         if trans:
             return Response(ResponseStatus.CHECK_DOWNSTREAM, trans)
+        elif gate_type == GateType.T_STATE:
+            return Response(reason=self.T_failure())
         else:
-            return Response()
+            return Response(reason=FailureReason.ROUTE_BLOCKED)
 
     def upkeep_transaction(self, buffer_slot: Patch) -> Transaction:
         '''
@@ -113,13 +135,18 @@ class RechargableBufferRouter(AbstractRouter):
         '''
         Generate all local moves to shuffle T_state along column queues
         '''
+        for row, col in self.dirty_cells:
+            if row > 0 and self.region[row, col].T_available() and self.region[row - 1, col].route_available():
+                self.shiftable.add((row, col))
+            else:
+                self.shiftable.discard((row, col))
+        self.dirty_cells.clear()
+
         output_transactions = []
-        for row in range(1, self.region.height):
-            for col in range(0, self.region.width):
-                if (T := self.region[row, col]).T_available() and (
-                    above := self.region[row - 1, col]
-                ).route_available():
-                    output_transactions.append(
-                        Transaction([T, above], [above], magic_state_patch=T)
-                    )
+        for row, col in sorted(self.shiftable):
+            T = self.region[row, col]
+            above = self.region[row - 1, col]
+            output_transactions.append(
+                Transaction([T, above], [above], magic_state_patch=T)
+            )
         return output_transactions
@@ -3,7 +3,7 @@ from collections import deque
 
 from ..region.widget_region import TopEdgePosition
 
-from ..base import Transaction, Response, ResponseStatus, Patch
+from ..base import Transaction, Response, ResponseStatus, FailureReason, Patch
 from ..region import CombShapedRegisterRegion, SingleRowRegisterRegion
 from .abstract_router import AbstractRouter, export_router
 
@@ -33,7 +33,7 @@ class BaselineRegisterRouter(AbstractRouter):
     def generic_transaction(self, reg_patch, *args, target_orientation=None, **kwargs):
 
         if reg_patch.locked():
-            return Response()
+            return Response(reason=FailureReason.REGISTER_LOCKED)
 
         return Response(ResponseStatus.CHECK_DOWNSTREAM, Transaction(
             [reg_patch], [reg_patch], connect_col=reg_patch.local_x
@@ -126,11 +126,11 @@ class CombRegisterRouter(AbstractRouter):
     def generic_transaction(self, reg_patch, *args, target_orientation=None, **kwargs):
 
         if reg_patch.locked():
-            return Response()
+            return Response(reason=FailureReason.REGISTER_LOCKED)
 
         path = self.bfs(reg_patch, target_orientation=target_orientation)
 
         if not path:
-            return Response()
+            return Response(reason=FailureReason.ROUTE_BLOCKED)
 
         return Response(ResponseStatus.CHECK_DOWNSTREAM, Transaction(path, [reg_patch], connect_col=path[0].local_x))
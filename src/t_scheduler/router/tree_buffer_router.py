@@ -10,7 +10,8 @@ from ..base import (Patch,
                     PatchType, 
                     Transaction,
                     Response, 
-                    ResponseStatus)
+                    ResponseStatus,
+                    FailureReason)
 from ..region import PrefilledMagicStateRegion
 from .abstract_router import AbstractRouter, export_router
 
@@ -62,6 +63,32 @@ class TreeFilledBufferRouter(AbstractRouter):
     def __init__(self, buffer, depth_offset=2 / 3) -> None:
         self.region = buffer
 
+        height, width = self.region.height, self.region.width
+        self.cells = [[self.region[r, c] for c in range(width)] for r in range(height)]
+        # In-bounds neighbours of each cell, in search order, with whether
+        # they are in the same row
+        self.neighbours = {
+            (row, col): [
+                ((r, c), self.cells[r][c], r == row)
+                for r, c in [(row + 1, col), (row, col - 1), (row, col + 1), (row - 1, col)]
+                if 0 <= r < height and 0 <= c < width
+            ]
+            for row in range(height) for col in range(width)
+        }
+
+        # Route fields by start cell (see route_field) with the cells they
+        # looked at, and the start cells of the fields looking at each cell
+        self.fields = {}
+        self.field_deps = {}
+        self.cell_shapes = {}
+        for row in self.cells:
+            for cell in row:
+                self.cell_shapes[cell.local_y, cell.local_x] = (cell.patch_type, cell.orientation)
+                cell.subscribe(self._on_patch_change)
+
+        self.reparses = 0
+        self.field_builds = 0
+
         self.consumption_frontier = [
             TreeNode(None, [], q) for q in range(self.region.width // 2 + 1)
         ]
@@ -205,16 +232,71 @@ class TreeFilledBufferRouter(AbstractRouter):
 
         return None
 
+    def _on_patch_change(self, patch: Patch):
+        pos = (patch.local_y, patch.local_x)
+        shape = (patch.patch_type, patch.orientation)
+        if self.cell_shapes[pos] == shape:
+            # Lock or T availability, which fields do not depend on
+            return
+        self.cell_shapes[pos] = shape
+        for origin in self.field_deps.pop(pos, ()):
+            _, inspected = self.fields.pop(origin)
+            for other in inspected:
+                if other != pos:
+                    self.field_deps[other].discard(origin)
+
+    def route_field(self, start: Patch) -> List[List[Patch]]:
+        '''
+        Paths from start over ROUTE cells to T patches entered with a
+        matching rotation, in BFS order (a T may be reached more than once).
+        Kept until a cell the search looked at changes type or orientation,
+        as when a T is consumed and becomes ROUTE.
+        '''
+        origin = (start.local_y, start.local_x)
+        if (field := self.fields.get(origin)) is not None:
+            return field[0]
+        self.field_builds += 1
+
+        bfs_queue = deque([origin])
+        parent = {}
+        seen = {origin}
+        inspected = set()
+        results = []
+        while bfs_queue:
+            pos = bfs_queue.popleft()
+            for neighbour, patch, same_row in self.neighbours[pos]:
+                inspected.add(neighbour)
+                matching_rotation = same_row ^ (patch.orientation == PatchOrientation.Z_TOP)
+                if patch.patch_type == PatchType.T and matching_rotation:
+                    parent[neighbour] = pos
+                    results.append(neighbour)
+                elif patch.patch_type == PatchType.ROUTE and neighbour not in seen:
+                    parent[neighbour] = pos
+                    bfs_queue.append(neighbour)
+                    seen.add(neighbour)
+
+        fragments = []
+        for r, c in results:
+            fragment = [self.cells[r][c]]
+            while (r, c) in parent:
+                r, c = parent[r, c]
+                fragment.append(self.cells[r][c])
+            fragment.pop()
+            fragments.append(fragment[::-1])
+
+        self.fields[origin] = (fragments, inspected)
+        for pos in inspected:
+            self.field_deps.setdefault(pos, set()).add(origin)
+        return fragments
+
     def reparse_tree(self, tree_node: TreeNode):
+        self.reparses += 1
         curr_patch = tree_node.path[-1]
 
         row, col = curr_patch.local_y, curr_patch.local_x
-        new_patches: List[Patch] = []
-
-        for r, c in [(row + 1, col), (row, col - 1), (row, col + 1), (row - 1, col)]:
-            if 0 <= r < self.region.height and 0 <= c < self.region.width:
-                if (patch := self.region[r, c]).patch_type == PatchType.T:
-                    new_patches.append(patch)
+        new_patches: List[Patch] = [
+            patch for _, patch, _ in self.neighbours[row, col] if patch.patch_type == PatchType.T
+        ]
 
         new_children = []
         if new_patches:
@@ -227,49 +309,17 @@ class TreeFilledBufferRouter(AbstractRouter):
             tree_node.children = new_children
 
         if not new_children:
-            bfs_queue = deque([(curr_patch.local_y, curr_patch.local_x)])
-            parent = {}
-            seen = {(curr_patch.local_y, curr_patch.local_x)}
-            results = []
-            while bfs_queue:
-                row, col = bfs_queue.popleft()
-                if (row, col) in parent:
-                    pass
-
-                for r, c in [
-                    (row + 1, col),
-                    (row, col - 1),
-                    (row, col + 1),
-                    (row - 1, col),
-                ]:
-                    if 0 <= r < self.region.height and 0 <= c < self.region.width:
-                        patch = self.region[r, c]
-                        matching_rotation = (row == r) ^ (
-                            patch.orientation == PatchOrientation.Z_TOP
-                        )
-                        if patch.patch_type == PatchType.T and matching_rotation:
-                            parent[r, c] = (row, col)
-                            results.append((r, c))
-                        elif patch.patch_type == PatchType.ROUTE and (r, c) not in seen:
-                            parent[r, c] = (row, col)
-                            bfs_queue.append((r, c))
-                            seen.add((r, c))
-            for r, c in results:
-                fragment = [self.region[r, c]]
-                while (r, c) in parent:
-                    r, c = parent[r, c]
-                    fragment.append(self.region[r, c])
-                fragment.pop()
-                new_children.append(
-                    TreeNode(tree_node, tree_node.path + fragment[::-1])
-                )
-            tree_node.children = new_children
+            tree_node.children = [
+                TreeNode(tree_node, tree_node.path + fragment)
+                for fragment in self.route_field(curr_patch)
+            ]
+
     def generic_transaction(self, source_patch, *args, target_orientation=None, gate_type = GateType.T_STATE, **kwargs):
         if gate_type != GateType.T_STATE:
-            return Response()
+            return Response(reason=FailureReason.GATE_TYPE)
         reg_col = self.clamp(source_patch.x - self.region.offset[1], 0, self.region.width - 1)
         trans = self._request_transaction(reg_col // 2, **kwargs)
         if trans:
             return Response(ResponseStatus.SUCCESS, trans)
         else:
-            return Response()
\ No newline at end of file
+            return Response(reason=self.T_failure())
\ No newline at end of file
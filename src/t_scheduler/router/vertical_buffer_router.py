@@ -2,7 +2,8 @@ from typing import List
 
 from ..base.gate import GateType
 
-from ..base import Patch, Transaction, Response, ResponseStatus
+from ..base import Patch, Transaction, Response, ResponseStatus, FailureReason
+from ..base.occupancy import OccupancyGrid
 from ..region import PrefilledMagicStateRegion, WidgetRegion
 from .abstract_router import AbstractRouter, export_router
 
@@ -54,6 +55,12 @@ class VerticalFilledBufferRouter(AbstractRouter):
         """
         Finds an available T state in the column output_col
         """
+        if (flags := self.local_flags(output_col)) is not None:
+            column = (flags & OccupancyGrid.T) > 0
+            if column.any():
+                return self.region[int(column.argmax()), output_col]
+            return None
+
         for r in range(self.region.height):
             if (patch := self.region[r, output_col]).T_available():
                 return patch
@@ -70,6 +77,11 @@ class VerticalFilledBufferRouter(AbstractRouter):
 
         (consumed magic states -- previously reset to |+>)
         """
+        if (flags := self.local_flags(output_col)) is not None:
+            column = (flags & OccupancyGrid.ROUTE) > 0
+            length = int(column.argmin()) if not column.all() else self.region.height
+            return [self.region[i, output_col] for i in range(length)]
+
         prefix = []
         for i in range(self.region.height):
             if (patch := self.region[i, output_col]).route_available():
@@ -184,7 +196,7 @@ class VerticalFilledBufferRouter(AbstractRouter):
 
     def generic_transaction(self, source_patch, *args, target_orientation=None, gate_type = GateType.T_STATE, **kwargs):
         if gate_type != GateType.T_STATE:
-            return Response()
+            return Response(reason=FailureReason.GATE_TYPE)
         buffer_cols = []
         reg_col = self.clamp(source_patch.x - self.region.offset[1], 0, self.region.width - 1)
         buffer_cols.append(reg_col)
@@ -196,4 +208,4 @@ class VerticalFilledBufferRouter(AbstractRouter):
         if trans:
             return Response(ResponseStatus.SUCCESS, trans)
         else:
-            return Response()
\ No newline at end of file
+            return Response(reason=self.T_failure())
\ No newline at end of file
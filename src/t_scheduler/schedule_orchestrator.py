@@ -1,3 +1,4 @@
+from __future__ import annotations
 from collections import deque
 
 from .strategy import BaseStrategy
@@ -5,6 +6,13 @@ from .widget import Widget
 from .tracker import *
 from .base import *
 from .base.gate import RotateGate
+from .base.ready_queue import ReadyQueue, T_available, any_change
+from .checkpoint import FORMAT_VERSION, Checkpoint, CheckpointCache, CheckpointError
+from .output import (
+    FrameSink, TextSink, TexFileSink, AsyncFrameSink, NDJSONFrameWriter,
+    DeltaFrameEncoder, TraceRecorder, TikzTrace, BoardSnapshotter, SnapshotFormatter,
+    header_record, layer_record,
+)
 
 TOCK_PHASES = ["graph_state", "bell", "t_schedule", "bell2"]
 
@@ -16,20 +24,54 @@ class ScheduleOrchestrator:
         strategy,
         debug: bool = False,
         tikz_output: bool = False,
-        json: bool=False
+        json: bool=False,
+        fast_forward: bool = False,
+        json_stream=None,
+        keyframe_interval: int | None = None,
+        trace: TraceRecorder | None = None,
+        tikz_trace: TikzTrace | None = None,
+        output_queue: int | None = None,
+        hooks: HookRegistry | None = None,
     ):
+        '''
+        json: keep every board frame in self.json, written by save_json()
+        json_stream: path or text file to stream board frames to as NDJSON
+            (see output.NDJSONFrameWriter), instead of holding them in memory,
+            or any output.FrameSink to send the frame records to
+        keyframe_interval: stream delta frames with a full keyframe every
+            this many ticks (see output.DeltaFrameEncoder)
+        trace: output.TraceRecorder to record the cells held per tick,
+            output_layers then only keeps the latest tick
+        tikz_trace: output.TikzTrace to record board glyphs per tick, for
+            rendering TikZ frames afterwards with output.TikzRenderer
+            (routes are taken from trace) instead of during scheduling
+        output_queue: write debug prints, TikZ frames and streamed frames
+            from background threads, through queues of this many records
+            (see output.AsyncFrameSink); closed when schedule() completes,
+            see close_output(). Ticks are handed over as board snapshots
+            (see output.BoardSnapshotter), so formatting them happens on
+            those threads too
+        hooks: tracker.HookRegistry to call back into and time each phase
+            of schedule_pass with, its routers' transactions are timed too
+            (untimed registries only make the callbacks)
+        '''
         self.widget: Widget = widget
         self.strategy: BaseStrategy = strategy
 
         self.processed = set()
 
+        # Successors waiting on predecessors: gate -> [remaining, time first seen]
+        self.pending_pre = {}
+
         self.waiting = deque(gate_dag_roots)
-        self.queued = []
+        self.queued = ReadyQueue()
 
         self.active = deque()
         self.next_active = []
 
-        self.output_layers = []
+        self.trace = trace
+        self.output_layers = deque(maxlen=1) if trace is not None else []
+        self.tikz_trace = tikz_trace
 
         self.curr_layer = []
 
@@ -37,13 +79,37 @@ class ScheduleOrchestrator:
 
         self.ROTATION_DURATION = 3
         self.time = 0
+        self.time_limit = float('inf')
 
         self.tikz_output = tikz_output
         self.json_output = json
-
-        if self.tikz_output or self.json_output:
+        self.output_queue = output_queue
+        self.snapshotter = None
+        if output_queue is not None and (debug or tikz_output or (json_stream is not None and keyframe_interval is None)):
+            self.snapshotter = BoardSnapshotter(self.widget, routes=tikz_output)
+        self.debug_sink = self.make_sink(TextSink(), 'text') if debug else None
+        self.tikz_sink = self.make_sink(TexFileSink("out"), 'tikz') if tikz_output else None
+        self.json_stream = None
+        # Whether json_stream wraps a sink we made, rather than the caller's
+        self.owns_json_stream = False
+        self.frame_encoder = None
+
+        # Skipped cycles produce no per-cycle output, so only skip when headless
+        self.fast_forward = fast_forward and not (debug or tikz_output or json or json_stream)
+
+        if self.tikz_output or self.json_output or json_stream is not None:
             self.output_objs = []
             self.widget.make_coordinate_adapter()
+
+        if json_stream is not None:
+            if not isinstance(json_stream, FrameSink):
+                json_stream = NDJSONFrameWriter(json_stream)
+                self.owns_json_stream = True
+            # Delta frames are cheap to encode here already
+            self.json_stream = self.make_sink(json_stream, 'json' if keyframe_interval is None else None)
+            self.json_stream.write(header_record(self.widget))
+            if keyframe_interval is not None:
+                self.frame_encoder = DeltaFrameEncoder(self.widget, keyframe_interval)
         
         if self.json_output:
             self.json = {'regions': self.widget.save_json_regions(), 
@@ -52,11 +118,60 @@ class ScheduleOrchestrator:
                          'height': self.widget.height,
                          'base_layer': self.widget.save_json_patches_state()}
 
+        self.hooks = hooks
+        if hooks is not None and hooks.timed:
+            hooks.instrument(self.strategy)
+
+        self.alloc_failures = AllocFailureTracker(self.strategy)
+
         self.vol_tracker = SpaceTimeVolumeTracker(self)
         self.strategy.register_vol_tracker(self.vol_tracker) # type: ignore
 
         self.tock_obj = {}
 
+    def make_sink(self, sink: FrameSink, kind=None) -> FrameSink:
+        '''
+        kind: format of the per-tick records of sink, if written from
+            board snapshots (see output.SnapshotFormatter)
+        '''
+        if self.output_queue is not None:
+            if kind is not None:
+                sink = SnapshotFormatter(sink, kind, self.widget)
+            return AsyncFrameSink(sink, self.output_queue)
+        return sink
+
+    def flush_output(self):
+        '''
+        Wait for per-tick output to be written out
+        '''
+        for sink in (self.debug_sink, self.tikz_sink, self.json_stream):
+            if sink is not None:
+                sink.flush()
+
+    def close_output(self):
+        '''
+        Write out per-tick output and end its background threads. Sinks we
+        made are closed, a FrameSink passed as json_stream is only flushed
+        and stays open for the caller. Raises the first error of a sink
+        once all are closed.
+        '''
+        error = None
+        for sink in (self.debug_sink, self.tikz_sink, self.json_stream):
+            if sink is None:
+                continue
+            try:
+                if sink is self.json_stream and not self.owns_json_stream:
+                    if isinstance(sink, AsyncFrameSink):
+                        sink.stop()
+                    else:
+                        sink.flush()
+                else:
+                    sink.close()
+            except BaseException as e:
+                error = error or e
+        if error is not None:
+            raise error
+
     def save_tikz_frame(self):
         from lattice_surgery_draw.primitives.composers import TexFile
         with open(f"out/{self.time}.tex", "w") as f:
@@ -72,18 +187,145 @@ class ScheduleOrchestrator:
         with open(f"out/json.out", 'w') as f:
             json.dump(self.json, f)
 
-    def prewarm(self, num_cycles):
+    def prewarm(self, num_cycles, cache: CheckpointCache | None = None, key=None):
+        '''
+        Run the board without gates for num_cycles cycles
+
+        cache: CheckpointCache to restore the prewarmed board from, or to
+            store it in. Entries are addressed by num_cycles, the clock, the
+            strategy and router types, the widget fingerprint (layout and
+            generator RNG states, so only seeded widgets can hit), the
+            checkpoint format version and key. Unreadable entries are misses.
+        key: JSON value for anything else the prewarm depends on, e.g. the
+            template parameters
+        '''
         print("prewarm", num_cycles)
-        for _ in range(num_cycles):
+        if cache is not None:
+            if (self.debug or self.tikz_output or self.json_output or self.json_stream is not None
+                    or self.trace is not None or self.tikz_trace is not None):
+                raise ValueError("Can only cache the prewarm of an orchestrator without output")
+            cache_key = {
+                'version': FORMAT_VERSION,
+                'key': key,
+                'cycles': num_cycles,
+                'time': self.time,
+                'strategy': [type(obj).__qualname__ for obj in (self.strategy, *self.strategy.routers)],
+                'widget': self.widget.fingerprint(),
+            }
+            if (checkpoint := cache.get(cache_key)) is not None:
+                try:
+                    self.restore(checkpoint)
+                    return
+                except CheckpointError:
+                    # Overwritten by the prewarm below
+                    pass
+
+        self.time_limit = self.time + num_cycles
+        while self.time < self.time_limit:
             self.schedule_pass(prewarm=True)
+        self.time_limit = float('inf')
+
+        if cache is not None:
+            cache.put(cache_key, self.checkpoint())
+
+    def checkpoint(self) -> Checkpoint:
+        '''
+        Snapshot the board (widget, strategy, gates in flight, trackers and
+        clock) to start other runs from, see from_checkpoint(). Only valid
+        before scheduling starts, e.g. right after prewarm().
+        '''
+        if self.queued or self.processed or self.pending_pre:
+            raise ValueError("Can only checkpoint before scheduling starts")
+        if self.frame_encoder is not None or self.tikz_trace is not None or self.snapshotter is not None:
+            # These subscribe to every patch
+            raise ValueError("Can't checkpoint an orchestrator recording delta, TikZ or queued frames")
+
+        # Instance level wrappers of routers (e.g. HookRegistry timers) are
+        # closures, and belong to this orchestrator anyway
+        wrapped = [
+            (router, router.__dict__.pop('generic_transaction'))
+            for router in self.strategy.routers
+            if 'generic_transaction' in router.__dict__
+        ]
+        try:
+            # The widget and strategy are captured by value, so can be
+            # restored into existing objects
+            return Checkpoint.capture(
+                {'orchestrator': self, 'widget': self.widget, 'strategy': self.strategy},
+                {
+                    'widget': vars(self.widget),
+                    'strategy': vars(self.strategy),
+                    'active': list(self.active),
+                    'vol_tracker': self.vol_tracker,
+                    'alloc_failures': self.alloc_failures,
+                    'time': self.time,
+                    'tock_obj': self.tock_obj,
+                })
+        finally:
+            for router, generic_transaction in wrapped:
+                router.generic_transaction = generic_transaction
+
+    def restore(self, checkpoint: Checkpoint):
+        '''
+        Put this orchestrator's widget and strategy objects back into the
+        state of checkpoint, which must be of the same layout. Only valid
+        before scheduling starts.
+        '''
+        if self.queued or self.processed or self.pending_pre:
+            raise ValueError("Can only restore before scheduling starts")
+        _, state = checkpoint.load(orchestrator=self, widget=self.widget, strategy=self.strategy)
+        for name, obj in (('widget', self.widget), ('strategy', self.strategy)):
+            vars(obj).clear()
+            vars(obj).update(state[name])
+        self._load_state(state)
+        # The routers are new objects
+        if self.hooks is not None and self.hooks.timed:
+            self.hooks.instrument(self.strategy)
+
+    def _load_state(self, state: dict):
+        self.vol_tracker = state['vol_tracker']
+        self.strategy.register_vol_tracker(self.vol_tracker) # type: ignore
+        self.alloc_failures = state['alloc_failures']
+        self.active = deque(state['active'])
+        self.time = state['time']
+        self.tock_obj = state['tock_obj']
+
+    @staticmethod
+    def from_checkpoint(checkpoint: Checkpoint, gate_dag_roots, **kwargs) -> ScheduleOrchestrator:
+        '''
+        New orchestrator for gate_dag_roots on a copy of the board in
+        checkpoint, taking the other constructor arguments as kwargs. Its
+        strategy is a copy too, so can be changed before scheduling.
+        '''
+        roots, state = checkpoint.load()
+        orc, widget, strategy = roots['orchestrator'], roots['widget'], roots['strategy']
+        vars(widget).update(state['widget'])
+        vars(strategy).update(state['strategy'])
+        orc.__init__(gate_dag_roots, widget, strategy, **kwargs)
+        orc._load_state(state)
+        return orc
+
+    def fork(self, gate_dag_roots, **kwargs) -> ScheduleOrchestrator:
+        '''
+        from_checkpoint() of a checkpoint of this orchestrator
+        '''
+        return ScheduleOrchestrator.from_checkpoint(self.checkpoint(), gate_dag_roots, **kwargs)
 
     def schedule(self):
         print("schedule")
         start_tock = self.time
         self.queued.extend(self.waiting)
 
-        while self.queued or self.active:
-            self.schedule_pass()
+        try:
+            while self.queued or self.active:
+                self.schedule_pass()
+        except BaseException:
+            # Still end the output threads, the original error wins
+            try:
+                self.close_output()
+            except BaseException:
+                pass
+            raise
 
         for row in self.strategy.register_router.region.sc_patches:
             for cell in row:
@@ -94,16 +336,19 @@ class ScheduleOrchestrator:
                     cell.reg_vol_tag.apply()
 
         self.tock_obj["t_schedule"] = self.time - start_tock
+        self.close_output()
 
     def prepare_gs(self, gs_dag_roots, all_gs_gates=tuple(), time_limit=float('inf')):
         # Process our gate queue
 
         queue_backup = self.queued
 
-        self.queued = gs_dag_roots
+        self.queued = ReadyQueue(gs_dag_roots)
+        self.time_limit = time_limit
 
         while (self.queued or self.active) and self.time < time_limit:
             self.schedule_pass()
+        self.time_limit = float('inf')
         
         if set(all_gs_gates).difference(self.processed):
             raise Exception(f"Graph state prep didn't finish in the time limit ({time_limit})")
@@ -119,10 +364,12 @@ class ScheduleOrchestrator:
 
         queue_backup = self.queued
 
-        self.queued = bell_gates
+        self.queued = ReadyQueue(bell_gates)
+        self.time_limit = time_limit
 
         while (self.queued or self.active) and self.time < time_limit:
             self.schedule_pass()
+        self.time_limit = float('inf')
         
         if set(bell_gates).difference(self.processed):
             raise Exception(f"Bell IO didn't finish in the time limit ({time_limit})")
@@ -137,49 +384,92 @@ class ScheduleOrchestrator:
             self.tock_obj["bell2"] = duration
 
     def schedule_pass(self, prewarm=False):
+        # Whether this pass left the board untouched
+        idle = True
+
+        hooks = self.hooks
+        if hooks is not None:
+            hooks.tick_start(self)
+
         if not prewarm:
             # Process our gate queue
 
             # self.queued.sort(key=lambda gate: gate.schedule_weight)
 
-            next_queued = []
-            for gate in self.queued:
+            for gate in self.queued.drain():
                 if gate in self.processed:
-                    continue
-                elif gate.available() and (active_gate := self.strategy.alloc_gate(gate)):
-                    if not isinstance(active_gate, RotateGate):
-                        # TODO don't check like this: ugly
-                        active_gate.vol_tag = self.vol_tracker.make_tag(SpaceTimeVolumeType.ROUTING_VOLUME)
-                        active_gate.vol_tag.start()
-
-                    self.active.append(active_gate)
-                    self.processed.add(active_gate)
+                    self.queued.discard(gate)
+                elif (resource := self.strategy.blocked_on(gate)) is not None:
+                    self.queued.block(gate, resource)
+                    self.alloc_failures.record(
+                        self.time, [(self.strategy.register_router, FailureReason.REGISTER_LOCKED)]
+                    )
                 else:
-                    next_queued.append(gate)
-
-            self.queued = next_queued
+                    if hooks is not None:
+                        hooks.alloc_attempt(self, gate)
+
+                    if active_gate := self.strategy.alloc_gate(gate):
+                        if not isinstance(active_gate, RotateGate):
+                            # TODO don't check like this: ugly
+                            active_gate.vol_tag = self.vol_tracker.make_tag(SpaceTimeVolumeType.ROUTING_VOLUME)
+                            active_gate.vol_tag.start()
+
+                        self.queued.discard(gate)
+                        self.active.append(active_gate)
+                        self.processed.add(active_gate)
+                        idle = False
+
+                        if hooks is not None:
+                            hooks.alloc_success(self, gate, active_gate)
+                    else:
+                        if regions := self.strategy.starved_on(gate):
+                            self.queued.block(gate, *regions, wake=T_available)
+                        elif regions := self.strategy.route_blocked_on(gate):
+                            self.queued.block(gate, *regions, wake=any_change)
+                        else:
+                            self.queued.retry(gate)
+                        self.alloc_failures.record(self.time, self.strategy.failures)
+
+            if hooks is not None:
+                hooks.lap('alloc')
 
         if self.strategy.needs_upkeep:
-            self.active.extend(self.strategy.upkeep())
+            if upkeep_gates := self.strategy.upkeep():
+                self.active.extend(upkeep_gates)
+                idle = False
 
-        # Print widget board state
-        if self.debug:
-            print(self.widget.to_str_output_dedup(), end="")
+            if hooks is not None:
+                hooks.lap('upkeep')
+                hooks.fire('on_upkeep', self, upkeep_gates)
 
         self.output_layers.append([])
         for gate in self.active:
             self.output_layers[-1].append(gate.transaction.active_cells)
+        if self.trace is not None:
+            self.trace.record(self.time, self.active)
+        if self.tikz_trace is not None:
+            self.tikz_trace.record(self.time)
 
-        if self.tikz_output:
-            from lattice_surgery_draw.primitives.composers import TexFile
+        # Queued sinks format the board from a snapshot on their own threads
+        snapshot = None
+        if self.snapshotter is not None:
+            snapshot = self.snapshotter.snapshot(self.time, self.output_layers[-1])
 
-            with open(f"out/{self.time}.tex", "w") as f:
-                output = TexFile(
-                    self.widget.save_tikz_frame(
-                        self.widget.make_tikz_routes(self.output_layers[-1])
-                    )
-                )
-                print(output, file=f)
+        # Print widget board state
+        if self.debug_sink and snapshot is not None:
+            self.debug_sink.write(snapshot)
+        elif self.debug_sink:
+            self.debug_sink.write(self.widget.to_str_output_dedup())
+
+        if self.tikz_sink and snapshot is not None:
+            self.tikz_sink.write(snapshot)
+        elif self.tikz_sink:
+            self.tikz_sink.write((
+                self.time,
+                self.widget.save_tikz_frame(
+                    self.widget.make_tikz_routes(self.output_layers[-1])
+                ),
+            ))
 
             # from lattice_surgery_draw.tikz_layer import TikzLayers
             # print('\\begin{tikzpicture}[scale=0.5]', file=file)
@@ -191,26 +481,49 @@ class ScheduleOrchestrator:
         if self.json_output:
             self.json['layers'].append(self.widget.save_json_patches_state())
 
+        if self.frame_encoder:
+            self.json_stream.write(self.frame_encoder.encode(self.time)) # type: ignore
+        elif snapshot is not None and self.json_stream:
+            self.json_stream.write(snapshot)
+        elif self.json_stream:
+            self.json_stream.write(layer_record(self.time, self.widget.save_json_patches_state()))
+
+        if hooks is not None:
+            hooks.lap('output')
+
         for gate in self.active:
             gate.tick()
 
-        self.widget.update()
+        if hooks is not None:
+            hooks.lap('gate_tick')
+
+        if self.widget.update():
+            idle = False
+
+        if hooks is not None:
+            hooks.lap('widget_update')
 
         for gate in self.active:
+            if gate.completed():
+                idle = False
             gate.cleanup(self)
 
+        if hooks is not None:
+            hooks.lap('gate_cleanup')
+
         for gate in self.active:
             gate.next(self)
             if not gate.completed():
                 self.next_active.append(gate)
             else:
-                for child in gate.post:
-                    if all(g.completed() for g in child.pre):
-                        if self.debug:
-                            print("queuing", child)
-                        self.queued.append(child)
+                self.retire(gate)
                 if gate.vol_tag:
                     gate.vol_tag.apply(space = gate.transaction.route_count())
+                if hooks is not None:
+                    hooks.fire('on_gate_retire', self, gate)
+
+        if hooks is not None:
+            hooks.lap('gate_next')
 
         # print(self.time, self.active)
 
@@ -218,6 +531,60 @@ class ScheduleOrchestrator:
         self.next_active = deque()
         self.time += 1
 
+        if self.fast_forward and idle:
+            self.skip_idle_cycles()
+            if hooks is not None:
+                hooks.lap('fast_forward')
+
+        if hooks is not None:
+            hooks.tick_end(self)
+
+    def skip_idle_cycles(self):
+        '''
+        Jump to the next cycle where a gate can complete or a T generator
+        can emit.
+
+        Only valid after an idle pass: until the next such event every
+        pass repeats it, apart from gate timers and generator countdowns.
+        Volume tags read self.time, so they account the skipped cycles.
+        '''
+        cycles = min(self.widget.idle_cycles(), self.time_limit - self.time)
+        for gate in self.active:
+            cycles = min(cycles, gate.idle_cycles())
+
+        if cycles <= 0 or cycles == float('inf'):
+            return
+        cycles = int(cycles)
+
+        for gate in self.active:
+            gate.skip(cycles)
+        self.widget.skip(cycles)
+
+        self.output_layers.extend([self.output_layers[-1]] * cycles)
+        if self.trace is not None:
+            self.trace.repeat(range(self.time, self.time + cycles))
+        self.time += cycles
+
+    def retire(self, gate):
+        '''
+        Queue successors of a completed gate once all their predecessors
+        have completed.
+        '''
+        for child in gate.post:
+            if (pending := self.pending_pre.get(child)) is None:
+                remaining = sum(1 for g in child.pre if not g.completed())
+                pending = self.pending_pre[child] = [remaining, self.time]
+            elif pending[1] != self.time:
+                # Predecessors completing this cycle were already discounted
+                pending[0] -= 1
+
+            if pending[0] <= 0:
+                del self.pending_pre[child]
+                if child not in self.queued:
+                    if self.debug_sink:
+                        self.debug_sink.write(f"queuing {child}\n")
+                    self.queued.append(child)
+
     def get_space_time_volume(self):
         # volume = 0
         # for layer in self.output_layers:
@@ -232,6 +599,9 @@ class ScheduleOrchestrator:
     def get_T_stats(self):
         return self.vol_tracker.t_usage
 
+    def get_failure_stats(self):
+        return self.alloc_failures.report()
+
     def get_total_cycles(self) -> int:
         return self.time
     
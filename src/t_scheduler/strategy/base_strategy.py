@@ -1,8 +1,9 @@
-from typing import Any, List
+from typing import Any, List, Tuple
 
 from ..base.gate import GateType
-from ..base import Gate, TransactionList
+from ..base import Gate, Patch, TransactionList, FailureReason
 from ..router import BaselineRegisterRouter, StandardBusRouter
+from ..region import WidgetRegion
 
 
 
@@ -10,6 +11,10 @@ class BaseStrategy:
     register_router: BaselineRegisterRouter
     needs_upkeep: bool = False
 
+    # (router, reason) of requests refused during the last alloc_gate,
+    # router is None for refusals by the strategy itself
+    failures: List[Tuple[Any, FailureReason | None]] = tuple() # type: ignore
+
     def __init__(self, register_router) -> None:
         self.register_router = register_router
 
@@ -30,6 +35,7 @@ class BaseStrategy:
 
         If nonlocal, then we dispatch to alloc_nonlocal.
         '''
+        self.failures = []
 
         if gate.gate_type in {GateType.T_STATE, GateType.BELL_IN, GateType.BELL_OUT}:
             return self.alloc_nonlocal(gate)
@@ -45,6 +51,7 @@ class BaseStrategy:
                     target_pos, request_type="local"
                 )
             ):
+                self.failures.append((self.register_router, FailureReason.REGISTER_LOCKED))
                 return None
 
             gate.activate(register_transaction)
@@ -60,6 +67,10 @@ class BaseStrategy:
                 gate.activate(register_transaction)
                 return gate
 
+            if self.register_router.region[target_pos].locked():
+                self.failures.append((self.register_router, FailureReason.REGISTER_LOCKED))
+            else:
+                self.failures.append((self.register_router, FailureReason.ROUTE_BLOCKED))
             return None
 
             # TODO: Reimplement fallback
@@ -82,6 +93,58 @@ class BaseStrategy:
             # return gate
 
 
+    def blocked_on(self, gate: Gate) -> Patch | None:
+        '''
+        Get a register patch that currently prevents gate from being
+        allocated, if any.
+
+        Register routers refuse every request on a locked register, so
+        the orchestrator can park gate until this patch unlocks.
+        '''
+        if (mapper := getattr(self, 'mapper', None)) is None:
+            return None
+
+        targs = getattr(gate, 'targs', None) or (gate.targ,)
+        for targ in targs:
+            reg_patch = self.register_router.region[mapper.position_xy(targ)[::-1]] # type: ignore
+            if reg_patch.locked():
+                return reg_patch
+        return None
+
+    def starved_on(self, gate: Gate) -> List[WidgetRegion] | None:
+        '''
+        Get the regions to watch for T states after gate failed allocation
+        because no T state is available anywhere on the widget, if so.
+
+        Every request for a T is refused until one of these regions makes
+        one available, so the orchestrator can park gate until then.
+        '''
+        if gate.gate_type != GateType.T_STATE:
+            return None
+        if not any(reason == FailureReason.NO_T_AVAILABLE for _, reason in self.failures):
+            return None
+        if (grid := self.register_router.region.occupancy) is None or grid.n_T:
+            return None
+        # Register regions never hold T states
+        return [router.region for router in getattr(self, 'routers', ()) if router is not self.register_router]
+
+    def route_blocked_on(self, gate: Gate) -> List[WidgetRegion] | None:
+        '''
+        Get the regions to watch for changes after gate failed allocation
+        only because no T state could be routed to it: every refusal was
+        ROUTE_BLOCKED or NO_T_AVAILABLE.
+
+        Routing only depends on the patches of these regions, so the same
+        request is refused until one of them changes and the orchestrator
+        can park gate until then.
+        '''
+        if gate.gate_type != GateType.T_STATE or not self.failures:
+            return None
+        if any(reason not in (FailureReason.ROUTE_BLOCKED, FailureReason.NO_T_AVAILABLE)
+               for _, reason in self.failures):
+            return None
+        return [router.region for router in getattr(self, 'routers', ())] or None
+
     def upkeep(self) -> List[Gate]:
         raise NotImplementedError()
     
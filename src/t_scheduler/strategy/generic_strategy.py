@@ -112,6 +112,7 @@ class GenericStrategy(BaseStrategy):
             # initially. Track this in the patch.
 
             T_patch.orientation = T_patch.orientation.inverse()
+            T_patch.changed()
 
             gate.activate(transaction_list)
             return gate
@@ -151,6 +152,7 @@ class GenericStrategy(BaseStrategy):
         #             self.active.append(rot_gate)
         # TODO inject current cycle time / interfact for past injection
         elif self.rotation_option == RotationStrategyOption.REJECT:
+            self.failures.append((None, FailureReason.ROTATION_REJECTED))
             return None
         else:
             raise NotImplementedError()
@@ -188,7 +190,9 @@ class GenericStrategy(BaseStrategy):
             if len(curr_router.downstream) == 0:
                 resp : Response = curr_router.generic_transaction(source_patch, gate_type=gate.gate_type)
 
-                if resp.status == ResponseStatus.SUCCESS:
+                if not resp.status:
+                    self.failures.append((curr_router, resp.reason))
+                elif resp.status == ResponseStatus.SUCCESS:
                     # Resource found in curr router!
                     # Now check if path available...
 
@@ -215,6 +219,7 @@ class GenericStrategy(BaseStrategy):
                     return return_resp
 
             elif not resp.status:
+                self.failures.append((curr_router, resp.reason))
                 continue
 
             dfs_stack.append((downstream_router, 0, resp.downstream_patch))
@@ -244,6 +249,7 @@ class GenericStrategy(BaseStrategy):
                 transactions = TransactionList()
 
             if not resp.status:
+                self.failures.append((upstream_router, resp.reason))
                 return None
 
             transactions.append(resp.transaction)
@@ -302,7 +308,9 @@ class GenericStrategy(BaseStrategy):
                 continue
 
             slots = buffer_router.get_buffer_slots()
-            for state in list(factory_router.region.available_states):
+            # Sets iterate in id order, which differs between otherwise
+            # identical boards (e.g. forks of a checkpoint)
+            for state in sorted(factory_router.region.available_states, key=lambda p: (p.local_y, p.local_x)):
                 if not state.T_available():
                     continue
 
@@ -386,6 +394,7 @@ class GenericStrategy(BaseStrategy):
                                   for patch in targs_patches]
 
         if any(not r.status for r in resps):
+            self.failures.extend((self.register_router, r.reason) for r in resps if not r.status)
             return None
 
         # resp2.transaction.move_patches = resp2.transaction.move_patches[::-1] # type: ignore
@@ -396,6 +405,7 @@ class GenericStrategy(BaseStrategy):
         bus_resp: Response = bus_router.generic_transaction(bus_source, bus_dest)
 
         if not bus_resp.status:
+            self.failures.append((bus_router, bus_resp.reason))
             return None
 
         new_move_patches = []
@@ -0,0 +1,237 @@
+'''
+Parameter sweeps over the widget templates
+
+A sweep spec is a JSON object:
+
+{
+    "seed": 0,                                  # base seed
+    "repeats": 1,                               # runs per configuration
+    "prewarm": 0,                               # prewarm cycles
+    "reg_width": 2,                             # DummyMapper register width
+    "fast_forward": true,                       # skip idle cycles
+    "prewarm_cache": "prewarm_cache",           # optional, see below
+    "schedules": ["tests/qft_test_obj.json"],   # consumption schedules
+    "runs": [
+        {
+            "template": "buffered_naive_buffered_widget",
+            "grid": {
+                "width": [10, 12],
+                "height": [18],
+                "buffer_height": [2],
+                "factory_factory": ["MagicStateFactoryRegion.with_litinski_6x3_dense"],
+                "rot_strat": ["ADD_DELAY", "BACKPROP_INIT"]
+            }
+        }
+    ]
+}
+
+Every grid entry is a list of values, and the sweep runs the cartesian
+product. Grid keys are passed to the template, except for the run options
+prewarm, reg_width and n_targets (register targets, default
+width // reg_width), which may also be swept.
+
+Each finished run is appended as one JSON line to the output file, and
+rerunning a sweep skips runs already present. Run seeds derive from the
+base seed and the run's parameters only, so they do not depend on worker
+scheduling or on resuming.
+
+With prewarm_cache set, prewarmed boards are kept in that directory (a
+checkpoint.CheckpointCache of at most prewarm_cache_bytes, default 1 GiB),
+so rerunning a sweep over the same layouts and seeds skips the prewarms.
+
+Usage: python -m t_scheduler.sweep spec.json results.ndjson [--workers N]
+'''
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+import hashlib
+import itertools
+import json
+import os
+from typing import Dict, List
+
+from .checkpoint import CheckpointCache
+from .schedule_orchestrator import ScheduleOrchestrator
+from .base import util
+from .strategy.generic_strategy import DummyMapper, RotationStrategyOption
+from .templates import generic_templates
+
+RUN_OPTIONS = ('prewarm', 'reg_width', 'n_targets')
+
+
+def expand_spec(spec) -> List[dict]:
+    '''
+    Expand a sweep spec into a list of seeded runs
+    '''
+    runs = []
+    for entry in spec['runs']:
+        grid = entry.get('grid', {})
+        keys = list(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            params = dict(zip(keys, values))
+            options = {key: params.pop(key) for key in RUN_OPTIONS if key in params}
+            for schedule in spec['schedules']:
+                for repeat in range(spec.get('repeats', 1)):
+                    run = {
+                        'template': entry['template'],
+                        'params': params,
+                        'schedule': schedule,
+                        'repeat': repeat,
+                        'prewarm': options.get('prewarm', spec.get('prewarm', 0)),
+                        'reg_width': options.get('reg_width', spec.get('reg_width', 2)),
+                        'n_targets': options.get('n_targets', spec.get('n_targets')),
+                        'fast_forward': spec.get('fast_forward', True),
+                    }
+                    run['key'] = run_key(run)
+                    run['seed'] = run_seed(run['key'], spec.get('seed', 0))
+                    runs.append(run)
+    return runs
+
+
+def run_key(run) -> str:
+    return json.dumps({k: v for k, v in run.items() if k not in ('key', 'seed')}, sort_keys=True)
+
+
+def run_seed(key: str, base_seed: int) -> int:
+    digest = hashlib.sha256(f'{base_seed}:{key}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def resolve(name: str):
+    '''
+    Look up a (dotted) name in the templates namespace
+    '''
+    obj = generic_templates
+    for part in name.split('.'):
+        if not hasattr(obj, part):
+            raise ValueError(f'Unknown template name: {name}')
+        obj = getattr(obj, part)
+    return obj
+
+
+@lru_cache(maxsize=None)
+def _load_schedule(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_one(run, cache: CheckpointCache | None = None) -> dict:
+    '''
+    Execute a single run, returning one flat results row
+
+    cache: where to look up and store the prewarmed board
+    '''
+    params = dict(run['params'])
+    if 'factory_factory' in params:
+        params['factory_factory'] = resolve(params['factory_factory'])
+    if 'rot_strat' in params:
+        params['rot_strat'] = RotationStrategyOption[params['rot_strat']]
+
+    strat, wid = resolve(run['template'])(**params)
+    strat.mapper = DummyMapper(run['reg_width'])
+    wid.reseed(run['seed'])
+
+    n_targets = run['n_targets'] or max(1, wid.width // run['reg_width'])
+    obj = _load_schedule(run['schedule'])
+    gates = util.make_gates(obj, lambda x: int(x) % n_targets)
+    dag_layers, _ = util.dag_create(obj, gates)
+
+    orc = ScheduleOrchestrator(dag_layers[0], wid, strat, fast_forward=run['fast_forward'])
+    if run['prewarm']:
+        orc.prewarm(run['prewarm'], cache=cache, key=[run['template'], run['params']])
+    orc.schedule()
+
+    row = {
+        'key': run['key'],
+        'template': run['template'],
+        **run['params'],
+        'schedule': run['schedule'],
+        'repeat': run['repeat'],
+        'seed': run['seed'],
+        'total_cycles': orc.get_total_cycles(),
+    }
+    row.update({f'volume_{k}': v for k, v in orc.get_space_time_volume().items()})
+    row.update({f'tock_{k}': v for k, v in orc.get_tock_stats().items()})
+    row.update({f'T_{k}': v for k, v in orc.get_T_stats().items()})
+    return row
+
+
+def load_rows(path) -> List[dict]:
+    rows = []
+    if not os.path.exists(path):
+        return rows
+    with open(path) as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Run interrupted mid-write, it will be redone
+                continue
+    return rows
+
+
+def to_columns(rows: List[dict]) -> Dict[str, list]:
+    '''
+    Columnar table from result rows, missing entries are None
+    '''
+    columns: Dict[str, list] = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, None)
+    return {key: [row.get(key) for row in rows] for key in columns}
+
+
+def load_results(path) -> Dict[str, list]:
+    return to_columns(load_rows(path))
+
+
+def _terminate_last_row(path):
+    '''
+    End a row left partially written by an interrupted sweep
+    '''
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+
+
+def sweep(spec, output, workers=None) -> Dict[str, list]:
+    '''
+    Run all runs of spec not already in output, in parallel
+
+    Returns the columnar results of the whole sweep
+    '''
+    done = {row['key'] for row in load_rows(output)}
+    pending = [run for run in expand_spec(spec) if run['key'] not in done]
+
+    cache = None
+    if spec.get('prewarm_cache') is not None:
+        cache = CheckpointCache(spec['prewarm_cache'], spec.get('prewarm_cache_bytes', 1 << 30))
+
+    if pending:
+        _terminate_last_row(output)
+        with ProcessPoolExecutor(max_workers=workers) as pool, open(output, 'a') as f:
+            futures = [pool.submit(run_one, run, cache) for run in pending]
+            for future in as_completed(futures):
+                print(json.dumps(future.result()), file=f, flush=True)
+
+    return load_results(output)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Parallel parameter sweep over widget templates')
+    parser.add_argument('spec', help='sweep spec (JSON)')
+    parser.add_argument('output', help='results file (one JSON row per run), resumed if present')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes')
+    args = parser.parse_args(argv)
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    results = sweep(spec, args.output, workers=args.workers)
+    print(f"{len(results.get('key', []))} runs in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
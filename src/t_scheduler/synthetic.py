@@ -0,0 +1,225 @@
+'''
+Synthetic consumption schedules for stress tests
+
+Every family places its gates on n_registers registers: the k-th gate on
+register r has id k * n_registers + r, so the usual target function
+lambda x: int(x) % n_registers recovers the register, and every register
+carries the same number of gates. Families:
+
+    all_to_all      QFT-like: every register consumes every other, once
+                    per round
+    layered_random  each gate consumes its register's previous gate and
+                    fan_in - 1 random gates of the previous span layers
+    adder           ripple-carry adders, pipelined: bit i of an addition
+                    waits on bit i - 1 and on bit i of the previous one
+    chain           long narrow chains, linked to the neighbouring
+                    register every link_every steps (0: independent)
+
+Families yield one layer at a time, and write_schedule streams them to
+disk one layer per line, so a million gates never sit in memory as one
+object. The output is the usual schedule object with only n_qubits
+(the gate count), n_registers and consumptionschedule.
+
+Usage: python -m t_scheduler.synthetic family output.json --registers R [--depth D] ...
+'''
+import inspect
+import json
+import os
+import tempfile
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+# One layer: (gate id, ids of gates it consumes)
+Layer = List[Tuple[int, List[int]]]
+
+
+def all_to_all(n_registers: int, rounds: int = 1) -> Iterator[Layer]:
+    '''
+    In layer d of a round register r consumes register (r + d) % n_registers
+    '''
+    R = n_registers
+    yield [(r, []) for r in range(R)]
+    k = 0
+    for _ in range(rounds):
+        for d in range(1, R):
+            k += 1
+            prev = (k - 1) * R
+            yield [(k * R + r, [prev + r, prev + (r + d) % R]) for r in range(R)]
+
+
+def layered_random(n_registers: int, depth: int, fan_in: int = 2, seed: int = 0, span: int = 1) -> Iterator[Layer]:
+    '''
+    Other gates are drawn from the previous span layers
+    '''
+    R = n_registers
+    rng = np.random.default_rng(seed)
+    fan_in = min(fan_in, R)
+    yield [(r, []) for r in range(R)]
+    for k in range(1, depth):
+        prev = (k - 1) * R
+        others = _others(rng, R, fan_in - 1)
+        if span > 1:
+            others += (1 - rng.integers(1, min(span, k) + 1, size=others.shape)) * R
+        others = (prev + others).tolist()
+        yield [(k * R + r, [prev + r] + others[r]) for r in range(R)]
+
+
+def _others(rng, R: int, count: int) -> np.ndarray:
+    '''
+    Row r: count distinct registers other than r
+    '''
+    if 2 * count > R - 1:
+        others = np.argsort(rng.random((R, R - 1)), axis=1)[:, :count]
+    else:
+        # Few draws out of many, redraw the rare rows with repeats
+        others = rng.integers(0, R - 1, size=(R, count))
+        while count > 1 and (repeats := (np.diff(np.sort(others, axis=1), axis=1) == 0).any(axis=1)).any():
+            others[repeats] = rng.integers(0, R - 1, size=(int(repeats.sum()), count))
+    # Skip r itself
+    return others + (others >= np.arange(R)[:, None])
+
+
+def adder(n_registers: int, additions: int) -> Iterator[Layer]:
+    '''
+    Layer t holds bit i of addition t - i
+    '''
+    R = n_registers
+    for t in range(R + additions - 1):
+        layer = []
+        for i in range(max(0, t - additions + 1), min(R, t + 1)):
+            k = t - i
+            pre = []
+            if i > 0:
+                pre.append(k * R + i - 1)
+            if k > 0:
+                pre.append((k - 1) * R + i)
+            layer.append((k * R + i, pre))
+        yield layer
+
+
+def chain(n_registers: int, length: int, link_every: int = 0) -> Iterator[Layer]:
+    R = n_registers
+    yield [(r, []) for r in range(R)]
+    for k in range(1, length):
+        prev = (k - 1) * R
+        linked = link_every and k % link_every == 0 and R > 1
+        yield [
+            (k * R + r, [prev + r, prev + (r - 1) % R] if linked else [prev + r])
+            for r in range(R)
+        ]
+
+
+FAMILIES = {
+    'all_to_all': all_to_all,
+    'layered_random': layered_random,
+    'adder': adder,
+    'chain': chain,
+}
+
+# Size parameter each family needs, if any
+SIZE_PARAMS = {
+    'layered_random': 'depth',
+    'adder': 'additions',
+    'chain': 'length',
+}
+
+
+def _check_size(family: str, params: dict):
+    if (size := SIZE_PARAMS.get(family)) is not None and size not in params:
+        raise ValueError(f'Family {family} needs the {size} parameter')
+
+
+def n_gates(family: str, n_registers: int, **params) -> int:
+    _check_size(family, params)
+    R = n_registers
+    if family == 'all_to_all':
+        return R * (1 + params.get('rounds', 1) * (R - 1))
+    if family == 'layered_random':
+        return R * params['depth']
+    if family == 'adder':
+        return R * params['additions']
+    if family == 'chain':
+        return R * params['length']
+    raise ValueError(f'Unknown family: {family}')
+
+
+def generate(family: str, n_registers: int, **params) -> Iterator[Layer]:
+    if family not in FAMILIES:
+        raise ValueError(f'Unknown family: {family}')
+    _check_size(family, params)
+    return FAMILIES[family](n_registers, **params)
+
+
+def _layer_json(layer: Layer) -> str:
+    return json.dumps([{str(gate): pre} for gate, pre in layer], separators=(',', ':'))
+
+
+def write_schedule(path: str, family: str, n_registers: int, **params) -> int:
+    '''
+    Stream a schedule to path, one layer per line. Returns the gate count.
+    The file only appears once complete.
+    '''
+    count = n_gates(family, n_registers, **params)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(f'{{"n_qubits": {count}, "n_registers": {n_registers}, "consumptionschedule": [\n')
+            for idx, layer in enumerate(generate(family, n_registers, **params)):
+                if idx:
+                    f.write(',\n')
+                f.write(_layer_json(layer))
+            f.write('\n]}\n')
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return count
+
+
+def make_schedule(family: str, n_registers: int, **params) -> dict:
+    '''
+    In-memory schedule object, for small sizes
+    '''
+    return {
+        'n_qubits': n_gates(family, n_registers, **params),
+        'n_registers': n_registers,
+        'consumptionschedule': [
+            [{str(gate): pre} for gate, pre in layer]
+            for layer in generate(family, n_registers, **params)
+        ],
+    }
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Write a synthetic consumption schedule')
+    parser.add_argument('family', choices=sorted(FAMILIES))
+    parser.add_argument('output', help='schedule file (JSON, one layer per line)')
+    parser.add_argument('--registers', type=int, required=True, help='registers the gates target')
+    parser.add_argument('--rounds', type=int, help='all_to_all: rounds of interactions')
+    parser.add_argument('--depth', type=int, help='layered_random: layers')
+    parser.add_argument('--fan-in', type=int, help='layered_random: gates consumed per gate')
+    parser.add_argument('--seed', type=int, help='layered_random: seed')
+    parser.add_argument('--span', type=int, help='layered_random: layers the other gates are drawn from')
+    parser.add_argument('--additions', type=int, help='adder: pipelined additions')
+    parser.add_argument('--length', type=int, help='chain: gates per register')
+    parser.add_argument('--link-every', type=int, help='chain: steps between links to the neighbour')
+    args = parser.parse_args(argv)
+    if (size := SIZE_PARAMS.get(args.family)) is not None and getattr(args, size) is None:
+        parser.error(f'{args.family} needs --{size}')
+
+    params = {
+        key: value for key, value in vars(args).items()
+        if key not in ('family', 'output', 'registers') and value is not None
+    }
+    accepted = inspect.signature(FAMILIES[args.family]).parameters
+    for key in params:
+        if key not in accepted:
+            parser.error(f"{args.family} does not take --{key.replace('_', '-')}")
+    count = write_schedule(args.output, args.family, args.registers, **params)
+    print(f'{count} gates in {args.output}')
+
+
+if __name__ == '__main__':
+    main()
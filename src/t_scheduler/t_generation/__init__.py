@@ -1,3 +1,6 @@
 from .t_generator import TGenerator
 from .t_cultivator import TCultivator
 from .t_factories import TFactory
+from .batched_generator import BatchedTGenerator
+from .arrival_trace import TArrivalTrace, TArrivalTraceExhausted
+from .yield_model import sample_emissions
@@ -0,0 +1,164 @@
+from typing import List
+import numpy as np
+
+from .t_generator import TGenerator
+from .batched_generator import BatchedTGenerator
+
+
+class TArrivalTraceExhausted(Exception):
+    """
+    A generator of a trace that can't be extended ran out of arrivals
+    """
+
+
+class TArrivalTrace:
+    """
+    Pre-sampled T arrival timeline for a set of generators
+
+    durations[i, k] is the number of update calls generator i needs, from a
+    fresh start, to make its k-th emission. Each entry is sampled up front
+    as a sum over stages of (stage cycles + 1) * Geometric(stage prob),
+    which is the distribution TGenerator.update / TCultivator.update follow.
+
+    Replaying only advances a per-generator countdown and cursor, so the
+    same trace gives an identical T supply across runs. A reset that
+    interrupts progress abandons the current attempt and moves on to the
+    next entry.
+
+    A sampled trace extends itself with more arrivals from the same RNG when
+    a generator runs out, save() keeps them. A loaded trace can't, and
+    raises TArrivalTraceExhausted saying how many arrivals were needed.
+
+    Implements the BatchedTGenerator interface, so a region can use either.
+    """
+
+    NEVER = np.iinfo(np.int32).max
+
+    def __init__(self, durations: np.ndarray):
+        self.durations = durations
+        self.generators: List[TGenerator] = []
+        self.cursor = np.zeros(len(durations), dtype=np.int64)
+        self.remaining = np.array(durations[:, 0], dtype=np.int64)
+        # (stage cycles, stage probs, never emits, RNG) of sampled traces
+        self._sampler = None
+
+    @staticmethod
+    def sample(generators, n_emissions: int, generator=None) -> "TArrivalTrace":
+        """
+        Sample n_emissions arrivals for each generator
+        """
+        if generator is None:
+            generator = np.random.default_rng()
+
+        tables = [BatchedTGenerator._stage_table(gen) for gen in generators]
+        width = max((len(cycles) for cycles, _, _ in tables), default=1)
+
+        # Pad stages take no time and always pass
+        cycles = np.full((len(tables), width), -1, dtype=np.int64)
+        probs = np.ones((len(tables), width))
+        for i, (gen_cycles, gen_probs, _) in enumerate(tables):
+            cycles[i, :len(gen_cycles)] = gen_cycles
+            probs[i, :len(gen_probs)] = gen_probs
+
+        # Generators with an impossible stage never emit
+        never = (probs <= 0).any(axis=1)
+        probs[probs <= 0] = 1
+
+        sampler = (cycles, probs, never, generator)
+        trace = TArrivalTrace(TArrivalTrace._sample_durations(sampler, n_emissions))
+        trace._sampler = sampler
+        return trace
+
+    @staticmethod
+    def _sample_durations(sampler, n_emissions: int) -> np.ndarray:
+        cycles, probs, never, generator = sampler
+        shape = (len(cycles), n_emissions)
+        durations = np.zeros(shape, dtype=np.int64)
+        for stage in range(cycles.shape[1]):
+            prob = np.broadcast_to(probs[:, stage:stage + 1], shape)
+            durations += generator.geometric(prob) * (cycles[:, stage:stage + 1] + 1)
+
+        durations[never] = TArrivalTrace.NEVER
+        return np.minimum(durations, TArrivalTrace.NEVER).astype(np.int32)
+
+    def save(self, path):
+        np.save(path, self.durations)
+
+    @staticmethod
+    def load(path) -> "TArrivalTrace":
+        return TArrivalTrace(np.load(path))
+
+    def add(self, gen: TGenerator) -> int:
+        """
+        Bind the next trace row to a generator, returning its index
+        """
+        if len(self.generators) == len(self.durations):
+            raise Exception(f"T arrival trace only has {len(self.durations)} generators")
+
+        gen._engine = self
+        gen._engine_idx = len(self.generators)
+        self.generators.append(gen)
+        return gen._engine_idx
+
+    def __len__(self):
+        return len(self.generators)
+
+    def _reserve(self, idx):
+        """
+        Make sure the trace has a next entry for generators idx, extending
+        it if sampled. Returns their next cursors.
+        """
+        cursor = self.cursor[idx] + 1
+        if np.size(cursor) and (needed := int(np.max(cursor)) + 1) > self.durations.shape[1]:
+            if self._sampler is None:
+                raise TArrivalTraceExhausted(
+                    f"T arrival trace exhausted: needs {needed} emissions per generator, "
+                    f"has {self.durations.shape[1]}"
+                )
+            # Double the trace, so extending stays cheap overall
+            extra = max(needed, 2 * self.durations.shape[1]) - self.durations.shape[1]
+            self.durations = np.hstack([self.durations, self._sample_durations(self._sampler, extra)])
+        return cursor
+
+    def _advance(self, idx):
+        cursor = self._reserve(idx)
+        self.cursor[idx] = cursor
+        self.remaining[idx] = self.durations[idx, cursor]
+
+    def update(self, mask=None) -> np.ndarray:
+        """
+        Update all generators selected by the boolean mask (default all)
+        Returns indices of the generators that emitted this cycle
+        """
+        if mask is None:
+            idx = np.arange(len(self.generators))
+        else:
+            idx = np.flatnonzero(mask)
+
+        done = idx[self.remaining[idx] == 1]
+        # Before anything changes, in case the trace is exhausted
+        self._reserve(done)
+        self.remaining[idx] -= 1
+        self._advance(done)
+        return done
+
+    def idle_cycles(self, mask=None):
+        idx = np.arange(len(self.generators)) if mask is None else np.flatnonzero(mask)
+        if not len(idx):
+            return float('inf')
+        return int(np.min(self.remaining[idx])) - 1
+
+    def skip(self, cycles: int, mask=None):
+        if mask is None:
+            self.remaining[:len(self.generators)] -= cycles
+        else:
+            self.remaining[np.flatnonzero(mask)] -= cycles
+
+    def reset(self, idx: int):
+        if self.remaining[idx] != self.durations[idx, self.cursor[idx]]:
+            self._advance(idx)
+
+    def sync(self):
+        """
+        Generator objects hold no trace state, nothing to write back
+        """
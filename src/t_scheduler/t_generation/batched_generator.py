@@ -0,0 +1,157 @@
+from typing import List
+import numpy as np
+
+from .t_generator import TGenerator
+
+
+class BatchedTGenerator:
+    """
+    Structure-of-arrays engine that advances many T generators at once
+
+    Every generator is modelled as a sequence of stages with a cycle count
+    and a success probability (a plain TGenerator is a single stage of
+    n_cycles with probability prob, a TCultivator uses its stages table).
+    A failed stage is retried, and passing the last stage emits n_emitted
+    T states, as in TGenerator.update and TCultivator.update.
+
+    Random numbers come from a single RNG, one batch per update, so runs
+    are reproducible for a given engine seed. Draws are not the same as
+    those of the generators' own RNGs.
+
+    While adopted, a generator's countdown state lives in the engine:
+    reset() on the generator is forwarded here, and sync() writes the
+    engine state back to the generator objects.
+    """
+
+    def __init__(self, generators=tuple(), generator=None):  # RNG
+        if generator is None:
+            generator = np.random.default_rng()
+        self._generator = generator
+
+        self.generators: List[TGenerator] = []
+        # Adopted generators not yet in the arrays, see _flush
+        self._pending: List[TGenerator] = []
+        self.curr_cycle = np.zeros(0, dtype=np.int64)
+        self.curr_stage = np.zeros(0, dtype=np.int64)
+        self.n_stages = np.zeros(0, dtype=np.int64)
+        self.n_emitted = np.zeros(0, dtype=np.int64)
+        self.stage_cycles = np.zeros((0, 1), dtype=np.int64)
+        self.stage_prob = np.zeros((0, 1), dtype=np.float64)
+
+        for gen in generators:
+            self.add(gen)
+        self._flush()
+
+    @staticmethod
+    def _stage_table(gen: TGenerator):
+        if (stages := getattr(gen, "stages", None)) is not None:
+            return [s[0] for s in stages], [s[1] for s in stages], getattr(gen, "curr_stage", 0)
+        return [gen.n_cycles], [gen.prob], 0
+
+    def add(self, gen: TGenerator) -> int:
+        """
+        Adopt a generator, returning its index in the engine
+        """
+        gen._engine = self
+        gen._engine_idx = len(self.generators)
+        self.generators.append(gen)
+        self._pending.append(gen)
+        return gen._engine_idx
+
+    def _flush(self):
+        """
+        Append the generators adopted since the last call to the arrays,
+        in one go rather than one generator at a time
+        """
+        if not self._pending:
+            return
+        tables = [self._stage_table(gen) for gen in self._pending]
+        width = max(self.stage_cycles.shape[1], max(len(cycles) for cycles, _, _ in tables))
+
+        stage_cycles = np.zeros((len(tables), width), dtype=np.int64)
+        stage_prob = np.zeros((len(tables), width), dtype=np.float64)
+        for i, (cycles, probs, _) in enumerate(tables):
+            stage_cycles[i, :len(cycles)] = cycles
+            stage_prob[i, :len(probs)] = probs
+
+        self.stage_cycles = np.vstack([self._pad(self.stage_cycles, width), stage_cycles])
+        self.stage_prob = np.vstack([self._pad(self.stage_prob, width), stage_prob])
+        self.curr_cycle = np.append(self.curr_cycle, [gen._curr_cycle for gen in self._pending])
+        self.curr_stage = np.append(self.curr_stage, [stage for _, _, stage in tables])
+        self.n_stages = np.append(self.n_stages, [len(cycles) for cycles, _, _ in tables])
+        self.n_emitted = np.append(self.n_emitted, [gen.n_emitted for gen in self._pending])
+        self._pending = []
+
+    @staticmethod
+    def _pad(table, width):
+        if table.shape[1] >= width:
+            return table
+        return np.pad(table, ((0, 0), (0, width - table.shape[1])))
+
+    def __len__(self):
+        return len(self.generators)
+
+    def update(self, mask=None) -> np.ndarray:
+        """
+        Update all generators selected by the boolean mask (default all)
+        Returns indices of the generators that emitted this cycle
+        """
+        self._flush()
+        if mask is None:
+            idx = np.arange(len(self.generators))
+        else:
+            idx = np.flatnonzero(mask)
+
+        stage = self.curr_stage[idx]
+        at_boundary = self.curr_cycle[idx] == self.stage_cycles[idx, stage]
+
+        self.curr_cycle[idx[~at_boundary]] += 1
+
+        idx = idx[at_boundary]
+        stage = stage[at_boundary]
+        self.curr_cycle[idx] = 0
+
+        passed = self._generator.random(len(idx)) < self.stage_prob[idx, stage]
+        idx = idx[passed]
+        stage = stage[passed] + 1
+
+        done = stage == self.n_stages[idx]
+        stage[done] = 0
+        self.curr_stage[idx] = stage
+        return idx[done]
+
+    def idle_cycles(self, mask=None):
+        """
+        Number of upcoming updates in which no selected generator reaches
+        the end of a stage
+        """
+        self._flush()
+        idx = np.arange(len(self.generators)) if mask is None else np.flatnonzero(mask)
+        if not len(idx):
+            return float('inf')
+        return int(np.min(self.stage_cycles[idx, self.curr_stage[idx]] - self.curr_cycle[idx]))
+
+    def skip(self, cycles: int, mask=None):
+        """
+        Fast-forward selected generators over idle updates (see idle_cycles)
+        """
+        self._flush()
+        if mask is None:
+            self.curr_cycle += cycles
+        else:
+            self.curr_cycle[mask] += cycles
+
+    def reset(self, idx: int):
+        self._flush()
+        self.curr_cycle[idx] = 0
+        self.curr_stage[idx] = 0
+
+    def sync(self):
+        """
+        Write engine state back to the adopted generator objects
+        """
+        self._flush()
+        for gen, cycle, stage in zip(self.generators, self.curr_cycle, self.curr_stage):
+            gen._curr_cycle = int(cycle)
+            if hasattr(gen, "curr_stage"):
+                gen.curr_stage = int(stage)
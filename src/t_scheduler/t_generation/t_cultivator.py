@@ -57,9 +57,17 @@ class TCultivator(TGenerator):
         self._curr_cycle += 1
         return 0
 
+    def idle_cycles(self) -> int:
+        """
+        Number of upcoming update calls before the current stage ends
+        """
+        return self.stages[self.curr_stage][self.STAGE_CYCLES] - self._curr_cycle
+
     def reset(self):
         """
         Resets the cultivator
         """
         self._curr_cycle = 0
         self.curr_stage = 0
+        if self._engine is not None:
+            self._engine.reset(self._engine_idx)
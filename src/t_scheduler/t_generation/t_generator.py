@@ -35,6 +35,9 @@ class TGenerator(ABC):
 
         self._curr_cycle = 0  # Current cycle
 
+        self._engine = None  # BatchedTGenerator holding our state, if adopted
+        self._engine_idx = None
+
     def __call__(self) -> int:
         """
         Calls the update method and emits a number of $T$ states
@@ -57,8 +60,23 @@ class TGenerator(ABC):
         self._curr_cycle += 1
         return 0
 
+    def idle_cycles(self) -> int:
+        """
+        Number of upcoming update calls that are pure countdown,
+        i.e. that neither emit nor draw from the RNG
+        """
+        return self.n_cycles - self._curr_cycle
+
+    def skip(self, cycles: int):
+        """
+        Fast-forward over idle update calls (see idle_cycles)
+        """
+        self._curr_cycle += cycles
+
     def reset(self):
         """
         Triggers a reset on the generator
         """
         self._curr_cycle = 0
+        if self._engine is not None:
+            self._engine.reset(self._engine_idx)
@@ -0,0 +1,194 @@
+from typing import List
+import numpy as np
+
+from .t_generator import TGenerator
+from .batched_generator import BatchedTGenerator
+
+# Draws per kind of generator when estimating the chance of a single emission
+FIRST_EMISSION_DRAWS = 1 << 14
+
+
+class _StageArrays:
+    '''
+    Stage tables of generators as in BatchedTGenerator, padded to the
+    longest, with their current stage and cycle
+    '''
+    def __init__(self, generators: List[TGenerator]):
+        tables = [BatchedTGenerator._stage_table(gen) for gen in generators]
+        self.width = max(len(cycles) for cycles, _, _ in tables)
+        stage_cycles = np.zeros((len(tables), self.width), dtype=np.int64)
+        stage_prob = np.ones((len(tables), self.width), dtype=np.float64)
+        self.n_stages = np.zeros(len(tables), dtype=np.int64)
+        self.curr_stage = np.zeros(len(tables), dtype=np.int64)
+        for i, (cycles, probs, stage) in enumerate(tables):
+            stage_cycles[i, :len(cycles)] = cycles
+            stage_prob[i, :len(probs)] = probs
+            self.n_stages[i] = len(cycles)
+            self.curr_stage[i] = stage
+        self.curr_cycle = np.array([gen._curr_cycle for gen in generators], dtype=np.int64)
+
+        # Update calls per attempt of each stage, inf for stages that never pass
+        self.attempt_cycles = np.where(stage_prob > 0, stage_cycles + 1., np.inf)
+        with np.errstate(divide='ignore'):
+            # -inf for certain stages, which take one attempt
+            self.log_fail = np.log1p(-np.where(stage_prob > 0, stage_prob, 1))
+
+    def start(self, n_samples: int) -> np.ndarray:
+        return np.tile(-self.curr_cycle.astype(np.float64), (n_samples, 1))
+
+    def advance(self, clock: np.ndarray, first_stage, generator):
+        '''
+        Add the update calls until the next emission to clock, a row of
+        generators per sample, starting each at first_stage
+        '''
+        for stage in range(self.width):
+            active = (stage >= first_stage) & (stage < self.n_stages)
+            if not active.any():
+                continue
+            # Geometric number of attempts, by inversion
+            attempts = 1 + np.floor(np.log(1 - generator.random(clock.shape)) / self.log_fail[:, stage])
+            clock += np.where(active, attempts * self.attempt_cycles[:, stage], 0)
+
+    def durations(self, idx: np.ndarray, generator) -> np.ndarray:
+        '''
+        Update calls from the first stage to the next emission of the
+        generators at idx
+        '''
+        clock = np.zeros(len(idx))
+        for stage in range(self.width):
+            attempts = 1 + np.floor(np.log(1 - generator.random(len(idx))) / self.log_fail[idx, stage])
+            clock += np.where(stage < self.n_stages[idx], attempts * self.attempt_cycles[idx, stage], 0)
+        return clock
+
+
+def _kind(gen: TGenerator):
+    cycles, probs, stage = BatchedTGenerator._stage_table(gen)
+    return tuple(cycles), tuple(probs), stage, gen._curr_cycle
+
+
+def sample_emissions(
+    generators: List[TGenerator],
+    num_cycles: int,
+    n_samples: int = 1000,
+    generator=None,  # RNG
+    restart_delay: int | np.ndarray = 0,
+    max_emissions: int | None = None,
+    max_total: int | None = None,
+    lanes: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Monte-Carlo sample how many times each generator emits within
+    num_cycles update calls, without stepping through the cycles
+
+    Generators are modelled by their stage tables as in BatchedTGenerator,
+    starting from their current stage and cycle. A stage of c cycles takes
+    c + 1 update calls per attempt, so its duration is c + 1 times a
+    geometric number of attempts. After emitting, a generator waits
+    restart_delay update calls (e.g. for its outputs to be moved out,
+    a single delay or one per generator) before starting over, at most
+    max_emissions times. Sampling stops early once every sample has
+    emitted max_total T states (n_emitted per emission).
+
+    lanes: instead move the outputs of the generators out over lanes,
+    given as a (len(generators), n_lanes) array of which lanes each
+    generator can use. Ts take a lane each, at most bandwidth of a
+    generator's Ts at once, and each move takes restart_delay update
+    calls, so emissions queue for lanes when many generators emit
+    together. Generators restart once their last T has left. At most
+    max_total Ts are moved out (e.g. the room in a buffer), generators
+    with Ts left over then stop.
+
+    Returns an (n_samples, len(generators)) array of emission counts
+    """
+    if generator is None:
+        generator = np.random.default_rng()
+    if not generators:
+        return np.zeros((n_samples, 0), dtype=np.int64)
+
+    if max_emissions == 1:
+        # Emitting at all is a coin flip per generator, with the same odds
+        # for generators of a kind (e.g. all cultivators of a region)
+        kinds = {}
+        kind = np.array([kinds.setdefault(_kind(gen), (len(kinds), gen))[0] for gen in generators])
+        arrays = _StageArrays([gen for _, gen in kinds.values()])
+        clock = arrays.start(FIRST_EMISSION_DRAWS)
+        arrays.advance(clock, arrays.curr_stage, generator)
+        odds = (clock <= num_cycles).mean(axis=0)
+        return (generator.random((n_samples, len(generators))) < odds[kind]).astype(np.int64)
+
+    arrays = _StageArrays(generators)
+    if lanes is not None:
+        return _sample_moved_emissions(arrays, generators, num_cycles, n_samples, generator,
+                                       restart_delay, lanes, max_total)
+    restart_delay = np.broadcast_to(restart_delay, len(generators))
+    n_emitted = np.array([gen.n_emitted for gen in generators], dtype=np.int64)
+
+    counts = np.zeros((n_samples, len(generators)), dtype=np.int64)
+    # Clocks only move forward, so a generator past num_cycles stays there
+    clock = arrays.start(n_samples)
+    first_stage = arrays.curr_stage
+
+    emissions = 0
+    while max_emissions is None or emissions < max_emissions:
+        arrays.advance(clock, first_stage, generator)
+        emitted = clock <= num_cycles
+        if not emitted.any():
+            break
+        counts += emitted
+        clock += restart_delay
+        first_stage = 0
+        emissions += 1
+        if max_total is not None and (counts @ n_emitted >= max_total).all():
+            break
+
+    return counts
+
+
+def _sample_moved_emissions(arrays: _StageArrays, generators, num_cycles, n_samples, generator,
+                            move_delay, lanes, max_total) -> np.ndarray:
+    '''
+    sample_emissions with the outputs moved out over lanes: takes the
+    emissions of each sample in time order, one per step
+    '''
+    n_emitted = np.array([gen.n_emitted for gen in generators], dtype=np.int64)
+    bandwidth = np.array([gen.bandwidth for gen in generators], dtype=np.int64)
+    move_delay = np.broadcast_to(move_delay, len(generators))
+    if max_total is None:
+        max_total = np.inf
+    rows = np.arange(n_samples)
+
+    counts = np.zeros((n_samples, len(generators)), dtype=np.int64)
+    moved_out = np.zeros(n_samples, dtype=np.int64)
+    # Next emission of each generator, inf once it has stopped
+    clock = arrays.start(n_samples)
+    arrays.advance(clock, arrays.curr_stage, generator)
+    lane_free = np.zeros((n_samples, lanes.shape[1]))
+    while True:
+        idx = clock.argmin(axis=1)
+        now = clock[rows, idx]
+        active = now <= num_cycles
+        if not active.any():
+            break
+        counts[rows, idx] += active
+
+        # Each T takes the first free lane of its generator, after the T
+        # bandwidth places earlier has left
+        usable = np.where(lanes[idx], lane_free, np.inf)
+        moved = np.zeros((n_samples, n_emitted.max()))
+        stopped = np.zeros(n_samples, dtype=bool)
+        for k in range(n_emitted.max()):
+            emitted = active & (k < n_emitted[idx])
+            moving = emitted & (moved_out < max_total)
+            stopped |= emitted & ~moving
+            lane = usable.argmin(axis=1)
+            start = np.maximum(now, usable[rows, lane])
+            behind = k - bandwidth[idx]
+            start = np.where(behind >= 0, np.maximum(start, moved[rows, np.maximum(behind, 0)]), start)
+            moved[:, k] = np.where(moving, start + move_delay[idx], now)
+            usable[rows, lane] = np.where(moving, moved[:, k], usable[rows, lane])
+            lane_free[rows, lane] = np.where(moving, moved[:, k], lane_free[rows, lane])
+            moved_out += moving
+        restart = moved.max(axis=1) + arrays.durations(idx, generator)
+        clock[rows, idx] = np.where(active & ~stopped, restart, np.inf)
+
+    return counts
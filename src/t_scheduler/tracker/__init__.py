@@ -6,6 +6,8 @@ from .volume_tracker import (
     TFactorySpaceTimeVolumeTrackingTag,
     TSourceTrackingTag,
 )
+from .hooks import HookRegistry, PhaseHistogram, RouterStats
+from .failures import AllocFailureTracker, router_label
 
 __all__ = [
     "SpaceTimeVolumeType",
@@ -14,4 +16,9 @@ __all__ = [
     "SpaceTimeVolumeTrackingContext",
     "TFactorySpaceTimeVolumeTrackingTag",
     "TSourceTrackingTag",
+    "HookRegistry",
+    "PhaseHistogram",
+    "RouterStats",
+    "AllocFailureTracker",
+    "router_label",
 ]
\ No newline at end of file
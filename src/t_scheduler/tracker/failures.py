@@ -0,0 +1,99 @@
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from ..base.failure_reason import FailureReason
+
+
+def router_label(idx: int, router) -> str:
+    return f'{idx}:{router.__class__.__name__}({router.region.__class__.__name__})'
+
+
+class AllocFailureTracker:
+    '''
+    Why gate allocations failed, per router and reason, over time.
+
+    Refusals are counted as they are recorded: in total by [router, reason]
+    (the last router row is for requests refused by the strategy itself,
+    e.g. rotation rejection), and per tick, as one (tick, router and
+    reason, count) entry for each pair refused in that tick. GATE_TYPE
+    refusals are not counted: they only mean the search visited a router
+    that does not serve the gate.
+    '''
+    STRATEGY = 'strategy'
+
+    def __init__(self, strategy):
+        self.labels = [router_label(idx, router) for idx, router in enumerate(strategy.routers)]
+        self.router_idx = {router: idx for idx, router in enumerate(strategy.routers)}
+        self.failed_attempts = 0
+
+        self.n_reasons = len(FailureReason)
+        self.refusals = np.zeros((len(self.labels) + 1, self.n_reasons), dtype=np.int64)
+
+        # Refusals of the current tick by flat [router, reason] index,
+        # moved into the series once the tick is over
+        self.tick = None
+        self.tick_refusals: Dict[int, int] = {}
+
+        self.times = array('i')
+        self.pairs = array('i')
+        self.counts_per_tick = array('i')
+
+    def record(self, time: int, failures: Iterable[Tuple[object, FailureReason | None]]):
+        '''
+        Record a failed allocation and the refusals behind it
+        '''
+        if time != self.tick:
+            self._flush()
+            self.tick = time
+        self.failed_attempts += 1
+        strategy_row = len(self.labels)
+        for router, reason in failures:
+            if reason is None or reason is FailureReason.GATE_TYPE:
+                continue
+            pair = self.router_idx.get(router, strategy_row) * self.n_reasons + reason.value
+            self.tick_refusals[pair] = self.tick_refusals.get(pair, 0) + 1
+
+    def _flush(self):
+        flat = self.refusals.reshape(-1)
+        for pair, count in self.tick_refusals.items():
+            self.times.append(self.tick)
+            self.pairs.append(pair)
+            self.counts_per_tick.append(count)
+            flat[pair] += count
+        self.tick_refusals.clear()
+
+    def _label(self, idx: int) -> str:
+        return self.labels[idx] if idx < len(self.labels) else self.STRATEGY
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        '''
+        {router: {reason: refusals}}
+        '''
+        self._flush()
+        output: Dict[str, Dict[str, int]] = {}
+        for router, reason in zip(*np.nonzero(self.refusals)):
+            output.setdefault(self._label(int(router)), {})[FailureReason(int(reason)).name] = int(self.refusals[router, reason])
+        return output
+
+    def time_series(self, reason: FailureReason | None = None, router: str | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        (ticks, refusals per tick), optionally for one reason and router label
+        '''
+        self._flush()
+        pairs = np.frombuffer(self.pairs, dtype=np.int32)
+        mask = np.ones(len(pairs), dtype=bool)
+        if reason is not None:
+            mask &= pairs % self.n_reasons == reason.value
+        if router is not None:
+            idx = len(self.labels) if router == self.STRATEGY else self.labels.index(router)
+            mask &= pairs // self.n_reasons == idx
+        ticks, tick_idx = np.unique(np.frombuffer(self.times, dtype=np.int32)[mask], return_inverse=True)
+        counts = np.bincount(tick_idx, weights=np.frombuffer(self.counts_per_tick, dtype=np.int32)[mask],
+                             minlength=len(ticks))
+        return ticks, counts.astype(np.int64)
+
+    def report(self) -> dict:
+        return {'failed_attempts': self.failed_attempts, 'refusals': self.counts()}
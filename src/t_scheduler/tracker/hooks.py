@@ -0,0 +1,185 @@
+from __future__ import annotations
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from .failures import router_label
+
+
+class PhaseHistogram:
+    '''
+    Durations of one phase, bucketed by powers of two microseconds:
+    bucket k counts durations in [2^(k-1), 2^k) us, bucket 0 under 1 us
+    '''
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        bucket = int(seconds * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'histogram': {f'<{1 << k}us': n for k, n in sorted(self.buckets.items())},
+        }
+
+
+class RouterStats:
+    '''
+    Calls, failed responses and time spent in a router's generic_transaction
+    '''
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.time = PhaseHistogram()
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'failure_rate': self.failures / self.calls if self.calls else 0.0,
+            'time': self.time.to_dict(),
+        }
+
+
+class HookRegistry:
+    '''
+    Callbacks and phase timers for ScheduleOrchestrator.schedule_pass
+
+    Hooks and their arguments:
+        on_tick_start(orc)
+        on_alloc_attempt(orc, gate)
+        on_alloc_success(orc, gate, active_gate)
+        on_upkeep(orc, upkeep_gates)
+        on_gate_retire(orc, gate)
+        on_tick_end(orc)
+
+    When timed, every pass is split into phases (alloc, upkeep, output,
+    gate_tick, widget_update, gate_cleanup, gate_next, fast_forward) timed
+    with perf_counter, plus the whole tick, and router transactions are
+    instrumented. An untimed registry only makes the callbacks, and an
+    orchestrator without a registry skips all of this.
+    '''
+    HOOKS = (
+        'on_tick_start',
+        'on_alloc_attempt',
+        'on_alloc_success',
+        'on_upkeep',
+        'on_gate_retire',
+        'on_tick_end',
+    )
+
+    def __init__(self, timed: bool = True):
+        self.callbacks: Dict[str, List[Callable]] = {name: [] for name in self.HOOKS}
+        self.timed = timed
+        self.phases: Dict[str, PhaseHistogram] = {}
+        self.routers: Dict[str, RouterStats] = {}
+        self.alloc_attempts = 0
+        self.alloc_successes = 0
+
+        self._instrumented = []
+        self._tick_start = 0.0
+        self._last = 0.0
+
+    def register(self, name: str, callback: Callable):
+        if name not in self.callbacks:
+            raise ValueError(f'Unknown hook: {name}')
+        self.callbacks[name].append(callback)
+        return callback
+
+    def fire(self, name: str, *args):
+        for callback in self.callbacks[name]:
+            callback(*args)
+
+    def _time(self, phase: str, seconds: float):
+        if (histogram := self.phases.get(phase)) is None:
+            histogram = self.phases[phase] = PhaseHistogram()
+        histogram.add(seconds)
+
+    def tick_start(self, orc):
+        self.fire('on_tick_start', orc)
+        if self.timed:
+            self._tick_start = self._last = perf_counter()
+
+    def lap(self, phase: str):
+        '''
+        End the current phase of the tick
+        '''
+        if self.timed:
+            now = perf_counter()
+            self._time(phase, now - self._last)
+            self._last = now
+
+    def tick_end(self, orc):
+        if self.timed:
+            self._time('tick', perf_counter() - self._tick_start)
+        self.fire('on_tick_end', orc)
+
+    def alloc_attempt(self, orc, gate):
+        self.alloc_attempts += 1
+        self.fire('on_alloc_attempt', orc, gate)
+
+    def alloc_success(self, orc, gate, active_gate):
+        self.alloc_successes += 1
+        self.fire('on_alloc_success', orc, gate, active_gate)
+
+    def instrument(self, strategy):
+        '''
+        Count and time generic_transaction calls of each router of strategy
+        '''
+        for idx, router in enumerate(strategy.routers):
+            stats = self.routers[router_label(idx, router)] = RouterStats()
+            self._instrumented.append(router)
+            router.generic_transaction = self._timed_transaction(router.generic_transaction, stats)
+
+    def _timed_transaction(self, generic_transaction, stats):
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            resp = generic_transaction(*args, **kwargs)
+            stats.time.add(perf_counter() - start)
+            stats.calls += 1
+            if not resp.status:
+                stats.failures += 1
+            return resp
+        return timed
+
+    def detach(self):
+        '''
+        Undo instrument()
+        '''
+        for router in self._instrumented:
+            del router.generic_transaction
+        self._instrumented = []
+
+    def report(self) -> dict:
+        return {
+            'alloc_attempts': self.alloc_attempts,
+            'alloc_successes': self.alloc_successes,
+            'phases': {phase: h.to_dict() for phase, h in self.phases.items()},
+            'routers': {name: stats.to_dict() for name, stats in self.routers.items()},
+        }
+
+    def format_report(self) -> str:
+        lines = [f'{"phase":<16}{"count":>10}{"total s":>12}{"mean us":>12}{"max us":>12}']
+        for phase, h in self.phases.items():
+            mean = h.total / h.count if h.count else 0.0
+            lines.append(f'{phase:<16}{h.count:>10}{h.total:>12.4f}{mean * 1e6:>12.1f}{h.max * 1e6:>12.1f}')
+        if self.alloc_attempts:
+            lines.append(
+                f'alloc: {self.alloc_successes}/{self.alloc_attempts} attempts succeeded'
+            )
+        for name, stats in self.routers.items():
+            rate = stats.failures / stats.calls if stats.calls else 0.0
+            lines.append(
+                f'{name}: {stats.calls} calls, {rate:.1%} failed, {stats.time.total:.4f} s'
+            )
+        return '\n'.join(lines)
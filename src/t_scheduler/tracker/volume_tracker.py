@@ -73,6 +73,8 @@ class SpaceTimeVolumeType(Enum):
     BELL_ROUTING_VOLUME = 5
 
 class SpaceTimeVolumeTrackingTag:
+    __slots__ = ('timer_source', 'start_time', 'tracker', 'tag_type', 'duration', 'mult', 'debug')
+
     def __init__(self, timer_source, tracker, tag_type, mult=1):
         self.timer_source = timer_source
         self.start_time = None
@@ -80,6 +82,7 @@ class SpaceTimeVolumeTrackingTag:
         self.tag_type = tag_type
         self.duration = None
         self.mult = mult
+        self.debug = None
 
     def start(self, debug=None, offset=0):
         assert self.start_time is None
@@ -1,8 +1,13 @@
 from __future__ import annotations
+import hashlib
 from typing import List, Tuple
 
+import numpy as np
+
 from ..region.widget_region import WidgetRegion
 from ..base.patch import Patch, PatchOrientation, PatchType
+from ..base.occupancy import OccupancyGrid
+from ..t_generation import BatchedTGenerator
 
 
 class Widget:
@@ -25,15 +30,93 @@ class Widget:
         self.board = board
         self.components = components
 
+        self.occupancy = OccupancyGrid(board)
+        for component in components:
+            component.occupancy = self.occupancy
+
         self.rep_count = 1
         self.last_output = ""
 
-    def update(self) -> None:
+    def update(self) -> bool:
         """
         Executes update() on all consituent components
+
+        Returns True if any component changed patch state
+        """
+        changed = False
+        for component in self.components:
+            changed |= component.update()
+        return changed
+
+    def idle_cycles(self) -> int | float:
+        """
+        Number of upcoming update calls that leave the board unchanged
+        """
+        return min((component.idle_cycles() for component in self.components), default=float('inf'))
+
+    def skip(self, cycles: int) -> None:
+        """
+        Fast-forward all components over idle update calls
         """
         for component in self.components:
-            component.update()
+            component.skip(cycles)
+
+    def reseed(self, seed) -> None:
+        """
+        Give every T generator its own RNG, derived deterministically from seed
+        """
+        from t_scheduler.region.factory_region import AbstractFactoryRegion
+
+        seeds = np.random.SeedSequence(seed)
+        for component in self.components:
+            if not isinstance(component, AbstractFactoryRegion):
+                continue
+            for generator in component.t_generators():
+                generator._generator = np.random.default_rng(seeds.spawn(1)[0])
+            if isinstance(component.engine, BatchedTGenerator):
+                component.engine._generator = np.random.default_rng(seeds.spawn(1)[0])
+
+    def fingerprint(self) -> dict:
+        """
+        JSON description of the layout and T generator state, which
+        determines how the widget evolves: the cell types and held Ts, the
+        regions, and each generator's parameters and RNG state
+        """
+        from t_scheduler.region.factory_region import AbstractFactoryRegion
+        from t_scheduler.t_generation import TArrivalTrace
+
+        def generator_state(generator):
+            if isinstance(generator, TArrivalTrace):
+                digest = hashlib.sha256(generator.durations.tobytes())
+                digest.update(generator.cursor.tobytes())
+                return digest.hexdigest()
+            if (rng := getattr(generator, '_generator', None)) is not None:
+                return rng.bit_generator.state
+            return None
+
+        components = []
+        for component in self.components:
+            component_json = {'name': component.__class__.__name__}
+            if isinstance(component, AbstractFactoryRegion):
+                component_json['generators'] = [
+                    [generator.__class__.__name__, int(generator.n_cycles), int(generator.n_emitted),
+                     float(generator.prob), int(generator.bandwidth), generator_state(generator)]
+                    for generator in component.t_generators()
+                ]
+                if component.engine is not None:
+                    component_json['engine'] = [component.engine.__class__.__name__,
+                                                generator_state(component.engine)]
+            components.append(component_json)
+
+        return {
+            'width': self.width,
+            'height': self.height,
+            'cells': [
+                ''.join(f'{cell.patch_type.value}{int(cell.T_available())}' for cell in row)
+                for row in self.board
+            ],
+            'components': components,
+        }
 
     def __getitem__(self, index: Tuple[int, int] | int) -> Patch | List[Patch]:
         if isinstance(index, tuple) and len(index) == 2:
@@ -47,43 +130,41 @@ class Widget:
         """
         Get pretty printed output of board states
         """
-        buf = ""
-
-        def bprint(c="", end="\n"):
-            nonlocal buf
-            buf += str(c)
-            buf += end
+        return self._board_to_str([[self._patch_to_debug_char(cell) for cell in row] for row in self.board])
 
-        board = self.board
-
-        bprint()
-        bprint("-" * len(board[0]))
-        for row in board:
-            for cell in row:
-                if cell.patch_type == PatchType.BELL:
-                    bprint("$", end="")
-                elif cell.locked():
-                    num = cell.lock.owner.targ  # type: ignore
-                    if not isinstance(num, str) and num >= 10:
-                        num = "#"
-                    bprint(num, end="")
-                elif cell.patch_type == PatchType.REG:
-                    bprint("R", end="")
-                elif cell.patch_type == PatchType.ROUTE:
-                    bprint(" ", end="")
-                elif cell.T_available():
-                    if cell.orientation == PatchOrientation.Z_TOP:
-                        bprint("T", end="")
-                    else:
-                        bprint("t", end="")
-                elif cell.patch_type == PatchType.CULTIVATOR:
-                    bprint("@", end="")
-                else:
-                    bprint(".", end="")
-            bprint()
-        bprint("-" * len(board[0]), end="")
+    @staticmethod
+    def _patch_to_debug_char(cell) -> str:
+        """
+        Character of cell in to_str_output
+        """
+        if cell.patch_type == PatchType.BELL:
+            return "$"
+        elif cell.locked():
+            num = cell.lock.owner.targ  # type: ignore
+            if not isinstance(num, str) and num >= 10:
+                num = "#"
+            return str(num)
+        elif cell.patch_type == PatchType.REG:
+            return "R"
+        elif cell.patch_type == PatchType.ROUTE:
+            return " "
+        elif cell.T_available():
+            if cell.orientation == PatchOrientation.Z_TOP:
+                return "T"
+            else:
+                return "t"
+        elif cell.patch_type == PatchType.CULTIVATOR:
+            return "@"
+        else:
+            return "."
 
-        return buf
+    @staticmethod
+    def _board_to_str(rows) -> str:
+        """
+        to_str_output of a board given as rows of _patch_to_debug_char
+        """
+        rule = "-" * len(rows[0])
+        return "\n" + rule + "\n" + "".join("".join(row) + "\n" for row in rows) + rule
 
     def to_str_output_dedup(self) -> str:
         """
@@ -135,21 +216,31 @@ class Widget:
         return start[1] + sep, -start[0] - sep, end[1] + 1 - sep, -end[0] - 1 + sep
 
     @staticmethod
-    def _component_to_style(component):
+    def _component_to_fill(component):
         from t_scheduler.region.register_region import RegisterRegion
         from t_scheduler.region.route_region import RouteBus
         from t_scheduler.region.buffer_region import AbstractMagicStateBufferRegion
         from t_scheduler.region.factory_region import MagicStateFactoryRegion
-        from lattice_surgery_draw.primitives.style import TikzStyle
 
         if isinstance(component, RegisterRegion):
-            return TikzStyle(fill="red!10")
+            return "red!10"
         elif isinstance(component, RouteBus):
-            return TikzStyle(fill="green!10")
+            return "green!10"
         elif isinstance(component, AbstractMagicStateBufferRegion):
-            return TikzStyle(fill="blue!10")
+            return "blue!10"
         elif isinstance(component, MagicStateFactoryRegion):
-            return TikzStyle(fill="blue!10")
+            return "blue!10"
+
+    @staticmethod
+    def _fill_to_style(fill):
+        from lattice_surgery_draw.primitives.style import TikzStyle
+
+        if fill is not None:
+            return TikzStyle(fill=fill)
+
+    @classmethod
+    def _component_to_style(cls, component):
+        return cls._fill_to_style(cls._component_to_fill(component))
 
     @staticmethod
     def _patch_to_char(cell):
@@ -180,6 +271,17 @@ class Widget:
         else:
             return "."
 
+    @classmethod
+    def _patch_to_glyph(cls, cell):
+        """
+        Cell state drawn by save_tikz_patches_layer: (label, T available, Z top)
+        """
+        return (
+            cls._patch_to_char(cell),
+            bool(cell.T_available()),
+            cell.orientation == PatchOrientation.Z_TOP,
+        )
+
     @staticmethod
     def _patch_to_json(cell):
         if cell.T_available() or cell.patch_type == PatchType.T:
@@ -205,22 +307,16 @@ class Widget:
         else:
             return "other"
 
-    def save_tikz_region_layer(self):
-        from lattice_surgery_draw.region import Region
+    def tikz_region_rects(self):
+        """
+        Rectangles drawn by save_tikz_region_layer, as (tikz coords, fill)
+        """
         from t_scheduler.region.factory_region import MagicStateFactoryRegion
-        from lattice_surgery_draw.primitives.style import TikzStyle
 
-        regions = self.get_component_info()
-
-        output_rects = []
+        rects = []
 
-        for component, component_name, coords in regions:
-            output_rects.append(
-                Region(
-                    *self._to_tikz_coords(*coords),
-                    region_style=self._component_to_style(component),
-                )
-            )
+        for component, component_name, coords in self.get_component_info():
+            rects.append((self._to_tikz_coords(*coords), self._component_to_fill(component)))
             if isinstance(component, MagicStateFactoryRegion):
                 for factory in component.factories:
                     top_left = self.adapter[component[factory.layout_position]]
@@ -228,16 +324,21 @@ class Widget:
                         top_left[0] + factory.height - 1,
                         top_left[1] + factory.width - 1,
                     )
+                    rects.append((self._to_tikz_coords(top_left, bottom_right, sep=0.05), "blue!30"))
 
-                    output_rects.append(
-                        Region(
-                            *self._to_tikz_coords(top_left,
-                                                  bottom_right, sep=0.05),
-                            region_style=TikzStyle(fill="blue!30"),
-                        )
-                    )
+        return rects
 
-        return output_rects
+    @classmethod
+    def _tikz_region_objects(cls, rects):
+        from lattice_surgery_draw.region import Region
+
+        return [
+            Region(*coords, region_style=cls._fill_to_style(fill))
+            for coords, fill in rects
+        ]
+
+    def save_tikz_region_layer(self):
+        return self._tikz_region_objects(self.tikz_region_rects())
 
     def save_json_regions(self):
         from t_scheduler.region.factory_region import MagicStateFactoryRegion
@@ -264,174 +365,211 @@ class Widget:
             output.append(component_json)
         return output
 
+    @classmethod
+    def _cell_to_json(cls, cell):
+        cell_json = {
+            'type': cls._patch_to_json(cell)
+        }
+        if cell.locked():
+            cell_json['locked_by'] = id(cell.lock.owner)  # type: ignore
+        return cell_json
+
+    def _gate_to_json(self, gate):
+        if gate.transaction.layout_override:
+            holds = gate.transaction.layout_override
+        else:
+            holds = list(map(self.adapter.get, gate.transaction.active_cells))
+        return {
+            'type': gate.__class__.__name__,
+            'holds': holds,
+            'active_time': gate.timer,
+            'id': id(gate)
+        }
+
     def save_json_patches_state(self):
         active_gates = set()
         output_board = []
         for row in self.board:
             output_row = []
             for cell in row:
-                cell_json = {
-                    'type': self._patch_to_json(cell)
-                }
                 if cell.locked():
-                    cell_json['locked_by'] = id(cell.lock.owner)  # type: ignore
                     active_gates.add(cell.lock.owner)  # type: ignore
-                output_row.append(cell_json)
+                output_row.append(self._cell_to_json(cell))
             output_board.append(output_row)
-        output_gates = []
-        for gate in active_gates:
-            if gate.transaction.layout_override:
-                holds = gate.transaction.layout_override
-            else:
-                holds = list(map(self.adapter.get, gate.transaction.active_cells))
-            gate_json = {
-                'type': gate.__class__.__name__,
-                'holds': holds,
-                'active_time': gate.timer,
-                'id': id(gate)
-            }
-            output_gates.append(gate_json)
+        output_gates = [self._gate_to_json(gate) for gate in active_gates]
         output = {'board': output_board, 'gates': output_gates}
         return output
 
-    def save_tikz_patches_layer(self):
-
-        from lattice_surgery_draw.primitives.tikz_obj import (
-            TikzRectangle,
-            TikzNode,
-            TikzCircle,
-        )
-        from lattice_surgery_draw.primitives.style import TikzStyle
-        from lattice_surgery_draw.img import SurfaceCodePatch, SurfaceCodePatchWide
+    def tikz_patch_layout(self):
+        """
+        Cells drawn by save_tikz_patches_layer, as (coords, kind, label):
+            'reg_pair': register over this cell and the next, label is its index
+            'reg': register cell of a comb shaped register
+            'node': other cell of a comb shaped register
+            'cell': any other cell
+        """
         from t_scheduler.region.register_region import (
             SingleRowRegisterRegion,
             CombShapedRegisterRegion,
         )
         from itertools import chain
 
-        output_objs = []
+        layout = []
 
         for component in self.components:
             if isinstance(component, SingleRowRegisterRegion):
                 for cell_idx in range(0, component.width, 2):
                     cell = component.sc_patches[0][cell_idx]
-
-                    coord = self.adapter[cell]
-                    output_objs.append(
-                        TikzRectangle(
-                            *self._to_tikz_coords(
-                                coord, (coord[0], coord[1] + 1), sep=0.1
-                            )
-                        )
-                    )
-                    output_objs.append(
-                        SurfaceCodePatchWide(coord[1] + 1, -coord[0] - 0.5)
-                    )
-                    output_objs.append(
-                        TikzCircle(
-                            coord[1] + 1,
-                            -coord[0] - 0.5,
-                            0.4,
-                            label=str(cell_idx // 2),
-                            tikz_style=TikzStyle(fill="red!50"),
-                        )
-                    )
+                    layout.append((self.adapter[cell], "reg_pair", str(cell_idx // 2)))
             elif isinstance(component, CombShapedRegisterRegion):
-                for r, row in enumerate(component.sc_patches):
-                    for c, cell in enumerate(row):
-                        if cell.patch_type == PatchType.REG:
-                            coord = self.adapter[cell]
-                            angle = 90 if cell.orientation == PatchOrientation.Z_TOP else 0
-
-                            output_objs.append(
-                                TikzRectangle(
-                                    *self._to_tikz_coords(
-                                        coord, (coord[0], coord[1]), sep=0.1
-                                    )
-                                )
-                            )
-                            output_objs.append(
-                                SurfaceCodePatch(coord[1] + 0.5, -coord[0] - 0.5, angle=angle)
-                            )
-                            # output_objs.append(TikzCircle(
-                            #     coord[1] + 0.5, -coord[0] - 0.5, 0.4, label=str(cell_idx // 2), tikz_style=TikzStyle(fill='red!50')))
-                        else:
-                            coord = self.adapter[cell]
-                            output_objs.append(
-                                TikzNode(
-                                    coord[1] + 0.5,
-                                    -coord[0] - 0.5,
-                                    label=self._patch_to_char(cell),
-                                )
-                            )
+                for cell in chain(*component.sc_patches):
+                    kind = "reg" if cell.patch_type == PatchType.REG else "node"
+                    layout.append((self.adapter[cell], kind, None))
             else:
                 for cell in chain(*component.sc_patches):
-                    coord = self.adapter[cell]
-                    output_objs.append(
-                        TikzRectangle(*self._to_tikz_coords(coord, coord, sep=0.1))
-                    )
-                    if cell.T_available():
-                        angle = 90 if cell.orientation == PatchOrientation.Z_TOP else 0
-                        output_objs.append(
-                            SurfaceCodePatch(
-                                coord[1] + 0.5, -coord[0] - 0.5, angle=angle
-                            )
-                        )
-                        output_objs.append(
-                            TikzCircle(
-                                coord[1] + 0.5,
-                                -coord[0] - 0.5,
-                                0.4,
-                                label=self._patch_to_char(cell),
-                                tikz_style=TikzStyle(fill="blue!50", text="white"),
-                            )
-                        )
-                    else:
-                        output_objs.append(
-                            TikzNode(
-                                coord[1] + 0.5,
-                                -coord[0] - 0.5,
-                                label=self._patch_to_char(cell),
-                            )
-                        )
+                    layout.append((self.adapter[cell], "cell", None))
 
-        return output_objs
+        return layout
 
-    def make_tikz_routes(self, output_layer):
+    @classmethod
+    def _tikz_patch_objects(cls, coord, kind, label, glyph):
+        """
+        Draw one tikz_patch_layout entry, glyph as given by _patch_to_glyph
+        """
         from lattice_surgery_draw.primitives.tikz_obj import (
             TikzRectangle,
             TikzNode,
             TikzCircle,
         )
         from lattice_surgery_draw.primitives.style import TikzStyle
+        from lattice_surgery_draw.img import SurfaceCodePatch, SurfaceCodePatchWide
 
-        def _manhattan(pos1, pos2):
-            return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+        if kind == "reg_pair":
+            return [
+                TikzRectangle(
+                    *cls._to_tikz_coords(
+                        coord, (coord[0], coord[1] + 1), sep=0.1
+                    )
+                ),
+                SurfaceCodePatchWide(coord[1] + 1, -coord[0] - 0.5),
+                TikzCircle(
+                    coord[1] + 1,
+                    -coord[0] - 0.5,
+                    0.4,
+                    label=label,
+                    tikz_style=TikzStyle(fill="red!50"),
+                ),
+            ]
+
+        char, T_available, z_top = glyph
+        angle = 90 if z_top else 0
+
+        if kind == "reg":
+            return [
+                TikzRectangle(
+                    *cls._to_tikz_coords(
+                        coord, (coord[0], coord[1]), sep=0.1
+                    )
+                ),
+                SurfaceCodePatch(coord[1] + 0.5, -coord[0] - 0.5, angle=angle),
+            ]
+        elif kind == "node":
+            return [TikzNode(coord[1] + 0.5, -coord[0] - 0.5, label=char)]
+
+        output_objs = [TikzRectangle(*cls._to_tikz_coords(coord, coord, sep=0.1))]
+        if T_available:
+            output_objs.append(
+                SurfaceCodePatch(
+                    coord[1] + 0.5, -coord[0] - 0.5, angle=angle
+                )
+            )
+            output_objs.append(
+                TikzCircle(
+                    coord[1] + 0.5,
+                    -coord[0] - 0.5,
+                    0.4,
+                    label=char,
+                    tikz_style=TikzStyle(fill="blue!50", text="white"),
+                )
+            )
+        else:
+            output_objs.append(
+                TikzNode(
+                    coord[1] + 0.5,
+                    -coord[0] - 0.5,
+                    label=char,
+                )
+            )
+        return output_objs
 
-        output_rects = []
+    def save_tikz_patches_layer(self, glyphs=None):
+        """
+        glyphs: optional (row, col) -> glyph lookup to draw instead of
+            the current board state (see _patch_to_glyph)
+        """
+        output_objs = []
+
+        for coord, kind, label in self.tikz_patch_layout():
+            if glyphs is not None:
+                glyph = glyphs[coord]
+            elif kind == "reg_pair":
+                glyph = None
+            else:
+                glyph = self._patch_to_glyph(self[coord])
+            output_objs.extend(self._tikz_patch_objects(coord, kind, label, glyph))
+
+        return output_objs
 
+    def make_tikz_routes(self, output_layer):
+        gate_paths = []
         for gate_path in output_layer:
             gate_path = list(map(self.adapter.get, gate_path))
             if None in gate_path:
                 raise Exception("Invalid cell in adapter")
+            gate_paths.append(gate_path)
+
+        def gate_type(idx, pos):
+            return self[pos].lock.owner.__class__.__name__  # type: ignore
+
+        output_rects = self._tikz_route_rects(gate_paths, gate_type)
+        if output_rects is None:
+            # Error! TODO remove after debugging
+            with open("check.out", "a") as check:
+                print(self.to_str_output(), file=check)
+                print(gate_paths, file=check)
+            return []
+        return output_rects
+
+    @classmethod
+    def _tikz_route_rects(cls, gate_paths, gate_type):
+        """
+        Route rectangles for paths of board coordinates
+
+        gate_type(idx, pos): class name of the gate holding pos on path idx
+        Returns None if a path is not connected
+        """
+        from lattice_surgery_draw.primitives.tikz_obj import TikzRectangle
+        from lattice_surgery_draw.primitives.style import TikzStyle
+
+        def _manhattan(pos1, pos2):
+            return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+
+        output_rects = []
+
+        for idx, gate_path in enumerate(gate_paths):
             if len(gate_path) == 2 and _manhattan(gate_path[0], gate_path[1]) > 1:
                 # Measure activation!
                 pass
             else:
                 for first, second in zip(gate_path[:-1], gate_path[1:]):
                     if _manhattan(first, second) > 1:
-                        if self[first].lock.owner.__class__.__name__ == "RotateGate":  # type: ignore
+                        if gate_type(idx, first) == "RotateGate":
                             continue
-                        # Error! TODO remove after debugging
-                        with open("check.out", "a") as check:
-                            print(self.to_str_output(), file=check)
-                            print(gate_path, file=check)
-                        # raise Exception('debug')
-                        return []
+                        return None
                     else:
                         output_rects.append(
                             TikzRectangle(
-                                *self._to_tikz_coords(*sorted((first, second)), sep=0.2),  # type: ignore
+                                *cls._to_tikz_coords(*sorted((first, second)), sep=0.2),  # type: ignore
                                 tikz_style=TikzStyle(
                                     draw="none", fill="orange", opacity="0.3"
                                 ),
@@ -0,0 +1,113 @@
+import json
+import unittest
+
+from t_scheduler import synthetic
+from t_scheduler.base import util
+from t_scheduler.base.dag import GateDAG
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.strategy.generic_strategy import DummyMapper
+from t_scheduler.templates.generic_templates import vertical_strategy_with_prefilled_buffer_widget
+
+
+def reference_prune(dag_layers, gates):
+    # Previous dag_prune: DFS over every path from the first layer
+    post_discard = {g: set() for g in gates}
+    seen = set()
+    stack = [(g, 0) for g in dag_layers[0]]
+    while stack:
+        curr, gate_idx = stack.pop()
+        if gate_idx == 0:
+            seen.add(curr)
+        if gate_idx >= len(curr.post):
+            seen.remove(curr)
+            continue
+        stack.append((curr, gate_idx + 1))
+
+        gate = curr.post[gate_idx]
+        redundant = set(gate.pre) & seen
+        redundant.discard(curr)
+        for extra in redundant:
+            post_discard[extra].add(gate)
+            gate.pre.remove(extra)
+        stack.append((gate, 0))
+
+    for g in gates:
+        g.post = [x for x in g.post if x not in post_discard[g]]
+
+
+def pruned_edges(obj, prune):
+    gates = util.make_gates(obj)
+    prune(util.dag_link(obj, gates), gates)
+    ids = {g: i for i, g in enumerate(gates)}
+    return [([ids[p] for p in g.pre], [ids[p] for p in g.post]) for g in gates]
+
+
+def schedules():
+    objs = [util.toffoli_example_input()]
+    for path in ('tests/qft_test_obj.json', 'tests/qft_8_test_obj.json'):
+        with open(path) as f:
+            objs.append(json.load(f))
+    return objs + [
+        synthetic.make_schedule('layered_random', 5, depth=8, fan_in=3, span=4, seed=1),
+        synthetic.make_schedule('adder', 4, additions=4),
+        synthetic.make_schedule('chain', 3, length=10, link_every=2),
+        # Gate 2 is not reachable from the first layer: its edges stay
+        {'n_qubits': 5, 'consumptionschedule': [
+            [{'0': []}], [{'1': [0]}, {'2': []}], [{'3': [0, 1, 2]}], [{'4': [2, 3, 0]}]]},
+    ]
+
+
+class DagTest(unittest.TestCase):
+    def test_prune_matches_reference(self):
+        objs = schedules()
+        for obj in objs:
+            self.assertEqual(pruned_edges(obj, util.dag_prune), pruned_edges(obj, reference_prune))
+
+        edges = pruned_edges(objs[-1], util.dag_prune)
+        self.assertEqual(edges[3], ([1, 2], [4]))
+        self.assertEqual(edges[4], ([2, 3], []))
+
+    def test_gate_dag_matches_util(self):
+        for obj in schedules():
+            gates = util.make_gates(obj)
+            dag_layers, _ = util.dag_create(obj, gates)
+            util.parse_weights(dag_layers)
+
+            dag = GateDAG.from_schedule(obj)
+            dag.parse_weights()
+            reachable = dag.reachable()
+            for idx, gate in enumerate(gates):
+                self.assertEqual(dag.preds(idx).tolist(), [g.targ_orig for g in gate.pre])
+                self.assertEqual(dag.succs(idx).tolist(), [g.targ_orig for g in gate.post])
+                # util.parse_weights only walks gates reachable from the first layer
+                if reachable[idx]:
+                    self.assertEqual(dag.schedule_weight[idx], gate.schedule_weight)
+
+    def test_lazy_schedule(self):
+        obj = synthetic.make_schedule('layered_random', 5, depth=6, fan_in=3, seed=2)
+        dag = GateDAG.from_schedule(obj, lambda x: x % 5)
+        dag.parse_weights()
+
+        roots = dag.roots()
+        self.assertEqual(len(dag.materialized()), 5)
+        self.assertEqual(roots[0].schedule_weight, dag.schedule_weight[0])
+
+        def run(layer):
+            strat, wid = vertical_strategy_with_prefilled_buffer_widget(10, 40)
+            strat.mapper = DummyMapper(2)
+            orc = ScheduleOrchestrator(layer, wid, strat)
+            orc.schedule()
+            return orc.time
+
+        ticks = run(roots)
+        self.assertEqual(len(dag.materialized()), len(dag))
+        self.assertTrue(all(g.completed() for g in dag.materialized()))
+
+        gates = util.make_gates(obj, lambda x: x % 5)
+        dag_layers, _ = util.dag_create(obj, gates)
+        util.parse_weights(dag_layers)
+        self.assertEqual(ticks, run(dag_layers[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,460 @@
+from contextlib import redirect_stdout
+import io
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from t_scheduler.base import gate, util
+from t_scheduler.base.ready_queue import ReadyQueue, T_available, any_change
+from t_scheduler.checkpoint import Checkpoint, CheckpointCache
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.tracker import HookRegistry
+from t_scheduler.output import DeltaFrameReader, FrameSink, TraceRecorder, load_frames_json, read_frames
+
+from t_scheduler.templates.generic_templates import *
+from t_scheduler.strategy.generic_strategy import DummyMapper
+
+
+class OrchestratorTest(unittest.TestCase):
+    def test_ready_queue_order(self):
+        gates = [gate.T_Gate(t, 2, 3) for t in range(4)]
+        queue = ReadyQueue(gates[:3])
+        reg = Patch(PatchType.REG, 0, 0)
+        reg.lock = object() # type: ignore
+
+        first, second, third = queue.drain()
+        queue.block(first, reg)
+        queue.retry(second)
+        queue.discard(third)
+        queue.append(gates[3])
+
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.drain(), [second, gates[3]])
+
+        queue.retry(second)
+        queue.retry(gates[3])
+        # Parked gates wake on the patch's change events
+        reg.lock = None
+        self.assertEqual(queue.drain(), [second, gates[3]])
+
+        queue.retry(second)
+        queue.retry(gates[3])
+        reg.changed()
+        self.assertEqual(queue.drain(), [first, second, gates[3]])
+
+    def test_each_gate_scheduled_once(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+        strat, wid = tree_strategy_with_prefilled_buffer_widget(12, 10)
+        strat.mapper = DummyMapper(2)
+
+        gates = util.make_gates(obj, lambda x: int(x) % 5)
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        orc = ScheduleOrchestrator(dag_layers[0], wid, strat, False)
+        orc.schedule()
+
+        self.assertFalse(orc.queued)
+        self.assertFalse(orc.pending_pre)
+        self.assertTrue(all(g.completed() for g in all_gates))
+
+    def test_starved_gates_parked(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+        strat, wid = flat_naive_t_cultivator_widget(10, 5)
+        strat.mapper = DummyMapper(2)
+        wid.reseed(0)
+        gates = util.make_gates(obj, lambda x: int(x) % 5)
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        orc = ScheduleOrchestrator(dag_layers[0], wid, strat, False)
+        orc.queued.extend(orc.waiting)
+        starved = 0
+        while orc.queued or orc.active:
+            orc.schedule_pass()
+            queue = orc.queued
+            waiting = [gate for gate, resources in queue.parked.items() if queue.wake_on[resources[0]] is T_available]
+            # Gates waiting for a T wake next pass once there is one
+            if waiting and wid.occupancy.n_T:
+                self.assertTrue(queue.woken)
+            starved = max(starved, len(waiting))
+        self.assertGreater(starved, 1)
+        self.assertTrue(all(g.completed() for g in all_gates))
+
+    def test_route_blocked_gates_parked(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        def run(park):
+            strat, wid = flat_naive_litinski_5x3_unbuffered_widget(10, 20)
+            strat.mapper = DummyMapper(2)
+            wid.reseed(0)
+            if not park:
+                strat.route_blocked_on = lambda gate: None
+            gates = util.make_gates(obj, lambda x: int(x) % 5)
+            dag_layers, all_gates = util.dag_create(obj, gates)
+
+            orc = ScheduleOrchestrator(dag_layers[0], wid, strat, False)
+            orc.queued.extend(orc.waiting)
+            parked = 0
+            while orc.queued or orc.active:
+                orc.schedule_pass()
+                queue = orc.queued
+                parked = max(parked, sum(queue.wake_on[keys[0]] is any_change for keys in queue.parked.values()))
+            self.assertTrue(all(g.completed() for g in all_gates))
+            return parked, orc.time, orc.get_space_time_volume()
+
+        parked, time, volume = run(True)
+        self.assertGreater(parked, 0)
+        # Parked gates are offered again as soon as anything could let them through
+        self.assertEqual((time, volume), run(False)[1:])
+
+    def test_fast_forward_matches(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        results = []
+        for fast_forward in (False, True):
+            strat, wid = vertical_strategy_with_prefilled_buffer_widget(
+                20, 7, rot_strat=RotationStrategyOption.BACKPROP_INIT)
+            strat.mapper = DummyMapper(2)
+
+            gates = util.make_gates(obj, lambda x: int(x) % 9)
+            for g in gates:
+                g.correction_duration = 7
+            dag_layers, all_gates = util.dag_create(obj, gates)
+
+            orc = ScheduleOrchestrator(dag_layers[0], wid, strat, fast_forward=fast_forward)
+            orc.prewarm(10)
+            orc.schedule()
+            results.append((orc.get_total_cycles(), orc.get_space_time_volume(), len(orc.output_layers)))
+
+        self.assertEqual(results[0], results[1])
+
+    def test_json_stream(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+        strat, wid = vertical_strategy_with_prefilled_buffer_widget(10, 20)
+        strat.mapper = DummyMapper(2)
+
+        gates = util.make_gates(obj, lambda x: int(x) % 5)
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'frames.ndjson')
+            orc = ScheduleOrchestrator(dag_layers[0], wid, strat, json=True, json_stream=path)
+            orc.schedule()
+            orc.json_stream.close()
+
+            self.assertEqual(load_frames_json(path), json.loads(json.dumps(orc.json)))
+
+    def test_delta_frames(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+        strat, wid = tree_strategy_with_prefilled_buffer_widget(12, 10)
+        strat.mapper = DummyMapper(2)
+
+        gates = util.make_gates(obj, lambda x: int(x) % 5)
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        def by_id(frame):
+            return {'board': frame['board'], 'gates': sorted(frame['gates'], key=lambda g: g['id'])}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'frames.ndjson')
+            orc = ScheduleOrchestrator(dag_layers[0], wid, strat, json=True, json_stream=path, keyframe_interval=7)
+            orc.schedule()
+            orc.json_stream.close()
+
+            expected = [by_id(layer) for layer in json.loads(json.dumps(orc.json))['layers']]
+            reader = DeltaFrameReader(path)
+            self.assertEqual([by_id(frame) for _, frame in reader], expected)
+            self.assertEqual(by_id(reader.frame(reader.times[10])), expected[10])
+            self.assertLess(os.path.getsize(path), len(json.dumps(orc.json['layers'])))
+
+    def test_output_queue(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        class SlowSink(FrameSink):
+            def __init__(self):
+                self.records = []
+                self.closed = False
+
+            def write(self, record):
+                time.sleep(0.001)
+                self.records.append(json.loads(json.dumps(record)))
+
+            def close(self):
+                self.closed = True
+
+        def run(json_stream, **kwargs):
+            strat, wid = vertical_strategy_with_prefilled_buffer_widget(10, 20)
+            strat.mapper = DummyMapper(2)
+            wid.reseed(0)
+            gates = util.make_gates(obj, lambda x: int(x) % 5)
+            dag_layers, all_gates = util.dag_create(obj, gates)
+            orc = ScheduleOrchestrator(dag_layers[0], wid, strat, json_stream=json_stream, **kwargs)
+            orc.schedule()
+            return orc
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'frames.ndjson')
+            run(path).json_stream.close()
+            expected = list(read_frames(path))
+
+        def renumber(records):
+            # Gate ids are object ids, number them by first appearance
+            ids = {}
+            def walk(obj, key=None):
+                if isinstance(obj, dict):
+                    return {k: walk(v, k) for k, v in obj.items()}
+                if isinstance(obj, list):
+                    return [walk(v) for v in obj]
+                if key in ('id', 'locked_by'):
+                    return ids.setdefault(obj, len(ids))
+                return obj
+            records = walk(records)
+            for record in records:
+                record.get('gates', []).sort(key=lambda g: g['id'])
+            return records
+
+        threads = threading.active_count()
+        sink = SlowSink()
+        orc = run(sink, output_queue=2)
+        self.assertEqual(renumber(sink.records), renumber(expected))
+
+        # Board prints are formatted from snapshots on the output thread
+        prints = []
+        for output_queue in (None, 2):
+            with redirect_stdout(io.StringIO()) as out:
+                run(None, debug=True, output_queue=output_queue)
+            prints.append(out.getvalue())
+        self.assertEqual(prints[1], prints[0])
+        # The caller's sink stays open, our threads are gone
+        self.assertFalse(sink.closed)
+        with tempfile.TemporaryDirectory() as tmp:
+            for _ in range(3):
+                run(os.path.join(tmp, 'frames.ndjson'), output_queue=2, debug=True)
+        self.assertEqual(threading.active_count(), threads)
+
+        class FailingSink(FrameSink):
+            def write(self, record):
+                raise IOError('disk full')
+
+        with self.assertRaises(IOError):
+            run(FailingSink(), output_queue=2)
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_hooks(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        def run(template, **kwargs):
+            strat, wid = template()
+            strat.mapper = DummyMapper(2)
+            wid.reseed(0)
+            gates = util.make_gates(obj, lambda x: int(x) % 5)
+            dag_layers, all_gates = util.dag_create(obj, gates)
+            orc = ScheduleOrchestrator(dag_layers[0], wid, strat, **kwargs)
+            orc.prewarm(5)
+            orc.schedule()
+            return orc
+
+        # Hooks do not change the schedule
+        vertical = lambda: vertical_strategy_with_prefilled_buffer_widget(10, 20)
+        orc = run(vertical, hooks=HookRegistry())
+        plain = run(vertical)
+        self.assertEqual(orc.get_total_cycles(), plain.get_total_cycles())
+        self.assertEqual(orc.get_space_time_volume(), plain.get_space_time_volume())
+
+        hooks = HookRegistry()
+        counts = {name: 0 for name in HookRegistry.HOOKS}
+        for name in HookRegistry.HOOKS:
+            hooks.register(name, lambda *args, name=name: counts.__setitem__(name, counts[name] + 1))
+        retired = []
+        hooks.register('on_gate_retire', lambda orc, gate: retired.append(gate))
+
+        orc = run(lambda: buffered_naive_buffered_widget(10, 18, 2, factory_factory=MagicStateFactoryRegion.with_litinski_6x3_dense), hooks=hooks)
+        self.assertEqual(counts['on_tick_start'], orc.time)
+        self.assertEqual(counts['on_tick_end'], orc.time)
+        self.assertEqual(counts['on_upkeep'], orc.time)
+        self.assertEqual(counts['on_alloc_success'], len(orc.processed))
+        self.assertEqual(counts['on_alloc_attempt'], hooks.alloc_attempts)
+        self.assertTrue(set(orc.processed) <= set(retired))
+
+        report = hooks.report()
+        self.assertEqual(report['phases']['tick']['count'], orc.time)
+        self.assertEqual(sum(report['phases']['alloc']['histogram'].values()), orc.time - 5)
+        self.assertTrue(all(stats['calls'] for stats in report['routers'].values()))
+        self.assertIn('gate_next', hooks.format_report())
+
+        hooks.detach()
+        self.assertFalse(any('generic_transaction' in vars(r) for r in orc.strategy.routers))
+
+    def test_checkpoint(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        def roots():
+            gates = util.make_gates(obj, lambda x: int(x) % 5)
+            return util.dag_create(obj, gates)[0][0]
+
+        def stats(orc):
+            return orc.get_total_cycles(), orc.get_space_time_volume(), orc.get_T_stats()
+
+        strat, wid = flat_naive_t_cultivator_widget(10, 5)
+        strat.mapper = DummyMapper(2)
+        wid.reseed(0)
+        hooks = HookRegistry()
+        orc = ScheduleOrchestrator(roots(), wid, strat, hooks=hooks)
+        orc.prewarm(20)
+
+        checkpoint = orc.checkpoint()
+        self.assertTrue(all('generic_transaction' in vars(r) for r in orc.strategy.routers))
+
+        # Forks start from the prewarmed board, e.g. in another process
+        forks = [
+            ScheduleOrchestrator.from_checkpoint(checkpoint, roots()),
+            ScheduleOrchestrator.from_checkpoint(pickle.loads(pickle.dumps(checkpoint)), roots(), hooks=HookRegistry()),
+            orc.fork(roots()),
+        ]
+        self.assertTrue(all(fork.time == 20 and fork.widget is not wid for fork in forks))
+
+        orc.schedule()
+        for fork in forks:
+            fork.schedule()
+            self.assertEqual(stats(fork), stats(orc))
+        self.assertTrue(forks[1].hooks.report()['routers'])
+
+        with self.assertRaises(ValueError):
+            orc.checkpoint()
+
+    def test_prewarm_cache(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        def run(cache, seed=0, cycles=20, hooks=None):
+            strat, wid = flat_naive_t_cultivator_widget(10, 5)
+            strat.mapper = DummyMapper(2)
+            wid.reseed(seed)
+            gates = util.make_gates(obj, lambda x: int(x) % 5)
+            orc = ScheduleOrchestrator(util.dag_create(obj, gates)[0][0], wid, strat, hooks=hooks)
+            orc.prewarm(cycles, cache=cache, key='flat_naive_t_cultivator_widget(10, 5)')
+            self.assertIs(orc.widget, wid)
+            orc.schedule()
+            return orc.get_total_cycles(), orc.get_space_time_volume(), orc.get_T_stats()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CheckpointCache(tmp)
+            expected = run(None)
+            self.assertEqual(run(cache), expected)
+            self.assertEqual(len(cache.entries()), 1)
+
+            # Hits restore into the orchestrator's own widget and strategy
+            hooks = HookRegistry()
+            self.assertEqual(run(cache, hooks=hooks), expected)
+            self.assertEqual(len(cache.entries()), 1)
+            self.assertTrue(hooks.report()['routers'])
+
+            # Unreadable entries are misses, and get overwritten
+            (_, _, path), = cache.entries()
+            with open(path, 'wb') as f:
+                f.write(zlib.compress(b'not a pickle'))
+            self.assertEqual(run(cache), expected)
+            with open(path, 'rb') as f:
+                Checkpoint(f.read()).load()
+
+            # Other seeds and lengths are other entries
+            self.assertEqual(run(cache, seed=1), run(None, seed=1))
+            run(cache, cycles=30)
+            entries = cache.entries()
+            self.assertEqual(len(entries), 3)
+
+            # Least recently used out first
+            run(cache)
+            cache.max_bytes = cache.size() - 1
+            cache.evict()
+            self.assertEqual(len(cache.entries()), 2)
+            self.assertNotIn(entries[1][2], [path for _, _, path in cache.entries()])
+
+            strat, wid = flat_naive_t_cultivator_widget(10, 5)
+            orc = ScheduleOrchestrator([], wid, strat, debug=True)
+            with self.assertRaises(ValueError):
+                orc.prewarm(20, cache=cache)
+
+    def test_failure_stats(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+        strat, wid = buffered_naive_buffered_widget(10, 18, 2, factory_factory=MagicStateFactoryRegion.with_litinski_6x3_dense)
+        strat.mapper = DummyMapper(2)
+        wid.reseed(0)
+        gates = util.make_gates(obj, lambda x: int(x) % 5)
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        orc = ScheduleOrchestrator(dag_layers[0], wid, strat)
+        orc.schedule()
+        stats = orc.get_failure_stats()
+
+        # T gates stall on the empty factories before the first T arrives
+        refusals = stats['refusals']
+        self.assertGreater(stats['failed_attempts'], 0)
+        self.assertTrue(any('NO_T_AVAILABLE' in reasons for reasons in refusals.values()))
+        self.assertFalse(any('GATE_TYPE' in reasons for reasons in refusals.values()))
+
+        total = sum(sum(reasons.values()) for reasons in refusals.values())
+        ticks, counts = orc.alloc_failures.time_series()
+        self.assertEqual(counts.sum(), total)
+        self.assertTrue((ticks < orc.time).all())
+        # One entry per tick and refused (router, reason), not per refusal
+        pairs = sum(len(reasons) for reasons in refusals.values())
+        self.assertLessEqual(len(orc.alloc_failures.times), len(ticks) * pairs)
+        self.assertLess(len(orc.alloc_failures.times), total)
+
+        for router, reasons in refusals.items():
+            for reason, count in reasons.items():
+                _, counts = orc.alloc_failures.time_series(FailureReason[reason], router)
+                self.assertEqual(counts.sum(), count)
+
+    def test_trace(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        def run(**kwargs):
+            strat, wid = vertical_strategy_with_prefilled_buffer_widget(10, 20)
+            strat.mapper = DummyMapper(2)
+            wid.reseed(0)
+            gates = util.make_gates(obj, lambda x: int(x) % 5)
+            dag_layers, all_gates = util.dag_create(obj, gates)
+            orc = ScheduleOrchestrator(dag_layers[0], wid, strat, **kwargs)
+            orc.prewarm(10)
+            orc.schedule()
+            return orc
+
+        layers = [
+            [[(cell.y, cell.x) for cell in cells] for cells in layer]
+            for layer in run().output_layers
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            trace = TraceRecorder.for_widget(run().widget, tmp, spill_size=64)
+            orc = run(fast_forward=True, trace=trace)
+            self.assertEqual(len(orc.output_layers), 1)
+            trace.close()
+
+            for recorded in (trace, TraceRecorder.load(tmp)):
+                self.assertEqual(len(recorded), len(layers))
+                for time, layer in enumerate(layers):
+                    self.assertEqual([cells.tolist() for _, cells in recorded.cells_at(time)], [list(map(list, cells)) for cells in layer])
+
+                for y, x in ((0, 0), (3, 4), (12, 7)):
+                    busy = [time for time, layer in enumerate(layers) if any((y, x) in cells for cells in layer)]
+                    self.assertEqual(recorded.busy_ticks(y, x).tolist(), busy)
+
+
+if __name__ == '__main__':
+    unittest.main()
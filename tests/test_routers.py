@@ -0,0 +1,158 @@
+import json
+import unittest
+
+import numpy as np
+
+from t_scheduler.base import FailureReason, util
+from t_scheduler.base.occupancy import OccupancyGrid
+from t_scheduler.base.patch import PatchLock
+from t_scheduler.router import MagicStateFactoryRouter, RechargableBufferRouter, TreeFilledBufferRouter
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+
+from t_scheduler.templates.generic_templates import *
+from t_scheduler.strategy.generic_strategy import DummyMapper
+
+
+class RouterTest(unittest.TestCase):
+    def test_factory_route_cache(self):
+        region = MagicStateFactoryRegion.with_litinski_5x3(10, 12)
+        router = MagicStateFactoryRouter(region)
+        outputs = [o for factory in region.factories for o in factory.outputs]
+        route_cells = [cell for row in region.sc_patches for cell in row if cell.route_available()]
+
+        rng = np.random.default_rng(0)
+        locks = []
+        for _ in range(200):
+            if locks and rng.random() < 0.4:
+                locks.pop(int(rng.integers(len(locks)))).unlock()
+            else:
+                free = [cell for cell in route_cells if not cell.locked()]
+                held = list(rng.choice(free, size=min(3, len(free)), replace=False)) # type: ignore
+                lock = PatchLock(None, held)
+                lock.lock()
+                locks.append(lock)
+
+            for output in outputs:
+                for col in (None, int(rng.integers(region.width))):
+                    self.assertEqual(router.cached_bfs(output, col), router.bfs(output, col))
+
+        self.assertTrue(router.route_cache)
+
+    def test_buffer_column_index(self):
+        region = MagicStateBufferRegion(8, 6)
+        router = RechargableBufferRouter(region)
+        cells = [cell for row in region.sc_patches for cell in row]
+
+        def scan():
+            slots, states, moves = [], [], []
+            for col in range(region.width):
+                column = [region[row, col] for row in range(region.height)]
+                free = column[::-1]
+                run = next((i for i, cell in enumerate(free) if not cell.route_available()), len(free))
+                slots.append(free[run - 1] if run else None)
+                first = next((cell for cell in column if not cell.route_available()), None)
+                states.append(first if first is not None and first.T_available() else None)
+            for row in range(1, region.height):
+                for col in range(region.width):
+                    if region[row, col].T_available() and region[row - 1, col].route_available():
+                        moves.append(region[row, col])
+            return slots, states, moves
+
+        rng = np.random.default_rng(0)
+        locks = []
+        for _ in range(300):
+            cell = cells[int(rng.integers(len(cells)))]
+            if locks and rng.random() < 0.2:
+                locks.pop().unlock()
+            elif cell.locked():
+                continue
+            elif cell.T_available() and rng.random() < 0.5:
+                cell.use()
+                cell.release(None)
+            elif cell.route_available() and rng.random() < 0.7:
+                cell.store()
+            else:
+                lock = PatchLock(None, [cell])
+                lock.lock()
+                locks.append(lock)
+
+            slots, states, moves = scan()
+            self.assertEqual(router.get_buffer_slots(), slots)
+            self.assertEqual(router.get_buffer_states(), states)
+            self.assertEqual([t.magic_state_patch for t in router.all_local_upkeep_transactions()], moves)
+
+    def test_failure_reasons(self):
+        strat, wid = vertical_strategy_with_prefilled_buffer_widget(10, 20)
+        reg, bus, bell, buf, _ = strat.routers
+        source = bus.region[0, 3]
+
+        self.assertEqual(bell.generic_transaction(source).reason, FailureReason.GATE_TYPE)
+        self.assertIsNone(buf.generic_transaction(source).reason)
+
+        top = PatchLock(None, [buf.region[0, c] for c in range(buf.region.width)])
+        top.lock()
+        self.assertEqual(buf.generic_transaction(source).reason, FailureReason.ROUTE_BLOCKED)
+        top.unlock()
+
+        for row in buf.region.sc_patches:
+            for cell in row:
+                if cell.T_available():
+                    cell.use()
+        self.assertEqual(buf.generic_transaction(source).reason, FailureReason.NO_T_AVAILABLE)
+
+        PatchLock(None, [bus.region[0, 5]]).lock()
+        self.assertEqual(bus.generic_transaction(bus.region[0, 2], bus.region[0, 7]).reason, FailureReason.ROUTE_BLOCKED)
+        self.assertTrue(bus.generic_transaction(bus.region[0, 6], bus.region[0, 7]).status)
+
+        PatchLock(None, [reg.region[0, 0]]).lock()
+        self.assertEqual(reg.generic_transaction(reg.region[0, 0]).reason, FailureReason.REGISTER_LOCKED)
+
+    def test_occupancy_in_sync(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        for strat, wid in (
+            buffered_naive_buffered_widget(10, 18, 2, factory_factory=MagicStateFactoryRegion.with_litinski_6x3_dense),
+            vertical_strategy_with_prefilled_buffer_widget(10, 20),
+        ):
+            strat.mapper = DummyMapper(2)
+            gates = util.make_gates(obj, lambda x: int(x) % 5)
+            dag_layers, all_gates = util.dag_create(obj, gates)
+
+            orc = ScheduleOrchestrator(dag_layers[0], wid, strat, False)
+            orc.queued.extend(orc.waiting)
+            while orc.queued or orc.active:
+                orc.schedule_pass()
+                expected = [[OccupancyGrid.patch_flags(cell) for cell in row] for row in wid.board]
+                self.assertEqual(wid.occupancy.flags.tolist(), expected)
+                for router in strat.routers:
+                    if (flags := router.local_flags()) is not None:
+                        for col in range(router.region.width):
+                            self.assertEqual(router.local_flags(col).tolist(), flags[:, col].tolist())
+
+    def test_tree_route_fields(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+        strat, wid = tree_strategy_with_prefilled_buffer_widget(12, 10)
+        strat.mapper = DummyMapper(2)
+        router = next(r for r in strat.routers if isinstance(r, TreeFilledBufferRouter))
+
+        gates = util.make_gates(obj, lambda x: int(x) % 5)
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        orc = ScheduleOrchestrator(dag_layers[0], wid, strat, False)
+        orc.queued.extend(orc.waiting)
+        rebuilds = 0
+        while orc.queued or orc.active:
+            orc.schedule_pass()
+            # Cached fields match a fresh search of the current board
+            for origin, field in list(router.fields.items()):
+                rebuilds += 1
+                del router.fields[origin]
+                router.route_field(router.cells[origin[0]][origin[1]])
+                self.assertEqual(router.fields[origin], field)
+        self.assertLess(router.field_builds - rebuilds, router.reparses)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from contextlib import redirect_stdout
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from t_scheduler import synthetic
+from t_scheduler.base import util
+from t_scheduler.base.schedule_stream import ScheduleStream, StreamingLoader
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.strategy.generic_strategy import DummyMapper
+from t_scheduler.templates.generic_templates import vertical_strategy_with_prefilled_buffer_widget
+from t_scheduler.tracker import HookRegistry
+
+
+def run(roots, hooks=None):
+    strat, wid = vertical_strategy_with_prefilled_buffer_widget(10, 60)
+    strat.mapper = DummyMapper(2)
+    orc = ScheduleOrchestrator(roots, wid, strat, hooks=hooks)
+    with redirect_stdout(io.StringIO()):
+        orc.schedule()
+    return orc
+
+
+class ScheduleStreamTest(unittest.TestCase):
+    def test_layers(self):
+        obj = json.loads(json.dumps(util.toffoli_example_input()))
+        # Scalars after the schedule are read too, other values are dropped
+        obj['trailing'] = 1.5
+        for text in (json.dumps(obj), json.dumps(obj, indent=4)):
+            stream = ScheduleStream(io.StringIO(text), chunk_size=3)
+            self.assertEqual(list(stream.layers()), obj['consumptionschedule'])
+            self.assertEqual(stream.header, {'n_qubits': 13, 'time': 7, 'space': 10, 'trailing': 1.5})
+
+        stream = ScheduleStream(io.StringIO('{"n_qubits": 2, "consumptionschedule": []}'))
+        self.assertEqual(list(stream.layers()), [])
+
+        with self.assertRaises(ValueError):
+            list(ScheduleStream(io.StringIO('{"consumptionschedule": [[{"0": []}] [')).layers())
+
+    def test_streamed_schedule(self):
+        R = 5
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'schedule.json')
+            synthetic.write_schedule(path, 'layered_random', R, depth=12, fan_in=3, span=3)
+            with open(path) as f:
+                obj = json.load(f)
+
+            gates = util.make_gates(obj, lambda x: x % R)
+            dag_layers, _ = util.dag_create(obj, gates)
+            ticks = run(dag_layers[0]).time
+
+            for lookahead, expect_ticks in ((1000, ticks), (R, None)):
+                loader = StreamingLoader(ScheduleStream(path).layers(), lambda x: x % R, lookahead)
+                hooks = HookRegistry(timed=False)
+                loader.attach(hooks)
+
+                # Live gates never exceed the lookahead by more than a layer
+                peak = []
+                hooks.register('on_tick_end', lambda orc: peak.append(len(loader.live)))
+
+                orc = run(loader.roots(), hooks)
+                self.assertTrue(loader.done())
+                self.assertEqual(loader.loaded, obj['n_qubits'])
+                self.assertFalse(orc.processed)
+                self.assertLessEqual(max(peak), lookahead + R)
+                if expect_ticks is not None:
+                    self.assertEqual(orc.time, expect_ticks)
+
+    def test_bad_schedule(self):
+        loader = StreamingLoader([[{'0': []}], [{'1': [2]}]])
+        with self.assertRaises(ValueError):
+            loader.roots()
+
+        loader = StreamingLoader([[{'0': []}], [{'0': [0]}]])
+        with self.assertRaises(ValueError):
+            loader.roots()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from t_scheduler import sweep
+
+
+SPEC = {
+    "seed": 3,
+    "schedules": ["tests/qft_test_obj.json"],
+    "runs": [
+        {"template": "flat_naive_t_cultivator_widget", "grid": {"width": [10], "height": [5, 6]}},
+        {"template": "buffered_naive_buffered_widget",
+         "grid": {"width": [10], "height": [18], "buffer_height": [2],
+                  "factory_factory": ["MagicStateFactoryRegion.with_litinski_6x3_dense"],
+                  "rot_strat": ["ADD_DELAY"]}},
+    ],
+}
+
+
+class SweepTest(unittest.TestCase):
+    def test_sweep_resume(self):
+        runs = sweep.expand_spec(SPEC)
+        self.assertEqual(len(runs), 3)
+        self.assertEqual([r['seed'] for r in runs], [r['seed'] for r in sweep.expand_spec(SPEC)])
+        self.assertEqual(len({r['seed'] for r in runs}), 3)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'results.ndjson')
+            with open(output, 'w') as f:
+                # Partially written row of an interrupted sweep
+                f.write('{"key": ')
+
+            results = sweep.sweep(SPEC, output, workers=2)
+            self.assertEqual(sorted(results['key']), sorted(r['key'] for r in runs))
+            self.assertTrue(all(c > 0 for c in results['total_cycles']))
+            self.assertIn('volume_T_IDLE_VOLUME', results)
+
+            mtime = os.path.getmtime(output)
+            self.assertEqual(sweep.sweep(SPEC, output), results)
+            self.assertEqual(os.path.getmtime(output), mtime)
+
+    def test_prewarm_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = dict(SPEC, prewarm=15, prewarm_cache=os.path.join(tmp, 'cache'))
+            first = sweep.sweep(spec, os.path.join(tmp, 'first.ndjson'), workers=2)
+            self.assertEqual(len(os.listdir(spec['prewarm_cache'])), 3)
+
+            # A rerun restores every prewarm
+            second = sweep.sweep(spec, os.path.join(tmp, 'second.ndjson'), workers=2)
+            by_key = lambda results: sorted(zip(*results.values()), key=lambda row: row[0])
+            self.assertEqual(by_key(second), by_key(first))
+            self.assertEqual(len(os.listdir(spec['prewarm_cache'])), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import unittest
+
+from t_scheduler import synthetic
+from t_scheduler.base import util
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.strategy.generic_strategy import DummyMapper
+from t_scheduler.templates.generic_templates import vertical_strategy_with_prefilled_buffer_widget
+
+
+CASES = [
+    ('all_to_all', {'rounds': 2}),
+    ('layered_random', {'depth': 9, 'fan_in': 3, 'seed': 4, 'span': 3}),
+    ('adder', {'additions': 5}),
+    ('chain', {'length': 12, 'link_every': 3}),
+]
+
+
+class SyntheticTest(unittest.TestCase):
+    def test_families(self):
+        R = 6
+        for family, params in CASES:
+            obj = synthetic.make_schedule(family, R, **params)
+            layer_of = {}
+            for idx, layer in enumerate(obj['consumptionschedule']):
+                for gate in layer:
+                    for targ, pre in gate.items():
+                        targ = int(targ)
+                        self.assertNotIn(targ, layer_of)
+                        layer_of[targ] = idx
+                        self.assertTrue(all(layer_of[q] < idx for q in pre))
+                        self.assertEqual(len(set(pre)), len(pre))
+                        # Each gate follows the previous gate on its register
+                        if targ >= R:
+                            self.assertIn(targ - R, pre)
+
+            self.assertEqual(sorted(layer_of), list(range(obj['n_qubits'])), family)
+
+        for family in synthetic.SIZE_PARAMS:
+            with self.assertRaises(ValueError):
+                synthetic.make_schedule(family, R)
+            with self.assertRaises(SystemExit):
+                synthetic.main([family, os.devnull, '--registers', str(R)])
+
+        # Options of other families
+        with self.assertRaises(SystemExit):
+            synthetic.main(['chain', os.devnull, '--registers', str(R), '--length', '5', '--seed', '3'])
+
+    def test_stream_matches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'schedule.json')
+            for family, params in CASES:
+                count = synthetic.write_schedule(path, family, 5, **params)
+                with open(path) as f:
+                    obj = json.load(f)
+                self.assertEqual(obj, synthetic.make_schedule(family, 5, **params))
+                self.assertEqual(count, obj['n_qubits'])
+
+                with open(path) as f:
+                    # Header, one line per layer, footer
+                    self.assertEqual(len(f.readlines()), len(obj['consumptionschedule']) + 2)
+
+            # Failed generation leaves nothing behind
+            path = os.path.join(tmp, 'failed.json')
+            with self.assertRaises(TypeError):
+                synthetic.write_schedule(path, 'chain', 5, length=5, seed=3)
+            self.assertEqual(os.listdir(tmp), ['schedule.json'])
+
+    def test_schedule(self):
+        obj = synthetic.make_schedule('all_to_all', 5)
+        strat, wid = vertical_strategy_with_prefilled_buffer_widget(10, 20)
+        strat.mapper = DummyMapper(2)
+
+        gates = util.make_gates(obj, lambda x: int(x) % obj['n_registers'])
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        orc = ScheduleOrchestrator(dag_layers[0], wid, strat)
+        orc.schedule()
+        self.assertTrue(all(g.completed() for g in all_gates))
+
+
+if __name__ == '__main__':
+    unittest.main()
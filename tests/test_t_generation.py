@@ -0,0 +1,200 @@
+import json
+import os
+import tempfile
+import unittest
+from functools import partial
+
+import numpy as np
+
+from t_scheduler.base import util
+from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.t_generation import BatchedTGenerator, TArrivalTrace, TArrivalTraceExhausted, TCultivator, sample_emissions
+from t_scheduler.t_generation.t_factories import TFactory_Litinski_5x3_15_to_1
+
+from t_scheduler.templates.generic_templates import *
+from t_scheduler.strategy.generic_strategy import DummyMapper
+
+
+class CertainCultivator(TCultivator):
+    stages = [[4, 1], [5, 1], [2, 1]]
+
+    def __init__(self):
+        super().__init__()
+        self.n_stages = 3
+
+
+class TGenerationTest(unittest.TestCase):
+    def test_batched_matches_scalar(self):
+        for make in (CertainCultivator, partial(TFactory_Litinski_5x3_15_to_1, p_logical=1)):
+            scalar = [make() for _ in range(3)]
+            batched = [make() for _ in range(3)]
+            engine = BatchedTGenerator(batched)
+            mask = np.array([True, False, True])
+
+            for cycle in range(60):
+                if cycle == 20:
+                    scalar[0].reset()
+                    batched[0].reset()
+                expected = [i for i, gen in enumerate(scalar) if mask[i] and gen()]
+                self.assertEqual(list(engine.update(mask)), expected)
+
+            engine.sync()
+            for s, b in zip(scalar, batched):
+                self.assertEqual(s._curr_cycle, b._curr_cycle)
+                self.assertEqual(getattr(s, 'curr_stage', 0), getattr(b, 'curr_stage', 0))
+
+    def test_batched_seeded(self):
+        emitted = []
+        for _ in range(2):
+            engine = BatchedTGenerator((TCultivator() for _ in range(50)),
+                                       generator=np.random.default_rng(7))
+            emitted.append([list(engine.update()) for _ in range(200)])
+        self.assertEqual(emitted[0], emitted[1])
+
+        # Generators added one at a time join the same arrays
+        engine = BatchedTGenerator((TCultivator() for _ in range(25)),
+                                   generator=np.random.default_rng(7))
+        for _ in range(25):
+            engine.add(TCultivator())
+        self.assertEqual([list(engine.update()) for _ in range(200)], emitted[0])
+
+    def test_batched_factory_region(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+        strat, wid = buffered_naive_buffered_widget(
+            10, 18, 2, factory_factory=partial(MagicStateFactoryRegion.with_litinski_5x3, batched=True))
+        strat.mapper = DummyMapper(2)
+
+        gates = util.make_gates(obj, lambda x: int(x) % 5)
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        orc = ScheduleOrchestrator(dag_layers[0], wid, strat, False)
+        orc.schedule()
+
+        self.assertTrue(all(g.completed() for g in all_gates))
+
+    def test_arrival_trace_matches_scalar(self):
+        for make in (CertainCultivator, partial(TFactory_Litinski_5x3_15_to_1, p_logical=1)):
+            scalar = [make() for _ in range(3)]
+            trace = TArrivalTrace.sample(scalar, 20)
+            for gen in [make() for _ in range(3)]:
+                trace.add(gen)
+
+            for cycle in range(60):
+                if cycle == 20:
+                    scalar[0].reset()
+                    trace.generators[0].reset()
+                expected = [i for i, gen in enumerate(scalar) if gen()]
+                self.assertEqual(list(trace.update()), expected)
+
+    def test_arrival_trace_extends(self):
+        # CertainCultivator emits every 14 updates
+        trace = TArrivalTrace.sample([CertainCultivator() for _ in range(2)], 2)
+        for gen in [CertainCultivator() for _ in range(2)]:
+            trace.add(gen)
+        emitted = [cycle for cycle in range(1, 100) if len(trace.update())]
+        self.assertEqual(emitted, list(range(14, 100, 14)))
+        self.assertGreaterEqual(trace.durations.shape[1], 7)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.npy')
+            trace.save(path)
+            self.assertEqual(np.load(path).shape, trace.durations.shape)
+
+            # Loaded traces can't extend, and fail before touching state
+            loaded = TArrivalTrace.load(path)
+            for gen in [CertainCultivator() for _ in range(2)]:
+                loaded.add(gen)
+            n = loaded.durations.shape[1]
+            for _ in range(14 * n - 1):
+                loaded.update()
+            with self.assertRaisesRegex(TArrivalTraceExhausted, f'needs {n + 1} emissions'):
+                loaded.update()
+            self.assertEqual(loaded.cursor.tolist(), [n - 1, n - 1])
+            self.assertEqual(loaded.remaining.tolist(), [1, 1])
+
+    def test_arrival_trace_replay(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+
+        trace = TArrivalTrace.sample(TCultivatorBufferRegion(8, 3).t_generators(), 200)
+        with tempfile.TemporaryDirectory() as tmp:
+            trace.save(os.path.join(tmp, 'trace.npy'))
+
+            results = []
+            for _ in range(2):
+                strat, wid = flat_naive_t_cultivator_widget(10, 5)
+                strat.mapper = DummyMapper(2)
+                wid.components[-2].use_trace(TArrivalTrace.load(os.path.join(tmp, 'trace.npy')))
+
+                gates = util.make_gates(obj, lambda x: int(x) % 5)
+                dag_layers, all_gates = util.dag_create(obj, gates)
+
+                orc = ScheduleOrchestrator(dag_layers[0], wid, strat, False)
+                orc.schedule()
+                results.append((orc.get_total_cycles(), orc.get_space_time_volume()))
+
+        self.assertEqual(results[0], results[1])
+
+    def test_sample_emissions(self):
+        # Certain generators emit on the same cycles as stepping them
+        for make in (CertainCultivator, partial(TFactory_Litinski_5x3_15_to_1, p_logical=1)):
+            for warmup in (0, 7):
+                gen = make()
+                for _ in range(warmup):
+                    gen()
+                counts = sample_emissions([gen], 100, n_samples=2)
+                self.assertEqual(counts.tolist(), [[sum(gen() for _ in range(100))]] * 2)
+
+        gen = CertainCultivator()
+        self.assertEqual(sample_emissions([gen], 100, 1, restart_delay=3)[0, 0], (100 - 14) // 17 + 1)
+        self.assertEqual(sample_emissions([gen], 100, 1, max_emissions=2)[0, 0], 2)
+        self.assertEqual(sample_emissions([gen, gen], 14, 3, max_emissions=1).tolist(), [[1, 1]] * 3)
+        self.assertEqual(sample_emissions([gen], 13, 3, max_emissions=1).tolist(), [[0]] * 3)
+        self.assertEqual(sample_emissions([gen] * 4, 100, 1, max_total=5)[0].tolist(), [2] * 4)
+
+        # Emissions queue for a shared lane, but not for lanes of their own
+        shared, own = np.ones((4, 1), dtype=bool), np.eye(4, dtype=bool)
+        self.assertEqual(sample_emissions([gen] * 4, 39, 1, restart_delay=3, lanes=shared)[0].tolist(), [2, 2, 2, 1])
+        self.assertEqual(sample_emissions([gen] * 4, 39, 1, restart_delay=3, lanes=own)[0].tolist(), [2] * 4)
+        # Generators stop once they cannot be moved out
+        self.assertEqual(sample_emissions([gen] * 4, 100, 1, restart_delay=3, max_total=2,
+                                          lanes=shared)[0].tolist(), [2, 2, 1, 1])
+
+        # Emission rates match the generators' own
+        engine = BatchedTGenerator((TCultivator() for _ in range(500)), generator=np.random.default_rng(0))
+        stepped = sum(len(engine.update()) for _ in range(200)) / 500
+        sampled = sample_emissions([TCultivator()], 200, 5000, np.random.default_rng(0)).mean()
+        self.assertAlmostEqual(sampled, stepped, delta=0.1 * stepped)
+
+    def test_estimate_generated_t_count(self):
+        def layout(factory_region, factory_router, buffer_height=0, width=10, height=14):
+            factory = LayoutNode(partial(factory_region, width, height - 3 - buffer_height, x=0, y=3 + buffer_height),
+                                 factory_router)
+            if buffer_height:
+                factory = LayoutNode(
+                    partial(MagicStateBufferRegion, width, buffer_height, x=0, y=2), RechargableBufferRouter,
+                    [LayoutNode(partial(RouteBus, width, x=0, y=2 + buffer_height), StandardBusRouter, [factory])])
+            return LayoutNode(
+                partial(SingleRowRegisterRegion, width, x=0, y=0), BaselineRegisterRouter,
+                [LayoutNode(partial(RouteBus, width, x=0, y=1), StandardBusRouter, [factory])])
+
+        cultivators = lambda: layout(partial(TCultivatorBufferRegion, buffer_type='dense'), DenseTCultivatorBufferRouter)
+        factories = lambda: layout(MagicStateFactoryRegion.with_litinski_5x3, MagicStateFactoryRouter, 2)
+        wide = lambda: layout(MagicStateFactoryRegion.with_litinski_5x3, MagicStateFactoryRouter, 4, 24, 30)
+        dense = lambda: layout(MagicStateFactoryRegion.with_litinski_6x3_dense, MagicStateFactoryRouter, 2)
+
+        # Factories emit together and queue to be drained during the ramp
+        for make, cycles in ((cultivators, 80), (cultivators, 1000), (factories, 30), (factories, 40),
+                             (factories, 60), (factories, 1000), (wide, 30), (wide, 60), (dense, 50)):
+            simulated = np.mean([
+                estimate_generated_t_count(make(), cycles, simulate=True, seed=seed) for seed in range(10)
+            ])
+            estimate = estimate_generated_t_count(make(), cycles, seed=0)
+            self.assertAlmostEqual(estimate, simulated, delta=0.1 * simulated + 1)
+            self.assertLessEqual(estimate_generated_t_count(make(), cycles, 10, seed=0),
+                                 estimate_generated_t_count(make(), cycles, 50, seed=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
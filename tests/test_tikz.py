@@ -1,6 +1,12 @@
+import json
+import os
+import tempfile
 import unittest
 from t_scheduler.base import util
+from t_scheduler.output import TikzTrace
 from t_scheduler.schedule_orchestrator import ScheduleOrchestrator
+from t_scheduler.strategy.generic_strategy import DummyMapper
+from t_scheduler.widget import Widget
 from t_scheduler.templates.generic_templates import *
 from t_scheduler.strategy.generic_strategy import RotationStrategyOption
 
@@ -21,6 +27,38 @@ class TikzTest(unittest.TestCase):
         out += wid.save_tikz_patches_layer()
         print(''.join(map(str,out)))
 
+    def test_tikz_trace(self):
+        with open('tests/qft_test_obj.json') as f:
+            obj = json.load(f)
+        strat, wid = vertical_strategy_with_prefilled_buffer_widget(20, 7, rot_strat=RotationStrategyOption.BACKPROP_INIT)
+        strat.mapper = DummyMapper(2)
+        gates = util.make_gates(obj, lambda x: int(x) % 9)
+        dag_layers, all_gates = util.dag_create(obj, gates)
+
+        tikz_trace = TikzTrace(wid)
+        snapshots = {}
+        record = tikz_trace.record
+
+        def record_and_snapshot(time):
+            record(time)
+            snapshots[time] = [[Widget._patch_to_glyph(cell) for cell in row] for row in wid.board]
+        tikz_trace.record = record_and_snapshot # type: ignore
+
+        orc = ScheduleOrchestrator(dag_layers[0], wid, strat, fast_forward=True, tikz_trace=tikz_trace)
+        orc.prewarm(10)
+        orc.schedule()
+        self.assertLess(len(snapshots), orc.time)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tikz.npz')
+            tikz_trace.save(path)
+
+            for recorded in (tikz_trace, TikzTrace.load(path)):
+                expected = None
+                for time, grid in recorded.grids(range(orc.time)):
+                    expected = snapshots.get(time, expected)
+                    self.assertEqual([[recorded.glyphs[g] for g in row] for row in grid.tolist()], expected)
+
 
 if __name__ == '__main__':
     import sys